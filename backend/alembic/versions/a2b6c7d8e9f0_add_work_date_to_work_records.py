@@ -0,0 +1,44 @@
+"""add_work_date_to_work_records
+
+Revision ID: a2b6c7d8e9f0
+Revises: f1a5b6c7d8e9
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2b6c7d8e9f0'
+down_revision: Union[str, Sequence[str], None] = 'f1a5b6c7d8e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('work_records', sa.Column('work_date', sa.Date(), nullable=True))
+
+    # 回填：created_at 以 UTC 儲存，換算成公司時區後扣掉分界時間即為所屬工作日
+    hour, minute = settings.WORKDAY_CUTOFF.split(":")
+    op.execute(
+        sa.text("""
+            UPDATE work_records
+            SET work_date = ((COALESCE(created_at, now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC') AT TIME ZONE :tz
+                             - make_interval(hours => :hour, mins => :minute))::date
+        """).bindparams(tz=settings.BUSINESS_TIMEZONE, hour=int(hour), minute=int(minute))
+    )
+
+    op.alter_column('work_records', 'work_date', nullable=False)
+    op.create_index('ix_work_records_employee_work_date_project', 'work_records', ['employee_id', 'work_date', 'project_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_work_records_employee_work_date_project', table_name='work_records')
+    op.drop_column('work_records', 'work_date')
@@ -0,0 +1,49 @@
+"""clear_enhance_error_placeholders
+
+Revision ID: a8b9c0d1e2f3
+Revises: f7a1b2c3d4e5
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8b9c0d1e2f3'
+down_revision: Union[str, Sequence[str], None] = 'f7a1b2c3d4e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 先前 AI 潤飾失敗時被當成潤飾結果儲存的錯誤訊息
+_PLACEHOLDERS = (
+    'AI 服務未啟用或尚未配置。',
+    '無法從 AI 服務獲取內容。',
+    'AI 服務目前使用量過高，請稍後再試。',
+    'AI 服務暫時無法使用，請稍後再試。',
+    'AI 服務暫時無法使用。',
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 清除錯誤訊息與其輸入雜湊，避免被並行的潤飾請求沿用
+    params = {f"p{i}": text for i, text in enumerate(_PLACEHOLDERS)}
+    placeholders = ", ".join(f":{name}" for name in params)
+    op.execute(
+        sa.text(
+            f"UPDATE daily_project_summary SET ai_content = NULL, ai_input_hash = NULL "
+            f"WHERE ai_content IN ({placeholders})"
+        ).bindparams(**params)
+    )
+    op.execute(
+        sa.text(f"UPDATE work_records SET ai_content = NULL WHERE ai_content IN ({placeholders})").bindparams(**params)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 清除的只是錯誤訊息，不需復原
+    pass
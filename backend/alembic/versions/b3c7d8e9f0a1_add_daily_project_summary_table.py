@@ -0,0 +1,89 @@
+"""add_daily_project_summary_table
+
+Revision ID: b3c7d8e9f0a1
+Revises: a2b6c7d8e9f0
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3c7d8e9f0a1'
+down_revision: Union[str, Sequence[str], None] = 'a2b6c7d8e9f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'daily_project_summary',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('employee_id', sa.Integer(), nullable=False),
+        sa.Column('work_date', sa.Date(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), server_default=sa.text("''"), nullable=False),
+        sa.Column('ai_content', sa.Text(), nullable=True),
+        sa.Column('record_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('total_execution_time_minutes', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('files', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'[]'::jsonb"), nullable=False),
+        sa.Column('last_record_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('employee_id', 'work_date', 'project_id', name='unique_daily_project_summary')
+    )
+    op.create_index(op.f('ix_daily_project_summary_id'), 'daily_project_summary', ['id'], unique=False)
+
+    # 回填：依 (員工, 工作日, 專案) 彙整既有紀錄，內容與附件皆以較新的紀錄在前
+    op.execute("""
+        INSERT INTO daily_project_summary (
+            employee_id, work_date, project_id, content, ai_content,
+            record_count, total_execution_time_minutes, files, last_record_at
+        )
+        SELECT
+            r.employee_id,
+            r.work_date,
+            r.project_id,
+            COALESCE(
+                string_agg(btrim(r.content), E'\\n\\n' ORDER BY r.created_at DESC)
+                    FILTER (WHERE btrim(r.content) <> ''),
+                ''
+            ),
+            (array_agg(r.ai_content ORDER BY r.created_at DESC) FILTER (WHERE r.ai_content IS NOT NULL))[1],
+            COUNT(*),
+            COALESCE(SUM(r.execution_time_minutes), 0),
+            COALESCE((
+                SELECT jsonb_agg(
+                    jsonb_build_object(
+                        'id', f.id,
+                        'name', f.name,
+                        'type', f.type,
+                        'size', f.size,
+                        'url', f.url,
+                        'is_selected_for_ai', COALESCE(f.is_selected_for_ai, false)
+                    ) ORDER BY fr.created_at DESC, f.id
+                )
+                FROM file_attachments f
+                JOIN work_records fr ON fr.id = f.work_record_id
+                WHERE fr.employee_id = r.employee_id
+                  AND fr.work_date = r.work_date
+                  AND fr.project_id = r.project_id
+            ), '[]'::jsonb),
+            MAX(r.created_at)
+        FROM work_records r
+        WHERE r.employee_id IS NOT NULL AND r.project_id IS NOT NULL
+        GROUP BY r.employee_id, r.work_date, r.project_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_daily_project_summary_id'), table_name='daily_project_summary')
+    op.drop_table('daily_project_summary')
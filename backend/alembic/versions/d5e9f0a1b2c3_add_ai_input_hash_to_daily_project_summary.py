@@ -0,0 +1,28 @@
+"""add_ai_input_hash_to_daily_project_summary
+
+Revision ID: d5e9f0a1b2c3
+Revises: c4d8e9f0a1b2
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e9f0a1b2c3'
+down_revision: Union[str, Sequence[str], None] = 'c4d8e9f0a1b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add ai_input_hash column to daily_project_summary table."""
+    op.add_column('daily_project_summary', sa.Column('ai_input_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove ai_input_hash column from daily_project_summary table."""
+    op.drop_column('daily_project_summary', 'ai_input_hash')
@@ -0,0 +1,67 @@
+"""add_review_inbox_table
+
+Revision ID: e0f4a5b6c7d8
+Revises: d9e3f4a5b6c7
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e0f4a5b6c7d8'
+down_revision: Union[str, Sequence[str], None] = 'd9e3f4a5b6c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('review_inbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('supervisor_id', sa.Integer(), nullable=False),
+    sa.Column('report_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('status', postgresql.ENUM('pending', 'approved', name='approvalstatus', create_type=False), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['supervisor_id'], ['employees.id'], ),
+    sa.ForeignKeyConstraint(['report_id'], ['daily_reports.id'], ),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('supervisor_id', 'report_id', name='unique_review_inbox_supervisor_report')
+    )
+    op.create_index(op.f('ix_review_inbox_id'), 'review_inbox', ['id'], unique=False)
+    op.create_index('ix_review_inbox_supervisor_status_date', 'review_inbox', ['supervisor_id', 'status', 'date', 'report_id'], unique=False)
+
+    # 回填既有日報：每份日報對其所有上級主管 (遞迴) 各一筆，狀態取自既有審核記錄
+    op.execute("""
+        WITH RECURSIVE chain(report_id, employee_id, date, empno) AS (
+            SELECT r.id, r.employee_id, r.date, s.supervisor
+            FROM daily_reports r
+            JOIN employees e ON e.id = r.employee_id
+            JOIN supervisors s ON s.empno = e.empno
+            UNION
+            SELECT c.report_id, c.employee_id, c.date, s.supervisor
+            FROM chain c
+            JOIN supervisors s ON s.empno = c.empno
+        )
+        INSERT INTO review_inbox (supervisor_id, report_id, employee_id, date, status)
+        SELECT sup.id, c.report_id, c.employee_id, c.date,
+               COALESCE(a.status, 'pending'::approvalstatus)
+        FROM chain c
+        JOIN employees sup ON sup.empno = c.empno
+        LEFT JOIN report_approvals a ON a.report_id = c.report_id AND a.supervisor_id = sup.id
+        ON CONFLICT ON CONSTRAINT unique_review_inbox_supervisor_report DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_review_inbox_supervisor_status_date', table_name='review_inbox')
+    op.drop_index(op.f('ix_review_inbox_id'), table_name='review_inbox')
+    op.drop_table('review_inbox')
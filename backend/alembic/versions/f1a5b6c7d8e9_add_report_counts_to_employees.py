@@ -0,0 +1,56 @@
+"""add_report_counts_to_employees
+
+Revision ID: f1a5b6c7d8e9
+Revises: e0f4a5b6c7d8
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a5b6c7d8e9'
+down_revision: Union[str, Sequence[str], None] = 'e0f4a5b6c7d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('employees', sa.Column('direct_report_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('employees', sa.Column('total_report_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+    # 回填既有資料 (與 supervisor_service.refresh_report_counts 相同的計算)
+    op.execute("""
+        WITH RECURSIVE report_closure(ancestor, descendant) AS (
+            SELECT supervisor, empno FROM supervisors
+            UNION
+            SELECT c.ancestor, s.empno
+            FROM report_closure c
+            JOIN supervisors s ON s.supervisor = c.descendant
+        ),
+        direct_reports AS (
+            SELECT supervisor AS empno, COUNT(DISTINCT empno) AS n FROM supervisors GROUP BY supervisor
+        ),
+        total_reports AS (
+            SELECT ancestor AS empno, COUNT(*) AS n FROM report_closure GROUP BY ancestor
+        )
+        UPDATE employees e
+        SET direct_report_count = COALESCE((SELECT n FROM direct_reports d WHERE d.empno = e.empno), 0),
+            total_report_count = COALESCE((SELECT n FROM total_reports t WHERE t.empno = e.empno), 0)
+    """)
+    op.execute("""
+        UPDATE users u
+        SET is_supervisor = EXISTS (
+            SELECT 1 FROM employees e WHERE e.user_id = u.id AND e.direct_report_count > 0
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('employees', 'total_report_count')
+    op.drop_column('employees', 'direct_report_count')
@@ -0,0 +1,34 @@
+"""purge_placeholder_chunk_summaries
+
+Revision ID: f7a1b2c3d4e5
+Revises: e6f0a1b2c3d4
+Create Date: 2026-10-19 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a1b2c3d4e5'
+down_revision: Union[str, Sequence[str], None] = 'e6f0a1b2c3d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 先前模型回傳空白時會快取替代文字，刪除後這些片段在下次潤飾時重新摘要
+    op.execute(
+        sa.text(
+            "DELETE FROM ai_chunk_summaries WHERE summary = '無法從 AI 服務獲取內容' OR btrim(summary) = ''"
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 刪除的只是快取，不需復原
+    pass
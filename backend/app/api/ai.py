@@ -0,0 +1,33 @@
+# backend/app/api/ai.py
+
+from fastapi import APIRouter, Depends
+
+from app.core import deps
+from app.core import circuit_breaker, single_flight
+from app.models.user import User
+from app.services import ai_rate_limit_service, structured_output_service
+
+router = APIRouter(tags=["AI"])
+
+@router.get("/health")
+async def get_ai_health():
+    """
+    外部 AI 服務的斷路器狀態 (本 worker，不需登入以便健康檢查使用)。
+    任一斷路器非 closed 時 status 為 degraded，此時相關功能會直接使用本機的替代結果。
+    """
+    breakers = circuit_breaker.snapshot_all()
+    degraded = any(b["state"] != circuit_breaker.CLOSED for b in breakers.values())
+    return {"status": "degraded" if degraded else "ok", "breakers": breakers}
+
+@router.get("/metrics")
+async def get_ai_metrics(current_user: User = Depends(deps.get_current_user)):
+    """
+    AI 請求限流統計 (本 worker)：RPM/TPM 上限、排隊深度與等待時間、
+    被節流 (429) 次數、重試次數與最終失敗次數、相同請求的合併次數，
+    以及結構化回應的解析失敗率與改用替代結果的比率。
+    """
+    return {
+        **ai_rate_limit_service.limiter.snapshot(),
+        "single_flight": single_flight.snapshot_all(),
+        "structured_output": structured_output_service.snapshot_all(),
+    }
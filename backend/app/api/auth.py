@@ -5,9 +5,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
 from app.core.database import get_db
-from app.schemas.user import LoginResponse, User as UserSchema
-from app.services import user_service
-from app.core.security import create_access_token, verify_password
+from app.schemas.user import LoginResponse, RefreshTokenRequest, User as UserSchema
+from app.services import user_service, token_service
+from app.core.security import create_access_token, access_token_claims, verify_password
 
 router = APIRouter(tags=["Authentication"])
 
@@ -22,8 +22,41 @@ async def login_for_access_token(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect employee ID or password",
         )
-    access_token = create_access_token(data={"sub": form_data.username})
+    access_token = create_access_token(data=access_token_claims(user))
+    refresh_token, _ = await token_service.issue_refresh_token(db, user_id=user.id)
+    await db.commit()
     return {
-        "token": {"access_token": access_token, "token_type": "bearer"},
+        "token": {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token},
         "user": UserSchema.from_orm(user)
-    }
\ No newline at end of file
+    }
+
+@router.post("/refresh", response_model=LoginResponse)
+async def refresh_access_token(
+    request_body: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    以 refresh token 換發新的 access token (不需重新輸入密碼)。
+    每次使用後 refresh token 都會輪替，舊的立即失效。
+    """
+    rotated = await token_service.rotate_refresh_token(db, raw_token=request_body.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+        )
+    user, new_refresh_token = rotated
+    access_token = create_access_token(data=access_token_claims(user))
+    return {
+        "token": {"access_token": access_token, "token_type": "bearer", "refresh_token": new_refresh_token},
+        "user": UserSchema.from_orm(user)
+    }
+
+@router.post("/logout", status_code=204)
+async def logout(
+    request_body: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """撤銷 refresh token"""
+    await token_service.revoke_refresh_token(db, raw_token=request_body.refresh_token)
+    return
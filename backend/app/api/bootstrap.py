@@ -0,0 +1,51 @@
+# backend/app/api/bootstrap.py
+
+import asyncio
+from fastapi import APIRouter, Depends
+
+from app.core.database import AsyncSessionFactory
+from app.core import deps
+from app.models.user import User
+from app.schemas.bootstrap import TodayBootstrap
+from app.services import records_service, projects_service, supervisor_service
+from app.api.records import get_writing_status
+
+router = APIRouter(tags=["Bootstrap"])
+
+async def _run_in_own_session(func, **kwargs):
+    """
+    AsyncSession 不能同時執行多個查詢，
+    因此每個並行的讀取各自使用一個獨立的 session。
+    """
+    async with AsyncSessionFactory() as session:
+        return await func(db=session, **kwargs)
+
+async def _get_projects(db, employee):
+    if employee.cocode == 'A':
+        return await projects_service.get_projects_for_employee(db=db, employee=employee)
+    return await projects_service.get_all_active(db=db)
+
+@router.get("/today", response_model=TodayBootstrap)
+async def get_today_bootstrap(
+    current_user: User = Depends(deps.get_current_user_with_employee)
+):
+    """
+    日報頁面的初始資料：一次請求取代
+    /records/consolidated/today、/records/writing-status、/projects/、
+    /supervisor/employee-editing-status 與 /supervisor/has-subordinates。
+    各項資料庫讀取彼此獨立，以並行方式執行。
+    """
+    employee = current_user.employee
+    consolidated, projects, editing_status = await asyncio.gather(
+        _run_in_own_session(records_service.get_consolidated_today, employee_id=employee.id),
+        _run_in_own_session(_get_projects, employee=employee),
+        _run_in_own_session(supervisor_service.check_employee_editing_permissions, employee_id=employee.id),
+    )
+    return {
+        "consolidated": consolidated,
+        "writing_status": await get_writing_status(),
+        "projects": projects,
+        "editing_status": editing_status,
+        # 下屬人數由組織同步時維護，不需另外查詢
+        "has_subordinates": employee.direct_report_count > 0,
+    }
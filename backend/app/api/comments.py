@@ -1,5 +1,5 @@
 # backend/app/api/comments.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
@@ -9,6 +9,7 @@ from app.core import deps
 from app.models import User, DailyReport, Employee
 from app.schemas.review_comment import ReviewComment, ReviewCommentCreate
 from app.services import comment_service, supervisor_service
+from app.core.http_cache import make_etag, conditional_response
 
 router = APIRouter(tags=["Comments"])
 
@@ -97,6 +98,8 @@ async def create_new_comment(
 @router.get("/reports/{report_id}/comments")
 async def list_comments_for_report(
     report_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user),
 ):
@@ -105,6 +108,11 @@ async def list_comments_for_report(
     """
     # 檢查權限
     await check_report_access(report_id, current_user, db)
+
+    version = await comment_service.get_comments_version(db=db, report_id=report_id)
+    not_modified = conditional_response(request, response, make_etag("comments", report_id, *version))
+    if not_modified:
+        return not_modified
     
     try:
         comments = await comment_service.get_comments_for_report(db=db, report_id=report_id)
@@ -1,8 +1,9 @@
 # backend/app/api/documents.py
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request
 from app.services import document_analysis_service
-from app.core import deps
+from app.core import deps, deadline
+from app.core.config import settings
 from app.models.user import User
 
 # --- 關鍵修正：移除這裡的 prefix ---
@@ -13,6 +14,7 @@ router = APIRouter(
 # --- 確保 API 受保護 ---
 @router.post("/analyze", response_model=str)
 async def analyze_document(
+    request: Request,
     file: UploadFile = File(...),
     current_user: User = Depends(deps.get_current_user) # <-- 確保端點受保護
 ):
@@ -23,6 +25,10 @@ async def analyze_document(
     if not file.content_type:
         raise HTTPException(status_code=400, detail="無法識別檔案類型")
         
-    extracted_content = await document_analysis_service.analyze_document_from_stream(file.file)
+    extracted_content = await deadline.run(
+        request,
+        settings.DEADLINE_DOCUMENT_ANALYZE_SECONDS,
+        lambda: document_analysis_service.analyze_document_from_stream(file.file),
+    )
     
     return extracted_content
\ No newline at end of file
@@ -0,0 +1,67 @@
+# backend/app/api/events.py
+
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from app.core.database import AsyncSessionFactory
+from app.core import deps
+from app.services import event_service
+
+router = APIRouter(tags=["Events"])
+
+# 定期送出註解行，避免代理伺服器因閒置而中斷連線
+HEARTBEAT_SECONDS = 15
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    token: str = Query(..., description="access token (EventSource 無法自訂標頭)"),
+):
+    """
+    Server-Sent Events 通知串流。
+    員工會收到自己日報的審核與留言事件；主管另外會收到下屬的提交與留言事件。
+    前端收到事件後再重新讀取對應資料，取代定時輪詢。
+    """
+    # 驗證完即關閉 session，避免長連線佔用資料庫連線
+    async with AsyncSessionFactory() as db:
+        user = await deps.get_user_from_token(db, token)
+    if user is None or not user.employee:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+
+    employee_id = user.employee.id
+    channels = [
+        event_service.employee_channel(employee_id),
+        event_service.supervisor_channel(employee_id),
+    ]
+
+    async def event_generator():
+        subscription = event_service.subscribe(channels)
+        next_event = None
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                if next_event is None:
+                    next_event = asyncio.ensure_future(subscription.__anext__())
+                done, _ = await asyncio.wait({next_event}, timeout=HEARTBEAT_SECONDS)
+                if not done:
+                    yield ": heartbeat\n\n"
+                    continue
+                event = next_event.result()
+                next_event = None
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            if next_event is not None:
+                next_event.cancel()
+                try:
+                    await next_event
+                except (asyncio.CancelledError, StopAsyncIteration):
+                    pass
+            await subscription.aclose()
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,6 +1,6 @@
 # backend/app/api/projects.py
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy import select
@@ -12,6 +12,8 @@ from app.services import projects_service
 from app.core import deps
 from app.models.user import User
 from app.models.employee import Employee
+from app.core.cache import get_generation, ORG_DATA
+from app.core.http_cache import make_etag, conditional_response
 
 # --- ↓↓↓ 確保這一段程式碼存在 ↓↓↓ ---
 router = APIRouter(tags=["Projects"])
@@ -19,6 +21,8 @@ router = APIRouter(tags=["Projects"])
 
 @router.get("/", response_model=List[Project])
 async def get_active_projects(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user)
 ):
@@ -26,8 +30,16 @@ async def get_active_projects(
     取得當前用戶可用的工作計畫列表 (根據部門過濾)。
     僅限公司別A的員工。
     """
+    is_company_a = bool(current_user.employee and current_user.employee.cocode == 'A')
+    generation = await get_generation(db, ORG_DATA)
+    etag = make_etag("projects", generation, current_user.employee.empno if is_company_a else "all")
+    # 每次載入都以 ETag 驗證 (private, no-cache)，同步或新增專案後立即生效；未變更時只回傳 304
+    not_modified = conditional_response(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+
     # 如果用戶有關聯員工且為公司別A
-    if current_user.employee and current_user.employee.cocode == 'A':
+    if is_company_a:
         return await projects_service.get_projects_for_employee(db=db, employee=current_user.employee)
     
     # 如果沒有員工資訊或非公司別A，返回所有通用專案
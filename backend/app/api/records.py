@@ -1,35 +1,37 @@
 # backend/app/api/records.py
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from datetime import datetime, time, timedelta
+from typing import List, Optional
 
 from app.core.database import get_db
-from app.schemas.work_record import WorkRecord, WorkRecordCreate, WorkRecordInList, FileAttachment, ConsolidatedReport, WorkRecordUpdate, AIEnhanceRequest, ConsolidatedReportUpdate
+from app.schemas.work_record import WorkRecord, WorkRecordCreate, WorkRecordBatchCreate, WorkRecordInList, FileAttachment, ConsolidatedReport, WorkRecordUpdate, AIEnhanceRequest, ConsolidatedReportUpdate
 from app.services import records_service, file_service, azure_ai_service
 from app.core import deps
 from app.models.user import User
+from app.core.http_cache import make_etag, conditional_response
+from app.core.workday import business_now, work_date_for
+from app.core.config import settings
+from app.core import deadline
 
 router = APIRouter(tags=["Work Records"])
 
 def check_writing_time_allowed() -> tuple[bool, str]:
     """
     檢查當前時間是否允許填寫日報
-    填寫時間：早上8:30到隔天早上8:30
+    填寫時間：早上8:30到隔天早上8:30 (分界時間與時區見 settings.WORKDAY_CUTOFF / BUSINESS_TIMEZONE)
     
     Returns:
         tuple[bool, str]: (是否允許填寫, 提示訊息)
     """
-    now = datetime.now()
-    current_time = now.time()
+    now = business_now()
+    work_date = work_date_for(now)
     
     # 實際上任何時間都可以填寫，但會給予不同的提示訊息
-    if current_time >= time(8, 30):
-        return True, f"正在填寫 {now.strftime('%Y-%m-%d')} 的日報"
+    if work_date == now.date():
+        return True, f"正在填寫 {work_date.strftime('%Y-%m-%d')} 的日報"
     else:
-        yesterday = now - timedelta(days=1)
-        return True, f"正在填寫 {yesterday.strftime('%Y-%m-%d')} 的日報（延長填寫時間）"
+        return True, f"正在填寫 {work_date.strftime('%Y-%m-%d')} 的日報（延長填寫時間）"
 
 @router.get("/writing-status")
 async def get_writing_status():
@@ -38,7 +40,7 @@ async def get_writing_status():
     return {
         "allowed": allowed,
         "message": message,
-        "current_time": datetime.now().strftime('%H:%M')
+        "current_time": business_now().strftime('%H:%M')
     }
 
 # upload 端點不變
@@ -55,31 +57,66 @@ async def create_work_record(
     current_user: User = Depends(deps.get_current_user_with_employee)
 ):
     employee_id = current_user.employee.id
-    new_record = await records_service.create(db=db, obj_in=record_in, employee_id=employee_id)
+    try:
+        new_record = await records_service.create(db=db, obj_in=record_in, employee_id=employee_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return new_record
 
+@router.post("/batch", response_model=List[WorkRecord], status_code=201)
+async def create_work_records_batch(
+    *,
+    db: AsyncSession = Depends(get_db),
+    batch_in: WorkRecordBatchCreate,
+    current_user: User = Depends(deps.get_current_user_with_employee)
+):
+    """
+    一次新增多筆工作紀錄 (單一交易)，依傳入順序回傳新增的紀錄。
+    任一筆的專案不存在時整批都不會寫入。
+    """
+    if not batch_in.items:
+        return []
+    try:
+        return await records_service.create_many(
+            db=db, objs_in=batch_in.items, employee_id=current_user.employee.id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/today", response_model=List[WorkRecordInList])
 async def get_today_records(
     *,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user_with_employee)
 ):
     employee_id = current_user.employee.id
+    version = await records_service.get_today_version(db=db, employee_id=employee_id)
+    not_modified = conditional_response(request, response, make_etag("records-today", employee_id, *version))
+    if not_modified:
+        return not_modified
     records = await records_service.get_multi_by_employee_today(db=db, employee_id=employee_id)
     return records
 
 @router.get("/consolidated/today", response_model=List[ConsolidatedReport])
 async def get_consolidated_today_records(
     *,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user_with_employee)
 ):
     employee_id = current_user.employee.id
+    version = await records_service.get_today_version(db=db, employee_id=employee_id)
+    not_modified = conditional_response(request, response, make_etag("consolidated-today", employee_id, *version))
+    if not_modified:
+        return not_modified
     consolidated_reports = await records_service.get_consolidated_today(db=db, employee_id=employee_id)
     return consolidated_reports
 
 # --- ↓↓↓ 已重構的 PUT 端點 ↓↓↓ ---
-@router.put("/consolidated/{project_id}", status_code=204)
+@router.put("/consolidated/{project_id}", response_model=ConsolidatedReport)
 async def update_consolidated_report_endpoint(
     project_id: int,
     report_in: ConsolidatedReportUpdate,
@@ -87,11 +124,11 @@ async def update_consolidated_report_endpoint(
     current_user: User = Depends(deps.get_current_user_with_employee)
 ):
     """
-    更新指定專案的彙整報告內容，包含檔案列表。
+    更新指定專案的彙整報告內容，包含檔案列表，並回傳更新後的報告。
     """
     try:
         
-        success = await records_service.update_consolidated_report(
+        report = await records_service.update_consolidated_report(
             db=db,
             project_id=project_id,
             content=report_in.content,
@@ -99,11 +136,11 @@ async def update_consolidated_report_endpoint(
             employee_id=current_user.employee.id
         )
         
-        if not success:
+        if report is None:
             print(f"DEBUG: 更新失敗 - 找不到對應的專案或記錄")
             raise HTTPException(status_code=404, detail="找不到對應的專案或記錄可更新")
         
-        return
+        return report
         
     except HTTPException:
         raise
@@ -113,29 +150,60 @@ async def update_consolidated_report_endpoint(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"內部服務器錯誤: {str(e)}")
 
+# AI 潤飾失敗原因對應的 HTTP 狀態碼 (超過用量為 429，其餘為服務無法使用)
+_AI_ERROR_STATUS = {
+    azure_ai_service.ENHANCE_RATE_LIMITED: 429,
+    azure_ai_service.ENHANCE_FAILED: 502,
+}
+
+def _raise_for_ai_error(error: Optional[str]) -> None:
+    if error:
+        raise HTTPException(
+            status_code=_AI_ERROR_STATUS.get(error, 503),
+            detail=azure_ai_service.ENHANCE_ERROR_MESSAGES.get(error, "AI 服務暫時無法使用，請稍後再試。"),
+        )
+
 @router.post("/ai/enhance", response_model=str)
 async def enhance_report_with_ai(
     *,
+    request: Request,
     request_body: AIEnhanceRequest
 ):
     """
     將報告內容傳送給 AI 進行潤飾。
     """
-    enhanced_content = await azure_ai_service.get_ai_enhanced_report(
-        original_content=request_body.content,
-        project_name=request_body.project_name
+    enhanced = await deadline.run(
+        request,
+        settings.DEADLINE_ENHANCE_SECONDS,
+        lambda: azure_ai_service.get_ai_enhanced_report(
+            original_content=request_body.content,
+            project_name=request_body.project_name
+        ),
     )
-    return enhanced_content
+    _raise_for_ai_error(enhanced.error)
+    return enhanced.content
 
 @router.post("/ai/enhance_all", response_model=List[ConsolidatedReport])
 async def enhance_all_reports_with_ai(
+    request: Request,
+    batched: Optional[bool] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user_with_employee)
 ):
-    """一鍵潤飾今天所有的彙整報告"""
+    """
+    一鍵潤飾今天所有的彙整報告 (batched=true 時多個專案合併成一次 AI 請求)。
+    超過時間預算時回傳已完成的部分，未潤飾的專案標記 ai_deadline_exceeded。
+    潤飾失敗的專案保留原本的 AI 內容並以 ai_error 標記失敗原因。
+    """
     print(f"[API] /ai/enhance_all 被呼叫 - user_id: {current_user.id}, employee_id: {current_user.employee.id}")
     try:
-        result = await records_service.enhance_all_today(db=db, employee_id=current_user.employee.id)
+        result = await deadline.run(
+            request,
+            settings.DEADLINE_ENHANCE_ALL_SECONDS,
+            lambda: records_service.enhance_all_today(
+                db=db, employee_id=current_user.employee.id, batched=batched
+            ),
+        )
         print(f"[SUCCESS] API: enhance_all_today 執行成功，返回 {len(result)} 個報告")
         return result
     except Exception as e:
@@ -148,16 +216,22 @@ async def enhance_all_reports_with_ai(
 @router.post("/ai/enhance_one/{project_id}", response_model=ConsolidatedReport)
 async def enhance_one_report_with_ai(
     project_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user_with_employee)
 ):
-    """潤飾今天單一一個專案報告"""
-    enhanced_report = await records_service.enhance_one_today(
-        db=db, 
-        employee_id=current_user.employee.id, 
-        project_id=project_id
+    """潤飾今天單一一個專案報告；AI 服務超過用量時回傳 429，無法使用時回傳 503"""
+    enhanced_report = await deadline.run(
+        request,
+        settings.DEADLINE_ENHANCE_ONE_SECONDS,
+        lambda: records_service.enhance_one_today(
+            db=db, 
+            employee_id=current_user.employee.id, 
+            project_id=project_id
+        ),
     )
     if not enhanced_report:
         raise HTTPException(status_code=404, detail="找不到該專案今日的報告紀錄")
+    _raise_for_ai_error(enhanced_report.ai_error)
     return enhanced_report
 
@@ -1,31 +1,40 @@
 # backend/app/api/supervisor.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 import datetime
 from app.core.database import get_db
-from app.schemas.supervisor import EmployeeForList, DailyReportDetail, ReportReviewCreate
+from app.schemas.supervisor import EmployeeForList, DailyReportDetail, ReportReviewCreate, ReviewInboxPage, ReportReviewBatchRequest, ReportReviewBatchResult
 from app.schemas.employee import Employee as EmployeeDetailSchema
 from app.schemas.work_record import ConsolidatedReport
 from app.schemas.report_approval import SupervisorApprovalInfo
-from app.services import supervisor_service, ai_suggestion_service
-from app.core import deps
+from app.services import supervisor_service, ai_suggestion_service, ai_rate_limit_service, context_summary_service
+from app.core import deps, deadline
+from app.core.config import settings
 from app.models.user import User
+from app.core.http_cache import make_etag, conditional_response
+from app.models.report_approval import ApprovalStatus
 
 router = APIRouter(tags=["Supervisor"])
 
 @router.get("/has-subordinates")
 async def check_has_subordinates(
     db: AsyncSession = Depends(get_db), 
-    current_user: User = Depends(deps.get_current_user)
+    token: str = Depends(deps.oauth2_scheme)
 ):
-    """檢查當前用戶是否有下屬"""
-    if not current_user.employee:
+    """檢查當前用戶是否有下屬 (直接讀取 access token 內的下屬人數，不查詢資料庫)"""
+    claims = deps.decode_access_token(token)
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    if "direct_report_count" in claims:
+        return {"has_subordinates": claims["direct_report_count"] > 0}
+
+    # 舊版 token 或使用者沒有員工資料：改讀員工的下屬人數欄位
+    current_user = await deps.get_user_from_token(db, token)
+    if not current_user or not current_user.employee:
         return {"has_subordinates": False}
-    
-    subordinates = await supervisor_service.get_direct_subordinates(db, current_user.employee.id)
-    return {"has_subordinates": len(subordinates) > 0}
+    return {"has_subordinates": current_user.employee.direct_report_count > 0}
 
 @router.get("/employees", response_model=List[EmployeeForList])
 async def get_employees_for_supervisor(db: AsyncSession = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
@@ -34,6 +43,29 @@ async def get_employees_for_supervisor(db: AsyncSession = Depends(get_db), curre
     employees = await supervisor_service.get_employees_with_pending_reports(db=db, supervisor_id=current_user.employee.id)
     return employees
 
+@router.get("/inbox", response_model=ReviewInboxPage)
+async def get_review_inbox(
+    status: Optional[ApprovalStatus] = None,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    主管待審清單 (分頁)，附帶待審與已審數量。
+    status=pending 只列出待審核、status=approved 只列出已審核的日報；
+    不帶 status 參數時不篩選，列出全部日報。
+    """
+    if not current_user.employee:
+        raise HTTPException(status_code=404, detail="該用戶不是員工")
+    return await supervisor_service.get_review_inbox(
+        db=db,
+        supervisor_id=current_user.employee.id,
+        status=status,
+        limit=limit,
+        offset=offset
+    )
+
 @router.get("/employees/{employee_id}", response_model=EmployeeDetailSchema)
 async def get_employee_details_for_supervisor(
     employee_id: int,
@@ -56,11 +88,7 @@ async def review_report(
     if not current_user.employee:
         raise HTTPException(status_code=404, detail="該用戶不是員工")
     
-    # 檢查是否有下屬（實際的主管權限檢查）
-    has_subordinates = await supervisor_service.get_direct_subordinates(db, current_user.employee.id)
-    if not has_subordinates:
-        raise HTTPException(status_code=403, detail="您沒有下屬，無法審核日報")
-    
+    # 權限 (日報員工須為直屬或間接下級) 由 review_daily_report 在同一個查詢中檢查
     try:
         reviewed_report = await supervisor_service.review_daily_report(
             db=db, 
@@ -69,12 +97,33 @@ async def review_report(
             reviewer=current_user
         )
         if not reviewed_report:
-            raise HTTPException(status_code=404, detail="找不到該日報")
+            raise HTTPException(status_code=404, detail="找不到該日報或沒有權限審核")
         return reviewed_report
     except ValueError as e:
         # 處理重複評分的錯誤
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/reports/review-batch", response_model=List[ReportReviewBatchResult])
+async def review_reports_batch(
+    batch_in: ReportReviewBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    一次審核多份日報 (單一交易)，回傳每份日報各自的結果。
+    無權限或已審核過的日報不影響其他日報的審核。
+    """
+    if not current_user.employee:
+        raise HTTPException(status_code=404, detail="該用戶不是員工")
+    if not batch_in.items:
+        return []
+
+    return await supervisor_service.review_daily_reports_batch(
+        db=db,
+        items=batch_in.items,
+        reviewer=current_user
+    )
+
 @router.post("/reports/submit", response_model=DailyReportDetail)
 async def submit_daily_report_for_review(
     submitted_reports: List[ConsolidatedReport],
@@ -127,23 +176,36 @@ async def get_my_reports_by_date(
 @router.get("/reports/{report_id}", response_model=DailyReportDetail)
 async def get_report_by_id(
     report_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user)
 ):
     """
     根據報告ID獲取特定的日報詳情
     """
+    version = await supervisor_service.get_report_version(db=db, report_id=report_id)
+    if version is not None:
+        not_modified = conditional_response(request, response, make_etag("report", report_id, *version))
+        if not_modified:
+            return not_modified
     return await supervisor_service.get_report_by_id(db=db, report_id=report_id)
 
 @router.get("/reports/{report_id}/approvals", response_model=List[SupervisorApprovalInfo])
 async def get_report_approval_status(
     report_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user)
 ):
     """
     獲取指定日報的所有主管審核狀態
     """
+    version = await supervisor_service.get_report_approval_version(db=db, report_id=report_id)
+    not_modified = conditional_response(request, response, make_etag("approvals", report_id, *version))
+    if not_modified:
+        return not_modified
     return await supervisor_service.get_report_approval_status(db=db, report_id=report_id)
 
 @router.get("/employee-editing-status")
@@ -167,6 +229,7 @@ async def get_employee_editing_status(
 @router.post("/reports/{report_id}/ai-suggestions")
 async def get_ai_reply_suggestions(
     report_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user)
 ):
@@ -211,14 +274,22 @@ async def get_ai_reply_suggestions(
         elif report.employee and hasattr(report.employee, 'name'):
             employee_name = report.employee.name
         
-        # TODO: 可以在此處添加獲取最近兩天報告的邏輯作為上下文
-        recent_context = None
+        # 員工前幾天的日報摘要 (提交日報時已增量更新，只需一次主鍵查詢)
+        recent_context = await context_summary_service.get_recent_context(
+            db, employee_id=report.employee_id, before=report.date
+        )
         
-        # 生成AI建議
-        suggestions = await ai_suggestion_service.generate_supervisor_reply_suggestions(
-            report_content=report_content,
-            employee_name=employee_name,
-            recent_context=recent_context
+        # 生成AI建議 (依主管公平排隊)
+        ai_rate_limit_service.current_user_key.set(f"employee:{current_user.employee.id}")
+        # 超過時間預算時 ai_suggestion_service 改用本機產生的建議
+        suggestions = await deadline.run(
+            request,
+            settings.DEADLINE_SUGGESTIONS_SECONDS,
+            lambda: ai_suggestion_service.generate_supervisor_reply_suggestions(
+                report_content=report_content,
+                employee_name=employee_name,
+                recent_context=recent_context
+            ),
         )
         
         return {"suggestions": suggestions}
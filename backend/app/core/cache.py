@@ -0,0 +1,73 @@
+# backend/app/core/cache.py
+
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.data_version import DataVersion
+
+# 由 sync_company_a_data.py 維護的組織/專案資料版本
+ORG_DATA = "org_data"
+
+# 版本號在本機程序內的快取秒數，避免每個請求都查一次 data_versions
+GENERATION_TTL_SECONDS = 5.0
+
+_generation_memo: Dict[str, Tuple[int, float]] = {}
+
+
+async def get_generation(db: AsyncSession, name: str = ORG_DATA) -> int:
+    """取得資料版本號 (短暫快取於程序內)"""
+    memo = _generation_memo.get(name)
+    now = time.monotonic()
+    if memo and now - memo[1] < GENERATION_TTL_SECONDS:
+        return memo[0]
+
+    result = await db.execute(select(DataVersion.version).where(DataVersion.name == name))
+    version = result.scalar_one_or_none() or 0
+    _generation_memo[name] = (version, now)
+    return version
+
+
+async def bump_generation(db: AsyncSession, name: str = ORG_DATA) -> int:
+    """
+    遞增資料版本號，讓所有程序中依此版本的快取失效，回傳新的版本號。
+    與資料異動在同一個交易中執行，呼叫端負責 commit。
+    """
+    stmt = insert(DataVersion).values(name=name, version=1).on_conflict_do_update(
+        index_elements=[DataVersion.name],
+        set_={"version": DataVersion.version + 1},
+    ).returning(DataVersion.version)
+    result = await db.execute(stmt)
+    _generation_memo.pop(name, None)
+    return result.scalar_one()
+
+
+class VersionedCache:
+    """
+    以版本號控制失效的記憶體快取。
+    版本號改變時整個快取一次清空，不需要逐筆追蹤失效。
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        self._entries: Dict[Hashable, Any] = {}
+        self._generation: Optional[int] = None
+        self._max_entries = max_entries
+
+    def get(self, key: Hashable, generation: int) -> Optional[Any]:
+        if generation != self._generation:
+            return None
+        return self._entries.get(key)
+
+    def set(self, key: Hashable, generation: int, value: Any) -> None:
+        if generation != self._generation:
+            self._entries = {}
+            self._generation = generation
+        if len(self._entries) >= self._max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = value
+
+    def clear(self) -> None:
+        self._entries = {}
+        self._generation = None
@@ -0,0 +1,145 @@
+# backend/app/core/circuit_breaker.py
+
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """斷路器開啟中，請求未送出"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} 斷路器開啟中，{retry_in:.1f} 秒後再試")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    外部服務的斷路器 (程序內)：
+    - closed: 正常放行；連續失敗達 failure_threshold 次即開啟
+    - open: 直接拋出 CircuitOpenError，呼叫端立即改用本機的替代結果
+    - half_open: 開啟 recovery_seconds 秒後只放行一個探測請求，成功則關閉，失敗則重新開啟
+    只有代表服務異常的錯誤 (逾時、連線失敗、5xx) 計入失敗；服務有回應的錯誤 (4xx、429) 不影響斷路器。
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+        self.total_failures = 0
+        self.short_circuited = 0
+        self.times_opened = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at >= self.recovery_seconds:
+            return HALF_OPEN
+        return OPEN
+
+    def raise_if_open(self) -> None:
+        """開啟中時拋出 CircuitOpenError (不佔用半開的探測名額)，供排隊等待前快速失敗"""
+        if self.state == OPEN:
+            self.short_circuited += 1
+            raise CircuitOpenError(self.name, max(self.opened_at + self.recovery_seconds - time.monotonic(), 0.0))
+
+    def before_call(self) -> None:
+        """請求送出前檢查，不允許時拋出 CircuitOpenError"""
+        state = self.state
+        if state == CLOSED:
+            return
+        if state == HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            print(f"[INFO] {self.name} 斷路器半開，送出探測請求")
+            return
+        self.short_circuited += 1
+        retry_in = max(self.opened_at + self.recovery_seconds - time.monotonic(), 0.0)
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            print(f"[SUCCESS] {self.name} 探測成功，斷路器關閉")
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self, error: Exception) -> None:
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"[:200]
+        if self.probe_in_flight or (self.opened_at is None and self.consecutive_failures >= self.failure_threshold):
+            self.times_opened += 1
+            self.opened_at = time.monotonic()
+            print(f"[WARNING] {self.name} 斷路器開啟 (連續失敗 {self.consecutive_failures} 次): {self.last_error}")
+        self.probe_in_flight = False
+
+    @asynccontextmanager
+    async def guard(self, is_failure: Callable[[Exception], bool] = lambda e: True):
+        """
+        包住一次外部呼叫：開啟中時拋出 CircuitOpenError；
+        結束後依結果記錄成功或失敗 (is_failure 判斷例外是否代表服務異常)。
+        """
+        self.before_call()
+        try:
+            yield
+        except DeadlineExceeded:
+            # 請求本身的時間預算用完，不代表服務異常
+            self.probe_in_flight = False
+            raise
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure(e)
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # 請求被取消：探測沒有結果，讓下一個請求重新探測
+            self.probe_in_flight = False
+            raise
+        else:
+            self.record_success()
+
+    def snapshot(self) -> Dict:
+        state = self.state
+        retry_in = None
+        if state == OPEN:
+            retry_in = round(self.opened_at + self.recovery_seconds - time.monotonic(), 2)
+        return {
+            "state": state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_seconds": self.recovery_seconds,
+            "retry_in_seconds": retry_in,
+            "total_failures": self.total_failures,
+            "times_opened": self.times_opened,
+            "short_circuited": self.short_circuited,
+            "last_error": self.last_error,
+        }
+
+
+openai_breaker = CircuitBreaker(
+    "Azure OpenAI", settings.AI_CIRCUIT_FAILURE_THRESHOLD, settings.AI_CIRCUIT_RECOVERY_SECONDS
+)
+document_intelligence_breaker = CircuitBreaker(
+    "Document Intelligence", settings.AI_CIRCUIT_FAILURE_THRESHOLD, settings.AI_CIRCUIT_RECOVERY_SECONDS
+)
+
+
+def snapshot_all() -> Dict[str, Dict]:
+    return {
+        "azure_openai": openai_breaker.snapshot(),
+        "document_intelligence": document_intelligence_breaker.snapshot(),
+    }
@@ -26,6 +26,65 @@ class Settings(BaseSettings):
     # CORS origins (comma-separated). Example: http://localhost:5173,https://your.domain
     CORS_ORIGINS: str = ""
 
+    # 即時通知的事件分發方式: memory (單一 worker) 或 postgres (多 worker，使用 LISTEN/NOTIFY)
+    EVENT_BROKER: str = "memory"
+
+    # 工作日計算：公司時區與每日分界時間 (早於分界時間的紀錄屬於前一天)
+    BUSINESS_TIMEZONE: str = "Asia/Taipei"
+    WORKDAY_CUTOFF: str = "08:30"
+
+    # AI 潤飾的提示詞預算 (筆記 + 參考資料的 token 數，不含系統提示詞)
+    AI_PROMPT_TOKEN_BUDGET: int = 12000
+    # 參考文件切塊的大小 (token)
+    AI_REFERENCE_CHUNK_TOKENS: int = 400
+    # 依 BM25 相關度最多放入提示詞的參考片段數
+    AI_REFERENCE_TOP_K: int = 12
+    # 有參考資料時至少保留給參考資料的預算比例 (筆記過長時會被截斷)
+    AI_REFERENCE_MIN_SHARE: float = 0.5
+
+    # 一鍵潤飾預設是否將多個專案合併成一次請求 (可由 API 參數覆寫)
+    AI_ENHANCE_BATCH_MODE: bool = False
+    # 每次批次請求的專案數上限與輸出 token 上限
+    AI_ENHANCE_BATCH_SIZE: int = 8
+    AI_ENHANCE_BATCH_MAX_TOKENS: int = 8000
+
+    # Azure OpenAI 限流 (程序內，0 表示不限制) 與失敗重試
+    AI_RATE_LIMIT_RPM: int = 60
+    AI_RATE_LIMIT_TPM: int = 60000
+    AI_MAX_RETRIES: int = 3
+    AI_RETRY_BASE_SECONDS: float = 1.0
+    AI_RETRY_MAX_SECONDS: float = 30.0
+
+    # Azure OpenAI / Document Intelligence 斷路器：連續失敗幾次後開啟，開啟幾秒後送出探測請求
+    AI_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    AI_CIRCUIT_RECOVERY_SECONDS: float = 30.0
+
+    # 單一 Azure OpenAI / Document Intelligence 呼叫的逾時秒數
+    AI_REQUEST_TIMEOUT_SECONDS: float = 60.0
+    DOC_ANALYSIS_TIMEOUT_SECONDS: float = 60.0
+    # 各 AI 端點的時間預算 (秒)，用完時停止後續的 AI/OCR/資料庫工作並盡量回傳已完成的部分
+    DEADLINE_ENHANCE_SECONDS: float = 60.0
+    DEADLINE_ENHANCE_ONE_SECONDS: float = 90.0
+    DEADLINE_ENHANCE_ALL_SECONDS: float = 180.0
+    DEADLINE_SUGGESTIONS_SECONDS: float = 30.0
+    DEADLINE_DOCUMENT_ANALYZE_SECONDS: float = 90.0
+
+    # 大型附件的分段摘要 (map-reduce)：超過門檻的參考文件改用摘要
+    AI_SUMMARY_THRESHOLD_TOKENS: int = 8000
+    AI_SUMMARY_CHUNK_TOKENS: int = 3000
+    AI_SUMMARY_MAX_TOKENS: int = 400
+    AI_SUMMARY_REDUCE_MAX_TOKENS: int = 1200
+    # 同時進行的分段摘要請求數上限
+    AI_SUMMARY_CONCURRENCY: int = 4
+
+    # 員工近期日報的滾動摘要 (AI 回覆建議的上下文)：保留天數、總 token 上限、每天的 token 上限
+    AI_CONTEXT_MAX_DAYS: int = 5
+    AI_CONTEXT_MAX_TOKENS: int = 800
+    AI_CONTEXT_DAY_TOKENS: int = 150
+
+    # 組織快照檔目錄 (多個 worker 以 mmap 共用)，空白時使用系統暫存目錄
+    ORG_SNAPSHOT_DIR: str = ""
+
     @field_validator("DATABASE_URL", mode="before")
     def _clean_database_url(cls, v: str) -> str:
         if isinstance(v, str):
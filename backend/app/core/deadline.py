@@ -0,0 +1,128 @@
+# backend/app/core/deadline.py
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from fastapi import HTTPException, Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+# 目前請求的期限 (time.monotonic())，None 表示沒有時間預算
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+# 預算用完後留給下游收尾 (回傳部分結果) 的時間，超過即強制取消
+HARD_CANCEL_GRACE_SECONDS = 2.0
+# 檢查用戶端是否已中斷連線的間隔
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+class DeadlineExceeded(Exception):
+    """請求的時間預算已用完"""
+
+
+@contextmanager
+def scope(seconds: float):
+    """在此範圍內套用 seconds 秒的時間預算 (巢狀時取較早的期限)"""
+    new_deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(new_deadline if current is None else min(current, new_deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """剩餘秒數 (可能為負數)，沒有時間預算時回傳 None"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check() -> None:
+    """預算已用完時拋出 DeadlineExceeded"""
+    if expired():
+        raise DeadlineExceeded("請求的時間預算已用完")
+
+
+def timeout(default: Optional[float]) -> Optional[float]:
+    """單一下游呼叫的逾時秒數：default 與剩餘預算取較小者"""
+    left = remaining()
+    if left is None:
+        return default
+    left = max(left, 0.0)
+    return left if default is None else min(default, left)
+
+
+async def wait_for(aw: Awaitable[T], default_timeout: Optional[float]) -> T:
+    """
+    在 timeout(default_timeout) 秒內等待 aw。
+    因剩餘預算不足而逾時拋出 DeadlineExceeded；因 default_timeout 逾時則拋出 asyncio.TimeoutError (代表下游過慢)。
+    """
+    if expired():
+        if asyncio.iscoroutine(aw):
+            aw.close()
+        raise DeadlineExceeded("請求的時間預算已用完")
+    try:
+        return await asyncio.wait_for(aw, timeout(default_timeout))
+    except asyncio.TimeoutError:
+        if expired():
+            raise DeadlineExceeded("請求的時間預算已用完") from None
+        raise
+
+
+async def set_statement_timeout(db: AsyncSession) -> None:
+    """將剩餘預算設為目前交易的 statement_timeout (SET LOCAL，交易結束即失效)"""
+    left = remaining()
+    if left is None:
+        return
+    check()
+    await db.execute(text(f"SET LOCAL statement_timeout = {max(int(left * 1000), 1)}"))
+
+
+async def run(request: Request, seconds: float, func: Callable[[], Awaitable[T]]) -> T:
+    """
+    在 seconds 秒的時間預算內執行 func，預算經由 context 傳給下游的 AI、OCR 與資料庫呼叫。
+    - 用戶端中斷連線時立即取消
+    - 預算用完時下游自行收尾 (可回傳部分結果)；超過寬限時間仍未結束則強制取消並回傳 504
+    """
+    with scope(seconds):
+        # 新的 task 複製目前的 context，因此帶有時間預算
+        task = asyncio.ensure_future(func())
+    hard_deadline = time.monotonic() + seconds + HARD_CANCEL_GRACE_SECONDS
+
+    async def cancel_task() -> None:
+        task.cancel()
+        # 等待取消完成，避免之後關閉資料庫 session 時仍在使用
+        await asyncio.wait({task})
+
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                break
+            if await request.is_disconnected():
+                print(f"[WARNING] 用戶端已中斷連線，取消 {request.url.path}")
+                await cancel_task()
+                raise HTTPException(status_code=499, detail="Client closed request")
+            if time.monotonic() >= hard_deadline:
+                print(f"[WARNING] {request.url.path} 超過時間預算 {seconds:g} 秒，強制取消")
+                await cancel_task()
+                raise HTTPException(status_code=504, detail="處理時間過長，請稍後再試")
+    except asyncio.CancelledError:
+        await cancel_task()
+        raise
+
+    try:
+        return task.result()
+    except DeadlineExceeded:
+        raise HTTPException(status_code=504, detail="處理時間過長，請稍後再試")
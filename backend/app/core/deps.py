@@ -15,6 +15,28 @@ from app.core.security import SECRET_KEY, ALGORITHM
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
+def decode_access_token(token: str) -> dict | None:
+    """驗證並解析 access token，無效或過期時回傳 None"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+async def get_user_from_token(db: AsyncSession, token: str) -> User | None:
+    """解析 access token 並取得對應的使用者，無效時回傳 None"""
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    token_data = TokenData(empno=payload["sub"])
+    
+    result = await db.execute(
+        select(User).where(User.email == token_data.empno).options(selectinload(User.employee))
+    )
+    return result.scalar_one_or_none()
+
 async def get_current_user(
     db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> User:
@@ -23,18 +45,7 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        empno: str | None = payload.get("sub")
-        if empno is None: raise credentials_exception
-        token_data = TokenData(empno=empno)
-    except JWTError:
-        raise credentials_exception
-    
-    result = await db.execute(
-        select(User).where(User.email == token_data.empno).options(selectinload(User.employee))
-    )
-    user = result.scalar_one_or_none()
+    user = await get_user_from_token(db, token)
     
     if user is None: raise credentials_exception
     return user
@@ -0,0 +1,37 @@
+# backend/app/core/http_cache.py
+
+import hashlib
+from fastapi import Request, Response
+
+def make_etag(*parts) -> str:
+    """以資源的版本資訊組出 weak ETag"""
+    raw = ":".join(str(p) for p in parts)
+    return 'W/"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """判斷請求的 If-None-Match 是否與目前 ETag 相符"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def set_cache_headers(response: Response, etag: str, cache_control: str = "private, no-cache") -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+
+def not_modified_response(etag: str, cache_control: str = "private, no-cache") -> Response:
+    response = Response(status_code=304)
+    set_cache_headers(response, etag, cache_control)
+    return response
+
+def conditional_response(request: Request, response: Response, etag: str, cache_control: str = "private, no-cache"):
+    """
+    條件式 GET 的共用流程：先以廉價的版本資訊算出 ETag，
+    若與 If-None-Match 相符即回傳 304 (不必載入與序列化完整資料)，
+    否則在正常回應上附加 ETag 並回傳 None。
+    """
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, cache_control)
+    set_cache_headers(response, etag, cache_control)
+    return None
@@ -2,6 +2,9 @@
 
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+import hashlib
+import hmac
+import secrets
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from .config import settings
@@ -13,6 +16,9 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = 14
+# 剛輪替的 refresh token 在此秒數內再次使用視為並行請求 (多個請求或分頁同時換發)，不當作遭竊
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = 30
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -28,4 +34,29 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+def access_token_claims(user) -> dict:
+    """
+    access token 的內容：除了員工編號，也帶上主管身分與下屬人數，
+    只需判斷身分的 API 可直接讀取 token，不必查詢資料庫。
+    """
+    claims = {"sub": user.email, "is_supervisor": bool(user.is_supervisor)}
+    if user.employee:
+        claims.update(
+            employee_id=user.employee.id,
+            direct_report_count=user.employee.direct_report_count,
+            total_report_count=user.employee.total_report_count,
+        )
+    return claims
+
+def generate_refresh_token() -> str:
+    """產生一組隨機的 refresh token (只回傳給前端，不存入資料庫)"""
+    return secrets.token_urlsafe(48)
+
+def hash_refresh_token(token: str) -> str:
+    """
+    以 HMAC-SHA256 計算 refresh token 的雜湊值。
+    token 本身已是高熵隨機字串，不需要 bcrypt 這類慢速雜湊，驗證成本只有一次 HMAC。
+    """
+    return hmac.new(SECRET_KEY.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).hexdigest()
@@ -0,0 +1,91 @@
+# backend/app/core/single_flight.py
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+# 所有 SingleFlight 實例 (名稱 -> 實例)，供 /api/ai/metrics 使用
+_registry: Dict[str, "SingleFlight"] = {}
+
+
+def input_hash(*parts: Any) -> str:
+    """請求輸入的雜湊 (parts 需可轉為 JSON)，作為合併請求的鍵"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    程序內的請求合併：同一個 key 同時只執行一次，
+    執行期間相同 key 的其他呼叫等待並共用同一個結果 (或例外)。
+    執行完畢即移除，之後的呼叫會重新執行 (不是快取)。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+        _registry[name] = self
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            self.coalesced += 1
+            print(f"[INFO] {self.name}: 相同的請求執行中，等待共用結果")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 執行中的請求被取消 (例如使用者關閉頁面) 時改由自己執行；自己被取消則照常拋出
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.executed += 1
+        try:
+            result = await func()
+        except Exception as e:
+            future.set_exception(e)
+            # 沒有其他等待者時避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def snapshot(self) -> Dict:
+        return {"in_flight": len(self._inflight), "executed": self.executed, "coalesced": self.coalesced}
+
+
+def snapshot_all() -> Dict[str, Dict]:
+    return {name: flight.snapshot() for name, flight in _registry.items()}
+
+
+def advisory_lock_key(name: str) -> int:
+    """將字串鍵轉成 PostgreSQL advisory lock 使用的 64-bit 整數"""
+    return int.from_bytes(hashlib.sha256(name.encode("utf-8")).digest()[:8], "big", signed=True)
+
+
+async def try_advisory_xact_lock(db: AsyncSession, name: str) -> bool:
+    """嘗試取得交易層級的 advisory lock (不等待)，交易結束時自動釋放"""
+    result = await db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": advisory_lock_key(name)})
+    return bool(result.scalar())
+
+
+async def advisory_xact_lock(db: AsyncSession, name: str) -> None:
+    """取得交易層級的 advisory lock，其他 worker 持有時等待其交易結束"""
+    await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": advisory_lock_key(name)})
@@ -0,0 +1,42 @@
+# backend/app/core/workday.py
+
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from .config import settings
+
+
+@lru_cache
+def business_timezone() -> ZoneInfo:
+    return ZoneInfo(settings.BUSINESS_TIMEZONE)
+
+
+@lru_cache
+def workday_cutoff() -> time:
+    """每日填寫日報的分界時間，早於此時間的紀錄屬於前一天"""
+    hour, minute = settings.WORKDAY_CUTOFF.split(":")
+    return time(int(hour), int(minute))
+
+
+def business_now() -> datetime:
+    """公司時區的目前時間"""
+    return datetime.now(business_timezone())
+
+
+def work_date_for(moment: datetime) -> date:
+    """
+    計算某個時間點所屬的工作日。
+    沒有時區的時間視為 UTC (work_records.created_at 以 utcnow 儲存)。
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    local = moment.astimezone(business_timezone())
+    if local.time() < workday_cutoff():
+        return local.date() - timedelta(days=1)
+    return local.date()
+
+
+def current_work_date() -> date:
+    """目前正在填寫的工作日"""
+    return work_date_for(business_now())
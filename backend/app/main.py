@@ -9,7 +9,9 @@ import time
 from fastapi.staticfiles import StaticFiles
 
 # --- 引入所有需要的 API 路由 ---
-from app.api import records, projects, supervisor, users, auth, documents, comments
+from app.api import records, projects, supervisor, users, auth, documents, comments, bootstrap, events, ai
+from app.services import event_service, org_graph_service
+from app.core.database import AsyncSessionFactory
 
 app = FastAPI(
     title="TSC 業務日誌 API",
@@ -47,6 +49,23 @@ async def log_requests(request: Request, call_next):
     
     return response
 
+@app.on_event("startup")
+async def start_event_broker():
+    await event_service.broker.start()
+
+@app.on_event("startup")
+async def load_org_graph():
+    # 預先載入組織圖；失敗時於第一次權限檢查再載入
+    try:
+        async with AsyncSessionFactory() as db:
+            await org_graph_service.load_org_graph(db)
+    except Exception as e:
+        print(f"[ERROR] 啟動時載入組織圖失敗: {e}")
+
+@app.on_event("shutdown")
+async def stop_event_broker():
+    await event_service.broker.stop()
+
 # 基本啟動前檢查：確保必要環境變數已設定
 required_settings: Dict[str, str] = {
     "DATABASE_URL": settings.DATABASE_URL,
@@ -69,6 +88,9 @@ app.include_router(projects.router, prefix="/api/projects")
 app.include_router(supervisor.router, prefix="/api/supervisor")
 app.include_router(documents.router, prefix="/api/documents")
 app.include_router(comments.router, prefix="/api")
+app.include_router(bootstrap.router, prefix="/api/bootstrap")
+app.include_router(events.router, prefix="/api/events")
+app.include_router(ai.router, prefix="/api/ai")
 
 @app.get("/")
 def read_root():
@@ -9,4 +9,10 @@ from .report import DailyReport, ReportStatus
 from .work_record import WorkRecord, FileAttachment
 from .user import User
 from .review_comment import ReviewComment
-from .report_approval import ReportApproval, ApprovalStatus
\ No newline at end of file
+from .report_approval import ReportApproval, ApprovalStatus
+from .refresh_token import RefreshToken
+from .data_version import DataVersion
+from .review_inbox import ReviewInboxItem
+from .daily_project_summary import DailyProjectSummary
+from .ai_chunk_summary import AIChunkSummary
+from .employee_context_summary import EmployeeContextSummary
@@ -0,0 +1,17 @@
+# backend/app/models/ai_chunk_summary.py
+from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy.sql import func
+from .base import Base
+
+class AIChunkSummary(Base):
+    """
+    大型附件分段摘要的快取 (map 階段的中間結果)。
+    以片段內容 (含摘要提示詞版本) 的 SHA-256 為鍵，同一份附件日後再次潤飾時只需重新執行 reduce。
+    """
+    __tablename__ = "ai_chunk_summaries"
+
+    chunk_hash = Column(String(64), primary_key=True)
+    summary = Column(Text, nullable=False)
+
+    # --- 時間戳記 ---
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
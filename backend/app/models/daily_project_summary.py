@@ -0,0 +1,40 @@
+# backend/app/models/daily_project_summary.py
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Date, DateTime, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from .base import Base
+
+class DailyProjectSummary(Base):
+    """
+    員工每日每個專案的彙整報告 (反正規化)。
+    新增或編輯工作紀錄時增量更新，彙整檢視只需讀取此表，不必重新讀取並分組當日所有紀錄。
+    """
+    __tablename__ = "daily_project_summary"
+
+    id = Column(Integer, primary_key=True, index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
+    work_date = Column(Date, nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+
+    # 彙整內容：各紀錄內容以空行相接 (較新的紀錄在前)，使用者編輯後直接覆寫
+    content = Column(Text, nullable=False, default="", server_default=text("''"))
+    ai_content = Column(Text, nullable=True)
+    # 產生 ai_content 時的輸入雜湊 (內容 + 選用的附件)；使用者手動編輯後清空
+    ai_input_hash = Column(String(64), nullable=True)
+    record_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    total_execution_time_minutes = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    # 附件列表 (FileAttachment 的欄位)，與紀錄的附件同步維護
+    files = Column(JSONB, nullable=False, default=list, server_default=text("'[]'::jsonb"))
+
+    # --- 時間戳記 ---
+    # 最新一筆紀錄的建立時間，彙整列表依此排序 (最近有紀錄的專案在前)
+    last_record_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # --- SQLAlchemy 關聯 ---
+    project = relationship("Project")
+
+    __table_args__ = (
+        UniqueConstraint('employee_id', 'work_date', 'project_id', name='unique_daily_project_summary'),
+    )
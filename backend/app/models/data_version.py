@@ -0,0 +1,17 @@
+# backend/app/models/data_version.py
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from .base import Base
+
+class DataVersion(Base):
+    """
+    資料版本號 (generation counter)。
+    同步腳本等外部程序更新資料後遞增版本號，API 端以此判斷記憶體快取是否失效。
+    """
+    __tablename__ = "data_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    # --- 時間戳記 ---
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,5 +1,5 @@
 # backend/app/models/employee.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -28,6 +28,10 @@ class Employee(Base):
     
     # --- 狀態與關聯 ---
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    # --- 下屬人數 (同步時由 supervisors 表計算，不需每次遞迴查詢) ---
+    direct_report_count = Column(Integer, nullable=False, default=0, server_default=text("0"))  # 直屬下級人數
+    total_report_count = Column(Integer, nullable=False, default=0, server_default=text("0"))  # 直屬與間接下級人數
     
     # --- 時間戳記 ---
     created_at = Column(DateTime(timezone=True), server_default=func.now())
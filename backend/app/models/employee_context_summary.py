@@ -0,0 +1,20 @@
+# backend/app/models/employee_context_summary.py
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from .base import Base
+
+class EmployeeContextSummary(Base):
+    """
+    員工近期日報的滾動摘要，提交日報時增量更新。
+    主管產生回覆建議時只需讀取這一列作為上下文，不必重新讀取過去幾天的完整日報。
+    """
+    __tablename__ = "employee_context_summaries"
+
+    employee_id = Column(Integer, ForeignKey("employees.id"), primary_key=True)
+    # 每日摘要 [{"date": "YYYY-MM-DD", "digest": "..."}]，較新的在前，總 token 數有上限
+    entries = Column(JSONB, nullable=False, default=list, server_default=text("'[]'::jsonb"))
+    token_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+    # --- 時間戳記 ---
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
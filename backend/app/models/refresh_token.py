@@ -0,0 +1,27 @@
+# backend/app/models/refresh_token.py
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from .base import Base
+
+class RefreshToken(Base):
+    """登入後發給前端的 refresh token，只保存 HMAC 雜湊值"""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+
+    # HMAC-SHA256(SECRET_KEY, token) 的十六進位字串，原始 token 不落地
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+
+    # 輪替 (rotation) 後指向接手的新 token，用於偵測舊 token 被重複使用
+    replaced_by_id = Column(Integer, ForeignKey("refresh_tokens.id"), nullable=True)
+
+    # --- 時間戳記 ---
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # --- SQLAlchemy 關聯 ---
+    user = relationship("User")
@@ -1,7 +1,8 @@
 # backend/app/models/report.py
 import datetime
-from sqlalchemy import Column, Integer, String, Date, Float, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Date, Float, Text, ForeignKey, Enum, DateTime
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import JSONB
 from .base import Base
 from .work_record import report_work_record_association
@@ -22,6 +23,9 @@ class DailyReport(Base):
     
     # 保留評分功能，與新的對話系統並存
     rating = Column(Float, nullable=True)
+
+    # 內容或狀態異動時更新，作為條件式 GET 的版本依據
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     employee_id = Column(Integer, ForeignKey("employees.id"))
     employee = relationship("Employee", back_populates="reports")
@@ -0,0 +1,33 @@
+# backend/app/models/review_inbox.py
+from sqlalchemy import Column, Integer, ForeignKey, Date, DateTime, Enum, UniqueConstraint, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from .base import Base
+from .report_approval import ApprovalStatus
+
+class ReviewInboxItem(Base):
+    """
+    主管待審清單 (反正規化)。
+    每位上級主管 (直屬與間接) 對每份下屬日報各一筆，
+    於提交日報時寫入、審核時更新，查詢待審清單不必再走訪組織階層。
+    """
+    __tablename__ = "review_inbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    supervisor_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
+    report_id = Column(Integer, ForeignKey("daily_reports.id"), nullable=False)
+    employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    status = Column(Enum(ApprovalStatus), default=ApprovalStatus.pending, nullable=False)
+
+    # --- 時間戳記 ---
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # --- SQLAlchemy 關聯 ---
+    employee = relationship("Employee", foreign_keys=[employee_id])
+
+    __table_args__ = (
+        UniqueConstraint('supervisor_id', 'report_id', name='unique_review_inbox_supervisor_report'),
+        # 待審清單查詢：WHERE supervisor_id = ? AND status = ? ORDER BY date DESC, report_id DESC
+        Index('ix_review_inbox_supervisor_status_date', 'supervisor_id', 'status', 'date', 'report_id'),
+    )
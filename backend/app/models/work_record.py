@@ -1,8 +1,10 @@
 # backend/app/models/work_record.py
 import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table, Boolean
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Table, Boolean, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from .base import Base
+from app.core.workday import current_work_date
 
 # 多對多關聯表：一個 DailyReport 可以包含多個 WorkRecord
 report_work_record_association = Table(
@@ -21,14 +23,23 @@ class WorkRecord(Base):
     content = Column(Text, nullable=False)
     ai_content = Column(Text, nullable=True) 
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # 任何內容或附件異動都會更新，作為條件式 GET 的版本依據
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # 執行時間（以分鐘為單位存儲，便於計算）
     execution_time_minutes = Column(Integer, nullable=False, default=0)
     
     employee_id = Column(Integer, ForeignKey("employees.id"))
 
+    # 紀錄所屬的工作日 (依公司時區與 08:30 分界計算)，「今日」查詢皆以此欄位等值比對
+    work_date = Column(Date, nullable=False, default=current_work_date)
+
     files = relationship("FileAttachment", back_populates="work_record")
 
+    __table_args__ = (
+        Index('ix_work_records_employee_work_date_project', 'employee_id', 'work_date', 'project_id'),
+    )
+
 
 
 class FileAttachment(Base):
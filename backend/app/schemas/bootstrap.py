@@ -0,0 +1,25 @@
+# backend/app/schemas/bootstrap.py
+
+from pydantic import BaseModel
+from typing import List
+from .work_record import ConsolidatedReport
+from .project import Project
+
+class WritingStatus(BaseModel):
+    allowed: bool
+    message: str
+    current_time: str
+
+class EditingStatus(BaseModel):
+    can_edit_records: bool
+    can_edit_reports: bool
+    can_submit_report: bool
+    message: str
+
+class TodayBootstrap(BaseModel):
+    """日報頁面初次載入所需的所有資料"""
+    consolidated: List[ConsolidatedReport] = []
+    writing_status: WritingStatus
+    projects: List[Project] = []
+    editing_status: EditingStatus
+    has_subordinates: bool = False
@@ -48,6 +48,8 @@ class EmployeeForUser(BaseModel):
     empnamec: str # Made empnamec optional
     dutyscript: Optional[str] = None  # 職稱
     deptabbv: Optional[str] = None    # 部門簡稱
+    direct_report_count: int = 0      # 直屬下級人數
+    total_report_count: int = 0       # 直屬與間接下級人數
 
     class Config:
         from_attributes = True
\ No newline at end of file
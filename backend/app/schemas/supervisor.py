@@ -1,6 +1,6 @@
 # backend/app/schemas/supervisor.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from .work_record import ConsolidatedReport
 import datetime
@@ -18,6 +18,18 @@ class ReportReviewCreate(BaseModel):
     rating: Optional[float] = None  # 改為Optional，允許只設定評分不留言
     comment: Optional[str] = None   # 如果要同時留言，可以使用這個欄位
 
+class ReportReviewBatchItem(ReportReviewCreate):
+    report_id: int
+
+class ReportReviewBatchRequest(BaseModel):
+    items: List[ReportReviewBatchItem]
+
+class ReportReviewBatchResult(BaseModel):
+    report_id: int
+    success: bool
+    status: Optional[str] = None  # 審核後的狀態 (approved / pending)
+    error: Optional[str] = None
+
 class DailyReportDetail(BaseModel):
     id: int
     date: datetime.date
@@ -38,4 +50,26 @@ class EmployeeForList(BaseModel):
     pending_reports_count: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ReviewInboxEntry(BaseModel):
+    report_id: int
+    employee_id: int
+    employee_name: str
+    date: datetime.date
+    status: str
+
+class ReviewInboxPage(BaseModel):
+    items: List[ReviewInboxEntry]
+    total: int
+    pending_count: int
+    approved_count: int
+
+class ReplySuggestion(BaseModel):
+    type: str = Field(min_length=1)
+    title: str = Field(min_length=1)
+    content: str = Field(min_length=1)
+
+class ReplySuggestionList(BaseModel):
+    """AI 主管回覆建議的回應格式 (用於驗證模型輸出)"""
+    suggestions: List[ReplySuggestion] = Field(min_length=1)
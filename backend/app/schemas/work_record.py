@@ -33,6 +33,9 @@ class WorkRecordBase(BaseModel):
 class WorkRecordCreate(WorkRecordBase):
     files: List[FileAttachmentCreate] = []
 
+class WorkRecordBatchCreate(BaseModel):
+    items: List[WorkRecordCreate]
+
 class WorkRecordUpdate(WorkRecordBase):
     pass
 
@@ -61,6 +64,18 @@ class WorkRecordInList(BaseModel):
     class Config:
         from_attributes = True
 
+# AI 潤飾時參考資料依 token 預算裁切的統計
+class ReferencePackingStats(BaseModel):
+    budget_tokens: int
+    notes_tokens: int
+    notes_truncated: bool
+    reference_documents: int
+    reference_tokens: int
+    reference_tokens_used: int
+    chunks_total: int
+    chunks_used: int
+    truncated: bool
+
 # 用於彙整報告的模型
 class ConsolidatedReport(BaseModel):
     project: 'Project' # <-- 關鍵修正：使用字串 'Project'
@@ -69,6 +84,12 @@ class ConsolidatedReport(BaseModel):
     record_count: int
     ai_content: Optional[str] = None
     total_execution_time_minutes: Optional[int] = 0
+    # 只在 AI 潤飾的回應中提供
+    reference_stats: Optional[ReferencePackingStats] = None
+    # 時間預算用完而未潤飾 (保留原本的 AI 內容)，只在一鍵潤飾的回應中提供
+    ai_deadline_exceeded: bool = False
+    # AI 潤飾失敗的原因 (保留原本的 AI 內容)，見 azure_ai_service.ENHANCE_ERROR_MESSAGES
+    ai_error: Optional[str] = None
 
     class Config:
         from_attributes = True
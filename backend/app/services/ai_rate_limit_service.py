@@ -0,0 +1,212 @@
+# backend/app/services/ai_rate_limit_service.py
+
+import asyncio
+import random
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Optional
+
+from app.core.config import settings
+
+# 目前 AI 請求所屬的使用者 (公平排隊的依據)，由呼叫端在進入 AI 流程前設定
+current_user_key: ContextVar[str] = ContextVar("ai_current_user_key", default="anonymous")
+
+
+class TokenBucket:
+    """每分鐘補充 rate_per_minute 的 token bucket，容量為一分鐘的額度"""
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.available = self.capacity
+        self.updated_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self, amount: float) -> float:
+        """取得 amount 需要再等待的秒數 (0 表示現在就可以取得)"""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def consume(self, amount: float) -> None:
+        if self.enabled:
+            self.available -= min(amount, self.capacity)
+
+
+class AIMetrics:
+    """AI 請求的排隊與節流統計 (程序內)"""
+
+    def __init__(self, recent: int = 500):
+        self.requests = 0
+        self.tokens_reserved = 0
+        self.queue_waits = 0
+        self.queue_wait_total_ms = 0.0
+        self.queue_wait_max_ms = 0.0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+        self._recent_waits: Deque[float] = deque(maxlen=recent)
+
+    def record_wait(self, wait_ms: float, tokens: int) -> None:
+        self.requests += 1
+        self.tokens_reserved += tokens
+        self._recent_waits.append(wait_ms)
+        if wait_ms >= 1:
+            self.queue_waits += 1
+        self.queue_wait_total_ms += wait_ms
+        self.queue_wait_max_ms = max(self.queue_wait_max_ms, wait_ms)
+
+    def snapshot(self, queue_depth: int) -> Dict:
+        waits = sorted(self._recent_waits)
+        p95 = waits[int(len(waits) * 0.95) - 1] if waits else 0.0
+        return {
+            "requests": self.requests,
+            "tokens_reserved": self.tokens_reserved,
+            "queue_depth": queue_depth,
+            "queued_requests": self.queue_waits,
+            "queue_wait_avg_ms": round(self.queue_wait_total_ms / self.requests, 2) if self.requests else 0.0,
+            "queue_wait_p95_ms": round(p95, 2),
+            "queue_wait_max_ms": round(self.queue_wait_max_ms, 2),
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+
+class AIRateLimiter:
+    """
+    程序內的 AI 請求限流器：
+    - 同時以每分鐘請求數 (RPM) 與 token 數 (TPM) 兩個 token bucket 控制
+    - 每個請求預留「估計的提示詞 token + max_tokens」
+    - 等待中的請求依使用者輪流放行，單一使用者一次送出多個請求不會讓其他人一直等
+    - 收到 429 時整個限流器暫停到 Retry-After 之後
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.metrics = AIMetrics()
+        self._queues: "OrderedDict[str, Deque[object]]" = OrderedDict()
+        self._condition: Optional[asyncio.Condition] = None
+        self._paused_until = 0.0
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _head(self) -> Optional[object]:
+        for queue in self._queues.values():
+            if queue:
+                return queue[0]
+        return None
+
+    def _remove(self, user_key: str, waiter: object) -> None:
+        queue = self._queues.get(user_key)
+        if queue is None:
+            return
+        if waiter in queue:
+            queue.remove(waiter)
+        if queue:
+            # 輪到下一位使用者
+            self._queues.move_to_end(user_key)
+        else:
+            del self._queues[user_key]
+
+    def pause(self, seconds: float) -> None:
+        """收到 429 時暫停放行，直到 seconds 秒後"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: int, user_key: Optional[str] = None) -> float:
+        """排隊直到可以送出請求，回傳等待的毫秒數"""
+        user_key = user_key or current_user_key.get()
+        waiter = object()
+        self._queues.setdefault(user_key, deque()).append(waiter)
+        condition = self._get_condition()
+        start = time.monotonic()
+        try:
+            async with condition:
+                while True:
+                    if self._head() is waiter:
+                        delay = max(
+                            self._paused_until - time.monotonic(),
+                            self.requests.delay(1),
+                            self.tokens.delay(tokens),
+                        )
+                        if delay <= 0:
+                            self.requests.consume(1)
+                            self.tokens.consume(tokens)
+                            break
+                    else:
+                        delay = None
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._remove(user_key, waiter)
+            async with condition:
+                condition.notify_all()
+
+        wait_ms = (time.monotonic() - start) * 1000
+        self.metrics.record_wait(wait_ms, tokens)
+        return wait_ms
+
+    def snapshot(self) -> Dict:
+        return {
+            "rpm_limit": int(self.requests.capacity),
+            "tpm_limit": int(self.tokens.capacity),
+            **self.metrics.snapshot(self.queue_depth()),
+        }
+
+
+limiter = AIRateLimiter(settings.AI_RATE_LIMIT_RPM, settings.AI_RATE_LIMIT_TPM)
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """由回應標頭取得建議的重試等待秒數 (retry-after-ms 或 retry-after，後者可為秒數或 HTTP 日期)"""
+    if headers is None:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_seconds(attempt: int, retry_after: Optional[float] = None) -> float:
+    """指數退避加隨機抖動 (equal jitter)，且不少於伺服器要求的 Retry-After"""
+    ceiling = min(settings.AI_RETRY_MAX_SECONDS, settings.AI_RETRY_BASE_SECONDS * (2 ** attempt))
+    delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -1,8 +1,16 @@
 # backend/app/services/ai_suggestion_service.py
 
-import json
 from typing import List, Dict, Any
-from app.services import azure_ai_service
+from app.core.single_flight import SingleFlight, input_hash
+from app.schemas.supervisor import ReplySuggestionList
+from app.services import azure_ai_service, structured_output_service
+
+# 相同日報的並行建議請求只執行一次
+_suggestion_flight = SingleFlight("主管回覆建議")
+# 建議回應的解析、修正與改用替代結果的統計
+_suggestion_metrics = structured_output_service.StructuredOutputMetrics("主管回覆建議")
+
+SUGGESTION_MAX_TOKENS = 1200
 
 async def generate_supervisor_reply_suggestions(
     report_content: str, 
@@ -15,12 +23,18 @@ async def generate_supervisor_reply_suggestions(
     Args:
         report_content: 當前日報內容
         employee_name: 員工姓名
-        recent_context: 最近兩天的報告摘要（可選）
+        recent_context: 員工前幾天的日報摘要（可選）
     
     Returns:
         包含多個回覆選項的列表
     """
-    
+    key = input_hash(report_content, employee_name, recent_context)
+    return await _suggestion_flight.do(
+        key, lambda: _generate_suggestions(report_content, employee_name, recent_context)
+    )
+
+
+async def _generate_suggestions(report_content: str, employee_name: str, recent_context: str = None) -> List[Dict[str, str]]:
     system_prompt = (
     "你是一位專業、經驗豐富的部門主管。\n"
     "你的任務是根據員工的日報內容，生成3個不同風格和重點的專業回覆建議。\n\n"
@@ -78,55 +92,40 @@ async def generate_supervisor_reply_suggestions(
   ]
 }"""
 
+    # 使用與 get_ai_enhanced_report 相同的方式調用 Azure AI
+    client = azure_ai_service._build_client()
+    if client is None:
+        return _get_intelligent_suggestions(report_content, employee_name)
+
+    _suggestion_metrics.requests += 1
     try:
-        # 使用與 get_ai_enhanced_report 相同的方式調用 Azure AI
-        client = azure_ai_service._build_client()
-        if client is None:
-            return _get_intelligent_suggestions(report_content, employee_name)
-
-        from app.core.config import settings
-        
-        response = await client.chat.completions.create(
-            model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
+        # JSON 模式：回應必定是單一 JSON 物件，不會夾帶 Markdown 程式碼區塊或說明文字
+        response = await azure_ai_service.create_chat_completion(
+            client,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.3,
-            max_tokens=1200,
+            max_tokens=SUGGESTION_MAX_TOKENS,
+            response_format={"type": "json_object"},
         )
-        ai_response = response.choices[0].message.content
-        if not ai_response:
-            return _get_intelligent_suggestions(report_content, employee_name)
-        
-        # 嘗試解析 JSON 回應
-        try:
-            response_data = json.loads(ai_response)
-            suggestions = response_data.get("suggestions", [])
-            
-            # 驗證回應格式
-            if not suggestions or len(suggestions) == 0:
-                return _get_intelligent_suggestions(report_content, employee_name)
-            
-            # 驗證每個建議的格式
-            valid_suggestions = []
-            for suggestion in suggestions:
-                if (isinstance(suggestion, dict) and 
-                    'type' in suggestion and 
-                    'title' in suggestion and 
-                    'content' in suggestion):
-                    valid_suggestions.append(suggestion)
-                    
-            if valid_suggestions:
-                return valid_suggestions
-            else:
-                return _get_intelligent_suggestions(report_content, employee_name)
-            
-        except json.JSONDecodeError:
-            return _get_intelligent_suggestions(report_content, employee_name)
-            
-    except Exception:
+        # 依 ReplySuggestionList 驗證；不符合時送出一次修正請求
+        result = await structured_output_service.parse_or_repair(
+            client,
+            ReplySuggestionList,
+            response.choices[0].message.content,
+            metrics=_suggestion_metrics,
+            max_tokens=SUGGESTION_MAX_TOKENS,
+        )
+    except Exception as e:
+        print(f"[WARNING] AI 回覆建議請求失敗，改用本機產生的建議: {str(e)}")
+        result = None
+
+    if result is None:
+        _suggestion_metrics.fallbacks += 1
         return _get_intelligent_suggestions(report_content, employee_name)
+    return [suggestion.model_dump() for suggestion in result.suggestions]
 
 
 def _get_intelligent_suggestions(report_content: str, employee_name: str) -> List[Dict[str, str]]:
@@ -1,7 +1,14 @@
 # backend/app/services/azure_ai_service.py
-from openai import AsyncAzureOpenAI
+import asyncio
+import json
+from openai import AsyncAzureOpenAI, RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
 from app.core.config import settings
-from typing import List, Optional
+from app.core.circuit_breaker import openai_breaker, CircuitOpenError
+from app.core import deadline
+from app.core.deadline import DeadlineExceeded
+from typing import Dict, List, Optional
+
+from app.services import prompt_budget_service, ai_rate_limit_service
 
 def _build_client() -> Optional[AsyncAzureOpenAI]:
     if not settings.AZURE_OPENAI_KEY or not settings.AZURE_OPENAI_ENDPOINT or not settings.AZURE_OPENAI_DEPLOYMENT_NAME:
@@ -11,83 +18,331 @@ def _build_client() -> Optional[AsyncAzureOpenAI]:
         api_key=settings.AZURE_OPENAI_KEY,
         api_version="2024-02-01",
         azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+        # 重試由 create_chat_completion 統一處理 (需配合限流器)
+        max_retries=0,
     )
 
-async def get_ai_enhanced_report(original_content: str, project_name: str, reference_texts: List[str] = []) -> str:
+# 可重試的錯誤：429、逾時、連線失敗與 5xx
+_RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+# 代表服務異常、計入斷路器的錯誤 (429 代表服務正常但超過配額，交給限流器處理)
+_OUTAGE_ERRORS = (APITimeoutError, APIConnectionError, InternalServerError)
+
+def _is_outage(error: Exception) -> bool:
+    return isinstance(error, _OUTAGE_ERRORS)
+
+async def create_chat_completion(client: AsyncAzureOpenAI, *, messages: List[dict], max_tokens: int, **kwargs):
+    """
+    所有 Azure OpenAI chat 請求的共用入口：
+    先向限流器預留「估計的提示詞 token + max_tokens」並依使用者公平排隊，
+    遇到 429、逾時、連線失敗或 5xx 時以指數退避加抖動重試 (429 不少於 Retry-After，且暫停整個限流器)。
+    重試用盡仍失敗時拋出最後一次的例外；斷路器開啟時 (包含重試途中開啟) 立即拋出 CircuitOpenError。
+    每次呼叫最多等待 AI_REQUEST_TIMEOUT_SECONDS；請求的時間預算用完時 (排隊、呼叫或重試前) 拋出 DeadlineExceeded。
+    """
+    limiter = ai_rate_limit_service.limiter
+    estimated_tokens = sum(prompt_budget_service.count_tokens(m["content"]) for m in messages) + max_tokens
+    for attempt in range(settings.AI_MAX_RETRIES + 1):
+        try:
+            # 斷路器開啟中時不排隊；排隊等待不在 guard 內，半開的探測名額只在實際呼叫時佔用
+            openai_breaker.raise_if_open()
+            await deadline.wait_for(limiter.acquire(estimated_tokens), None)
+            async with openai_breaker.guard(_is_outage):
+                return await deadline.wait_for(
+                    client.chat.completions.create(
+                        model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        timeout=settings.AI_REQUEST_TIMEOUT_SECONDS,
+                        **kwargs,
+                    ),
+                    None,
+                )
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
+        except _RETRYABLE_ERRORS as e:
+            retry_after = None
+            if isinstance(e, RateLimitError):
+                limiter.metrics.throttled += 1
+                retry_after = ai_rate_limit_service.retry_after_seconds(e.response.headers)
+            if attempt >= settings.AI_MAX_RETRIES:
+                limiter.metrics.failures += 1
+                raise
+            delay = ai_rate_limit_service.backoff_seconds(attempt, retry_after)
+            left = deadline.remaining()
+            if left is not None and delay >= left:
+                # 剩餘預算不夠等到重試
+                limiter.metrics.failures += 1
+                raise
+            if isinstance(e, RateLimitError):
+                limiter.pause(delay)
+            limiter.metrics.retries += 1
+            print(f"[WARNING] AI 請求失敗 ({type(e).__name__})，{delay:.1f} 秒後重試 ({attempt + 1}/{settings.AI_MAX_RETRIES})")
+            await asyncio.sleep(delay)
+        except Exception:
+            limiter.metrics.failures += 1
+            raise
+
+# 日報潤飾的系統提示詞 (規則與範例)
+ENHANCE_SYSTEM_PROMPT = (
+    "你是一位專業、精確且一絲不苟的商業報告助理。\n"
+    "你的任務是將使用者在 `<NOTES>` 標籤中提供的零散筆記，轉換為一份採用「進度、計畫、問題」(Progress, Plans, Problems) 框架的每日工作報告。\n\n"
+    "請給予我純文字。"
+    "你必須嚴格遵守以下三大原則：\n\n"
+    "1. **絕對接地原則 (Absolute Grounding Principle)**:\n"
+    "   - 報告中的「一、今日進度」部分，必須嚴格且僅僅基於 `<NOTES>` 的文字進行潤飾。\n"
+    "   - **絕對禁止**在任何部分添加筆記中未明確提及的**具體細節**（例如：函式庫名稱、錯誤代碼、特定人名、具體數字等）。這是最高指令。\n\n"
+    "2. **有限推斷原則 (Limited Inference Principle)**:\n"
+    "   - 報告中的「二、明日計畫」部分，允許基於筆記內容進行合理的、高層次的後續步驟建議。\n"
+    "   - 如果筆記內容無法推斷出明確的下一步，你必須在該部分誠實地註明「**待下一步規劃。**」。\n\n"
+    "3. **問題識別原則 (Problem Identification Principle)**:\n"
+    "   - 只有當筆記中**明確提及**了困難、障礙、等待、或不確定的情況時，才能在「三、潛在問題與阻礙」部分中列出。\n"
+    "   - 如果筆記中未提及任何問題，你必須在該部分註明「**目前無明顯阻礙。**」，絕不允許臆測或編造問題。\n\n"
+    "--- 範例 --- \n\n"
+    "<EXAMPLE>\n"
+    "INPUT:\n"
+    "<NOTES>\n"
+    "修改前端程式，完成後端auth驗證\n"
+    "</NOTES>\n\n"
+    "OUTPUT:\n"
+    "一、今日進度\n\n"
+    "對前端應用程式進行了修改。\n"
+    "完成了後端的身份驗證功能，為系統安全性奠定基礎。\n\n"
+    "二、明日計畫\n\n"
+    "待下一步規劃。\n\n"
+    "三、潛在問題與阻礙\n\n"
+    "目前無明顯阻礙。\n"
+    "</EXAMPLE>\n\n"
+)
+
+
+# 潤飾失敗的原因 (EnhancedReport.error)
+ENHANCE_NOT_CONFIGURED = "not_configured"
+ENHANCE_RATE_LIMITED = "rate_limited"
+ENHANCE_UNAVAILABLE = "unavailable"
+ENHANCE_FAILED = "failed"
+
+ENHANCE_ERROR_MESSAGES = {
+    ENHANCE_NOT_CONFIGURED: "AI 服務未啟用或尚未配置。",
+    ENHANCE_RATE_LIMITED: "AI 服務目前使用量過高，請稍後再試。",
+    ENHANCE_UNAVAILABLE: "AI 服務暫時無法使用，請稍後再試。",
+    ENHANCE_FAILED: "無法從 AI 服務獲取內容。",
+}
+
+
+class EnhancedReport:
+    """
+    AI 潤飾結果與參考資料的裁切統計。
+    潤飾失敗時 content 為 None、error 為失敗原因，呼叫端應保留原本的內容而不是儲存替代文字。
+    """
+
+    def __init__(self, content: Optional[str], reference_stats: Optional[dict] = None, error: Optional[str] = None):
+        self.content = content
+        self.reference_stats = reference_stats
+        self.error = error
+
+    @classmethod
+    def failed(cls, error: str, reference_stats: Optional[dict] = None) -> "EnhancedReport":
+        return cls(None, reference_stats, error)
+
+
+async def enhance_report(original_content: str, project_name: str, reference_texts: List[str] = []) -> EnhancedReport:
     """
     使用 Azure OpenAI 將報告內容潤飾成專業格式，並參考附加文件內容。
+    筆記與參考資料依 token 預算裁切 (見 prompt_budget_service)，裁切統計隨結果回傳。
+    未配置、超過用量或服務異常時回傳 error 為失敗原因的結果 (不以錯誤訊息當作報告內容)。
     """
-    system_prompt = (
-        "你是一位專業、精確且一絲不苟的商業報告助理。\n"
-        "你的任務是將使用者在 `<NOTES>` 標籤中提供的零散筆記，轉換為一份採用「進度、計畫、問題」(Progress, Plans, Problems) 框架的每日工作報告。\n\n"
-        "請給予我純文字。"
-        "你必須嚴格遵守以下三大原則：\n\n"
-        "1. **絕對接地原則 (Absolute Grounding Principle)**:\n"
-        "   - 報告中的「一、今日進度」部分，必須嚴格且僅僅基於 `<NOTES>` 的文字進行潤飾。\n"
-        "   - **絕對禁止**在任何部分添加筆記中未明確提及的**具體細節**（例如：函式庫名稱、錯誤代碼、特定人名、具體數字等）。這是最高指令。\n\n"
-        "2. **有限推斷原則 (Limited Inference Principle)**:\n"
-        "   - 報告中的「二、明日計畫」部分，允許基於筆記內容進行合理的、高層次的後續步驟建議。\n"
-        "   - 如果筆記內容無法推斷出明確的下一步，你必須在該部分誠實地註明「**待下一步規劃。**」。\n\n"
-        "3. **問題識別原則 (Problem Identification Principle)**:\n"
-        "   - 只有當筆記中**明確提及**了困難、障礙、等待、或不確定的情況時，才能在「三、潛在問題與阻礙」部分中列出。\n"
-        "   - 如果筆記中未提及任何問題，你必須在該部分註明「**目前無明顯阻礙。**」，絕不允許臆測或編造問題。\n\n"
-        "--- 範例 --- \n\n"
-        "<EXAMPLE>\n"
-        "INPUT:\n"
-        "<NOTES>\n"
-        "修改前端程式，完成後端auth驗證\n"
-        "</NOTES>\n\n"
-        "OUTPUT:\n"
-        "一、今日進度\n\n"
-        "對前端應用程式進行了修改。\n"
-        "完成了後端的身份驗證功能，為系統安全性奠定基礎。\n\n"
-        "二、明日計畫\n\n"
-        "待下一步規劃。\n\n"
-        "三、潛在問題與阻礙\n\n"
-        "目前無明顯阻礙。\n"
-        "</EXAMPLE>\n\n"
-    )
+    packed = prompt_budget_service.pack_prompt(original_content, reference_texts)
     reference_section = ""
-    if reference_texts:
-        combined_references = "\n\n".join(reference_texts)
-        reference_section = f"\n\n<REFERENCES>\n{combined_references}\n</REFERENCES>"
+    if packed.references:
+        reference_section = f"\n\n<REFERENCES>\n{packed.references}\n</REFERENCES>"
 
     user_prompt = (
         f"請為「{project_name}」這個專案，潤飾以下工作內容，並參考附加的資料，生成一份每日工作報告。\n\n"
         # 使用標籤來界定筆記
-        f"<NOTES>\n{original_content}\n</NOTES>"
+        f"<NOTES>\n{packed.notes}\n</NOTES>"
         f"{reference_section}"
     )
+    if packed.stats["truncated"]:
+        print(f"[WARNING] 提示詞超出預算已裁切 - 專案: {project_name}, 統計: {packed.stats}")
 
     client = _build_client()
     if client is None:
-        return "AI 服務未啟用或尚未配置。"
+        return EnhancedReport.failed(ENHANCE_NOT_CONFIGURED, packed.stats)
     try:
-        response = await client.chat.completions.create(
-            model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
+        response = await create_chat_completion(
+            client,
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": ENHANCE_SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.2,
             max_tokens=1500,
         )
         ai_content = response.choices[0].message.content
-        return ai_content if ai_content else "無法從 AI 服務獲取內容。"
+        if not ai_content or not ai_content.strip():
+            return EnhancedReport.failed(ENHANCE_FAILED, packed.stats)
+        return EnhancedReport(ai_content, packed.stats)
+    except RateLimitError:
+        return EnhancedReport.failed(ENHANCE_RATE_LIMITED, packed.stats)
+    except CircuitOpenError:
+        return EnhancedReport.failed(ENHANCE_UNAVAILABLE, packed.stats)
+    except DeadlineExceeded:
+        # 由呼叫端決定如何處理 (例如保留原本的內容並回傳部分結果)
+        raise
+    except Exception as e:
+        print(f"[ERROR] AI 潤飾請求失敗: {str(e)}")
+        return EnhancedReport.failed(ENHANCE_UNAVAILABLE, packed.stats)
+
+# 批次潤飾：多個專案合併成一次請求，模型回傳 {專案ID: 報告} 的 JSON
+BATCH_ENHANCE_INSTRUCTIONS = (
+    "--- 批次模式 ---\n\n"
+    "本次輸入包含多個專案，每個專案以 `<PROJECT id=\"專案ID\">` 區塊提供專案名稱、`<NOTES>` 與可能的 `<REFERENCES>`。\n"
+    "請依上述原則與範例格式，分別為每個專案產生一份每日工作報告，每個專案只能使用自己區塊內的資料。\n"
+    "只輸出一個 JSON 物件：鍵為專案ID (字串)，值為該專案報告的純文字，例如 {\"12\": \"一、今日進度\\n\\n...\"}。\n"
+)
+
+
+class BatchEnhanceItem:
+    """批次潤飾的單一專案輸入"""
+
+    def __init__(self, project_id: int, project_name: str, content: str, reference_texts: List[str] = []):
+        self.project_id = project_id
+        self.project_name = project_name
+        self.content = content
+        self.reference_texts = reference_texts
+
+
+def _group_batches(items: List[BatchEnhanceItem], packed: Dict[int, prompt_budget_service.PackedPrompt]) -> List[List[BatchEnhanceItem]]:
+    """依專案數上限與提示詞預算將專案分組，每組一次請求"""
+    batches: List[List[BatchEnhanceItem]] = []
+    current: List[BatchEnhanceItem] = []
+    current_tokens = 0
+    for item in items:
+        stats = packed[item.project_id].stats
+        tokens = stats["notes_tokens"] + stats["reference_tokens_used"]
+        if current and (len(current) >= settings.AI_ENHANCE_BATCH_SIZE
+                        or current_tokens + tokens > settings.AI_PROMPT_TOKEN_BUDGET):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _parse_batch_response(content: Optional[str], project_ids: List[int]) -> Dict[int, str]:
+    """驗證批次回應，只回傳內容為非空字串的專案；整體無法解析時回傳空字典"""
+    try:
+        data = json.loads(content or "")
+    except ValueError:
+        print("[WARNING] 批次潤飾回應不是合法的 JSON")
+        return {}
+    if not isinstance(data, dict):
+        print("[WARNING] 批次潤飾回應不是 JSON 物件")
+        return {}
+    reports = {}
+    for project_id in project_ids:
+        value = data.get(str(project_id))
+        if isinstance(value, str) and value.strip():
+            reports[project_id] = value.strip()
+    return reports
+
+
+async def _enhance_batch(client: AsyncAzureOpenAI, batch: List[BatchEnhanceItem], packed: Dict[int, prompt_budget_service.PackedPrompt]) -> Dict[int, EnhancedReport]:
+    blocks = []
+    for item in batch:
+        prompt = packed[item.project_id]
+        reference_section = ""
+        if prompt.references:
+            reference_section = f"\n<REFERENCES>\n{prompt.references}\n</REFERENCES>"
+        blocks.append(
+            f"<PROJECT id=\"{item.project_id}\">\n"
+            f"專案名稱：{item.project_name}\n"
+            f"<NOTES>\n{prompt.notes}\n</NOTES>"
+            f"{reference_section}\n"
+            f"</PROJECT>"
+        )
+    user_prompt = "請為以下每個專案潤飾工作內容，並參考附加的資料，生成每日工作報告。\n\n" + "\n\n".join(blocks)
+
+    try:
+        response = await create_chat_completion(
+            client,
+            messages=[
+                {"role": "system", "content": ENHANCE_SYSTEM_PROMPT + BATCH_ENHANCE_INSTRUCTIONS},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.2,
+            max_tokens=min(1500 * len(batch), settings.AI_ENHANCE_BATCH_MAX_TOKENS),
+            response_format={"type": "json_object"},
+        )
     except Exception as e:
-        return "AI 服務暫時無法使用。"
+        print(f"[ERROR] 批次潤飾請求失敗: {str(e)}")
+        return {}
+
+    if response.usage is not None:
+        print(f"[INFO] 批次潤飾 {len(batch)} 個專案, 使用 {response.usage.total_tokens} tokens")
+    reports = _parse_batch_response(response.choices[0].message.content, [item.project_id for item in batch])
+    return {
+        project_id: EnhancedReport(text, packed[project_id].stats)
+        for project_id, text in reports.items()
+    }
+
+
+async def enhance_reports_batch(items: List[BatchEnhanceItem]) -> Dict[int, EnhancedReport]:
+    """
+    批次潤飾多個專案：同一組的專案合併成一次請求，系統提示詞只送一次。
+    回應無法解析或缺少某些專案時，這些專案改為逐一呼叫 enhance_report。
+    回傳 {專案ID: 潤飾結果}，失敗的專案 error 為失敗原因。
+    """
+    if not items:
+        return {}
+    packed = {
+        item.project_id: prompt_budget_service.pack_prompt(item.content, item.reference_texts)
+        for item in items
+    }
+    client = _build_client()
+    if client is None:
+        return {item.project_id: EnhancedReport.failed(ENHANCE_NOT_CONFIGURED, packed[item.project_id].stats) for item in items}
+
+    results: Dict[int, EnhancedReport] = {}
+    batches = _group_batches(items, packed)
+    for batch in batches:
+        if len(batch) > 1:
+            results.update(await _enhance_batch(client, batch, packed))
+
+    fallback = [item for item in items if item.project_id not in results]
+    if fallback:
+        print(f"[INFO] {len(fallback)} 個專案改為逐一潤飾")
+    for item in fallback:
+        try:
+            results[item.project_id] = await enhance_report(item.content, item.project_name, item.reference_texts)
+        except DeadlineExceeded:
+            # 時間預算用完：回傳已完成的部分，其餘專案不在結果中
+            print(f"[WARNING] 時間預算用完，{len(items) - len(results)} 個專案未潤飾")
+            break
+    print(f"[INFO] 批次潤飾完成: {len(items)} 個專案, 請求數 {sum(1 for b in batches if len(b) > 1) + len(fallback)}")
+    return results
+
+async def get_ai_enhanced_report(original_content: str, project_name: str, reference_texts: List[str] = []) -> EnhancedReport:
+    """
+    使用 Azure OpenAI 將報告內容潤飾成專業格式，並參考附加文件內容。
+    失敗時回傳的結果 error 為失敗原因 (由 API 轉成對應的 HTTP 錯誤)。
+    """
+    return await enhance_report(original_content, project_name, reference_texts)
 
 async def get_completion(prompt: str, temperature: float = 0.3, max_tokens: int = 1000) -> str:
     """
-    使用 Azure OpenAI 獲取通用文本完成回應
+    使用 Azure OpenAI 獲取通用文本完成回應；回應為空 (例如被內容篩選) 時拋出例外，
+    避免呼叫端把替代文字當成模型的輸出使用或快取。
+    DeadlineExceeded 與 CircuitOpenError 原樣拋出，其餘錯誤包裝為 Exception。
     """
     client = _build_client()
     if client is None:
         raise Exception("AI 服務未啟用或尚未配置")
     
     try:
-        response = await client.chat.completions.create(
-            model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
+        response = await create_chat_completion(
+            client,
             messages=[
                 {"role": "user", "content": prompt}
             ],
@@ -95,9 +350,15 @@ async def get_completion(prompt: str, temperature: float = 0.3, max_tokens: int
             max_tokens=max_tokens,
         )
         ai_content = response.choices[0].message.content
-        
-        return ai_content if ai_content else "無法從 AI 服務獲取內容"
+    except (DeadlineExceeded, CircuitOpenError):
+        # 時間預算用完或斷路器開啟：原樣拋出，讓呼叫端停止後續的呼叫
+        raise
     except Exception as e:
         error_msg = f"Azure AI API error: {str(e)}"
         print(error_msg)
-        raise Exception(f"AI 服務調用失敗: {str(e)}")
\ No newline at end of file
+        raise Exception(f"AI 服務調用失敗: {str(e)}")
+
+    if not ai_content or not ai_content.strip():
+        finish_reason = getattr(response.choices[0], "finish_reason", None)
+        raise Exception(f"AI 服務未回傳內容 (finish_reason: {finish_reason})")
+    return ai_content
\ No newline at end of file
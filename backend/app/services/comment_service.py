@@ -1,11 +1,12 @@
 # backend/app/services/comment_service.py
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, joinedload
-from sqlalchemy import select
+from sqlalchemy import select, func
 from typing import List
 
 from app.models import ReviewComment, DailyReport, User
 from app.schemas.review_comment import ReviewCommentCreate
+from app.services import event_service
 
 async def create_comment(
     db: AsyncSession, 
@@ -38,8 +39,41 @@ async def create_comment(
     db.add(db_comment)
     await db.commit()
     await db.refresh(db_comment)
+
+    await _publish_comment_created(db, db_comment)
     return db_comment
 
+async def _publish_comment_created(db: AsyncSession, comment: ReviewComment) -> None:
+    """通知日報的員工本人與其上級主管有新留言"""
+    from app.services.supervisor_service import get_all_supervisor_ids
+
+    owner_result = await db.execute(select(DailyReport.employee_id).where(DailyReport.id == comment.report_id))
+    owner_id = owner_result.scalar_one_or_none()
+    if owner_id is None:
+        return
+
+    supervisor_ids = await get_all_supervisor_ids(db, owner_id)
+    await publish_comment_created(comment, owner_id=owner_id, supervisor_ids=supervisor_ids)
+
+async def publish_comment_created(comment: ReviewComment, *, owner_id: int, supervisor_ids: List[int]) -> None:
+    """通知日報的員工本人 (owner_id) 與其上級主管有新留言；供已知日報擁有者與主管的呼叫端 (例如審核) 使用"""
+    await event_service.publish(
+        [event_service.employee_channel(owner_id)]
+        + [event_service.supervisor_channel(sid) for sid in supervisor_ids],
+        "comment_created",
+        report_id=comment.report_id,
+        comment_id=comment.id,
+        author_user_id=comment.user_id,
+    )
+
+async def get_comments_version(db: AsyncSession, *, report_id: int) -> tuple:
+    """留言的版本資訊 (筆數, 最大 id)；留言只會新增，不會修改"""
+    stmt = select(func.count(ReviewComment.id), func.max(ReviewComment.id)).where(
+        ReviewComment.report_id == report_id
+    )
+    result = await db.execute(stmt)
+    return tuple(result.one())
+
 async def get_comments_for_report(db: AsyncSession, *, report_id: int) -> List[dict]:
     """
     獲取指定日報的所有留言，並將其組織成巢狀結構。
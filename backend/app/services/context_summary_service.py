@@ -0,0 +1,142 @@
+# backend/app/services/context_summary_service.py
+
+import datetime
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.single_flight import advisory_xact_lock
+from app.models import DailyReport, EmployeeContextSummary
+from app.services.prompt_budget_service import count_tokens, truncate_to_tokens
+
+# 壓縮摘要時移除的 Markdown 標記與多餘空白
+_MARKDOWN_MARKS = re.compile(r"(^|\s)(#{1,6}|[-*+]|\d+\.)\s+|\*\*|__|`")
+_WHITESPACE = re.compile(r"\s+")
+# 單一專案至少保留的 token 數，避免專案很多時每個都只剩幾個字
+_MIN_PROJECT_TOKENS = 40
+
+
+def _compact(text: str) -> str:
+    return _WHITESPACE.sub(" ", _MARKDOWN_MARKS.sub(" ", text or "")).strip()
+
+
+def build_daily_digest(consolidated_content: List[Dict]) -> str:
+    """
+    將一天的日報 (consolidated_content) 壓縮成一行摘要：「專案名：內容；專案名：內容」。
+    優先使用 AI 潤飾後的內容，每個專案平分 AI_CONTEXT_DAY_TOKENS 的預算。
+    """
+    parts = []
+    for project_report in consolidated_content or []:
+        text = _compact(project_report.get("ai_content") or project_report.get("content") or "")
+        if not text:
+            continue
+        project_name = (project_report.get("project") or {}).get("plan_subj_c") or "未知專案"
+        parts.append((project_name, text))
+    if not parts:
+        return ""
+
+    per_project = max(settings.AI_CONTEXT_DAY_TOKENS // len(parts), _MIN_PROJECT_TOKENS)
+    digest = "；".join(f"{name}：{truncate_to_tokens(text, per_project)}" for name, text in parts)
+    return truncate_to_tokens(digest, settings.AI_CONTEXT_DAY_TOKENS)
+
+
+def _entry_tokens(entry: Dict) -> int:
+    return count_tokens(f"{entry['date']} {entry['digest']}")
+
+
+def _trim(entries: List[Dict]) -> List[Dict]:
+    """依日期由新到舊排序，保留最多 AI_CONTEXT_MAX_DAYS 天且總 token 數不超過 AI_CONTEXT_MAX_TOKENS"""
+    entries = sorted(entries, key=lambda e: e["date"], reverse=True)[: settings.AI_CONTEXT_MAX_DAYS]
+    kept, total = [], 0
+    for entry in entries:
+        tokens = _entry_tokens(entry)
+        if total + tokens > settings.AI_CONTEXT_MAX_TOKENS:
+            break
+        kept.append(entry)
+        total += tokens
+    return kept
+
+
+async def _entries_from_history(db: AsyncSession, *, employee_id: int) -> List[Dict]:
+    """由最近的日報重建摘要 (摘要列不存在時使用，例如功能上線前已提交的日報)"""
+    query = (
+        select(DailyReport.date, DailyReport.consolidated_content)
+        .where(DailyReport.employee_id == employee_id)
+        .order_by(DailyReport.date.desc())
+        .limit(settings.AI_CONTEXT_MAX_DAYS)
+    )
+    result = await db.execute(query)
+    entries = []
+    for report_date, consolidated_content in result.all():
+        digest = build_daily_digest(consolidated_content)
+        if digest:
+            entries.append({"date": report_date.isoformat(), "digest": digest})
+    return entries
+
+
+async def _save(db: AsyncSession, *, employee_id: int, entries: List[Dict], overwrite: bool = True) -> None:
+    """寫入摘要列；overwrite=False 時已存在的摘要列 (可能較新) 保持不變"""
+    token_count = sum(_entry_tokens(entry) for entry in entries)
+    stmt = insert(EmployeeContextSummary).values(
+        employee_id=employee_id, entries=entries, token_count=token_count
+    )
+    if overwrite:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EmployeeContextSummary.employee_id],
+            set_={"entries": stmt.excluded.entries, "token_count": stmt.excluded.token_count},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[EmployeeContextSummary.employee_id])
+    await db.execute(stmt)
+
+
+async def record_daily_report(
+    db: AsyncSession,
+    *,
+    employee_id: int,
+    report_date: datetime.date,
+    consolidated_content: List[Dict],
+) -> None:
+    """
+    提交日報時更新員工的滾動摘要：以當天的摘要取代同日期的舊摘要，再裁切到天數與 token 上限。
+    只寫入目前的交易，由呼叫端 commit；同一員工的更新以 advisory lock 排隊。
+    """
+    await advisory_xact_lock(db, f"context_summary:{employee_id}")
+    summary = await db.get(EmployeeContextSummary, employee_id, populate_existing=True)
+    if summary is None:
+        entries = await _entries_from_history(db, employee_id=employee_id)
+    else:
+        entries = list(summary.entries or [])
+
+    date_key = report_date.isoformat()
+    entries = [entry for entry in entries if entry["date"] != date_key]
+    digest = build_daily_digest(consolidated_content)
+    if digest:
+        entries.append({"date": date_key, "digest": digest})
+
+    await _save(db, employee_id=employee_id, entries=_trim(entries))
+
+
+async def get_recent_context(db: AsyncSession, *, employee_id: int, before: datetime.date) -> Optional[str]:
+    """
+    取得 before 之前幾天的日報摘要 (供 AI 回覆建議作為上下文)，沒有資料時回傳 None。
+    一般情況只需一次主鍵查詢；摘要列不存在時由最近的日報建立並儲存。
+    """
+    summary = await db.get(EmployeeContextSummary, employee_id)
+    if summary is None:
+        entries = _trim(await _entries_from_history(db, employee_id=employee_id))
+        if not entries:
+            return None
+        await _save(db, employee_id=employee_id, entries=entries, overwrite=False)
+        await db.commit()
+        print(f"[INFO] 已由歷史日報建立員工 {employee_id} 的上下文摘要 ({len(entries)} 天)")
+    else:
+        entries = summary.entries or []
+
+    before_key = before.isoformat()
+    lines = [f"{entry['date']}：{entry['digest']}" for entry in entries if entry["date"] < before_key]
+    return "\n".join(lines) or None
@@ -3,12 +3,27 @@
 from azure.core.credentials import AzureKeyCredential
 from azure.ai.documentintelligence import DocumentIntelligenceClient
 from azure.ai.documentintelligence.models import AnalyzeResult
-from typing import IO
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+from typing import IO, Callable, Optional
 import os
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
 from app.core.config import settings
+from app.core import deadline
+from app.core.deadline import DeadlineExceeded
+from app.core.circuit_breaker import document_intelligence_breaker
+from app.core.single_flight import SingleFlight
+
+# 同一個檔案的並行分析只執行一次
+_analyze_flight = SingleFlight("文件分析")
+
+def _is_outage(error: Exception) -> bool:
+    """逾時、連線失敗與 5xx 代表服務異常；其他錯誤 (例如不支援的檔案格式) 不影響斷路器"""
+    if isinstance(error, (ServiceRequestError, ServiceResponseError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, HttpResponseError):
+        return error.status_code is None or error.status_code >= 500
+    return False
 
 def _build_client() -> DocumentIntelligenceClient | None:
     if not settings.AZURE_DOC_INTELLIGENCE_ENDPOINT or not settings.AZURE_DOC_INTELLIGENCE_KEY:
@@ -19,9 +34,9 @@ def _build_client() -> DocumentIntelligenceClient | None:
         credential=AzureKeyCredential(settings.AZURE_DOC_INTELLIGENCE_KEY),
     )
 
-def _analyze_document_sync(file_stream: IO[bytes]) -> str:
+def _analyze_document_sync(file_stream: IO[bytes], timeout: Optional[float] = None) -> str:
     """
-    同步分析文件流的內部函數。
+    同步分析文件流的內部函數 (最多等待 timeout 秒)。
     """
     client = _build_client()
     if client is None:
@@ -31,25 +46,40 @@ def _analyze_document_sync(file_stream: IO[bytes]) -> str:
         body=file_stream,
         content_type="application/octet-stream"
     )
-    result: AnalyzeResult = poller.result()
+    result: AnalyzeResult = poller.result(timeout=timeout)
+    if not poller.done():
+        raise TimeoutError("文件分析逾時")
     return result.content if result.content else "無法從文件中提取任何文字內容。"
 
+async def _run_analysis(func: Callable[..., str], source) -> str:
+    """
+    在線程池中執行同步的分析函式，斷路器開啟中時立即拋出 CircuitOpenError。
+    最多等待 DOC_ANALYSIS_TIMEOUT_SECONDS 與請求剩餘時間預算中較短者；預算用完時拋出 DeadlineExceeded。
+    """
+    timeout = deadline.timeout(settings.DOC_ANALYSIS_TIMEOUT_SECONDS)
+    async with document_intelligence_breaker.guard(_is_outage):
+        loop = asyncio.get_running_loop()
+        try:
+            return await deadline.wait_for(loop.run_in_executor(None, func, source, timeout), None)
+        except TimeoutError:
+            if deadline.expired():
+                raise DeadlineExceeded("請求的時間預算已用完") from None
+            raise
+
 async def analyze_document_from_stream(file_stream: IO[bytes]) -> str:
     """
     分析文件流 (來自使用者上傳)，並提取其所有文字內容。
     """
     try:
-        # 在線程池中運行阻塞操作
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            result = await loop.run_in_executor(executor, _analyze_document_sync, file_stream)
-        return result
+        return await _run_analysis(_analyze_document_sync, file_stream)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return "文件分析服務暫時無法使用。"
 
-def _analyze_document_from_path_sync(file_path: str) -> str:
+def _analyze_document_from_path_sync(file_path: str, timeout: Optional[float] = None) -> str:
     """
-    同步分析檔案路徑的內部函數。
+    同步分析檔案路徑的內部函數 (最多等待 timeout 秒)。
     """
     client = _build_client()
     if client is None:
@@ -60,7 +90,9 @@ def _analyze_document_from_path_sync(file_path: str) -> str:
             body=f,
             content_type="application/octet-stream"
         )
-        result: AnalyzeResult = poller.result()
+        result: AnalyzeResult = poller.result(timeout=timeout)
+        if not poller.done():
+            raise TimeoutError("文件分析逾時")
     return result.content if result.content else "無法從文件中提取任何文字內容。"
 
 async def analyze_document_from_path(file_path: str) -> str:
@@ -69,13 +101,17 @@ async def analyze_document_from_path(file_path: str) -> str:
     """
     if not os.path.exists(file_path):
         return f"錯誤：找不到檔案路徑 {file_path}"
-    
+
+    # 檔案被覆寫時 (修改時間或大小不同) 視為不同的請求
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+    return await _analyze_flight.do(key, lambda: _analyze_path(file_path))
+
+async def _analyze_path(file_path: str) -> str:
     try:
-        # 在線程池中運行阻塞操作
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            result = await loop.run_in_executor(executor, _analyze_document_from_path_sync, file_path)
-        return result
+        return await _run_analysis(_analyze_document_from_path_sync, file_path)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return "文件分析服務暫時無法使用。"
 
@@ -0,0 +1,196 @@
+# backend/app/services/event_service.py
+
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+
+# 每個訂閱者的佇列上限；前端處理不及時丟棄最舊的事件 (事件只是「有變動」的提示)
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# PostgreSQL LISTEN/NOTIFY 使用的頻道名稱
+PG_NOTIFY_CHANNEL = "topco_events"
+# LISTEN 連線中斷後的重新連線間隔 (指數退避)，以及連線健康檢查的間隔
+LISTEN_RECONNECT_BASE_SECONDS = 1.0
+LISTEN_RECONNECT_MAX_SECONDS = 30.0
+LISTEN_HEALTH_CHECK_SECONDS = 15.0
+
+
+def employee_channel(employee_id: int) -> str:
+    """員工本人的頻道：自己的日報被審核、收到留言回覆"""
+    return f"employee:{employee_id}"
+
+
+def supervisor_channel(supervisor_id: int) -> str:
+    """主管的頻道：下屬提交日報、下屬日報有新留言"""
+    return f"supervisor:{supervisor_id}"
+
+
+class InProcessBroker:
+    """
+    單一程序內的事件分發。
+    每個訂閱者擁有一個 asyncio.Queue，發布時依頻道直接放入佇列。
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def _deliver(self, channels: Iterable[str], event: dict) -> None:
+        delivered: Set[int] = set()
+        for channel in channels:
+            for queue in self._subscribers.get(channel, ()):
+                # 同一個訂閱者可能同時訂閱多個符合的頻道，只送一次
+                if id(queue) in delivered:
+                    continue
+                delivered.add(id(queue))
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(event)
+
+    async def publish(self, channels: Iterable[str], event: dict) -> None:
+        self._deliver(list(channels), event)
+
+    async def subscribe(self, channels: List[str]) -> AsyncIterator[dict]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        for channel in channels:
+            self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            for channel in channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(queue)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    多個 worker 時使用：發布透過 pg_notify 廣播，
+    每個 worker 以一條專用連線 LISTEN，收到後再分發給本程序的訂閱者。
+    LISTEN 連線中斷 (例如資料庫重啟) 時以指數退避重新連線並重新 LISTEN；
+    發布用的連線在下次發布時重新建立。
+    """
+
+    def __init__(self, dsn: str):
+        super().__init__()
+        # asyncpg 直接連線不接受 SQLAlchemy 的 driver 前綴
+        self._dsn = dsn.replace("postgresql+asyncpg://", "postgresql://")
+        self._listen_conn = None
+        self._listen_task: Optional[asyncio.Task] = None
+        self._publish_conn = None
+        self._publish_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        self._listen_task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            try:
+                await self._listen_task
+            except asyncio.CancelledError:
+                pass
+            self._listen_task = None
+        if self._publish_conn is not None:
+            await self._publish_conn.close()
+            self._publish_conn = None
+
+    async def _listen_once(self) -> None:
+        """建立 LISTEN 連線並維持到連線中斷為止 (中斷時拋出例外)"""
+        import asyncpg
+
+        conn = await asyncpg.connect(self._dsn)
+        lost = asyncio.Event()
+        conn.add_termination_listener(lambda connection: lost.set())
+        try:
+            await conn.add_listener(PG_NOTIFY_CHANNEL, self._on_notify)
+            self._listen_conn = conn
+            print("[INFO] 事件 LISTEN 連線已建立")
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), LISTEN_HEALTH_CHECK_SECONDS)
+                except asyncio.TimeoutError:
+                    # 網路中斷時不一定會收到連線終止的通知，定期確認連線仍可使用
+                    await asyncio.wait_for(conn.execute("SELECT 1"), LISTEN_HEALTH_CHECK_SECONDS)
+            raise ConnectionError("LISTEN 連線已中斷")
+        finally:
+            self._listen_conn = None
+            if not conn.is_closed():
+                conn.terminate()
+
+    async def _listen_forever(self) -> None:
+        attempt = 0
+        while True:
+            started = asyncio.get_running_loop().time()
+            try:
+                await self._listen_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 連線維持超過最大間隔才算恢復正常，重新計算退避
+                if asyncio.get_running_loop().time() - started > LISTEN_RECONNECT_MAX_SECONDS:
+                    attempt = 0
+                delay = min(LISTEN_RECONNECT_MAX_SECONDS, LISTEN_RECONNECT_BASE_SECONDS * (2 ** attempt))
+                attempt += 1
+                print(f"[WARNING] 事件 LISTEN 連線失敗 ({type(e).__name__}: {e})，{delay:g} 秒後重新連線")
+                await asyncio.sleep(delay)
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except json.JSONDecodeError:
+            return
+        self._deliver(message.get("channels", []), message.get("event", {}))
+
+    async def publish(self, channels: Iterable[str], event: dict) -> None:
+        import asyncpg
+
+        payload = json.dumps({"channels": list(channels), "event": event}, default=str)
+        async with self._publish_lock:
+            if self._publish_conn is None or self._publish_conn.is_closed():
+                self._publish_conn = await asyncpg.connect(self._dsn)
+            try:
+                await self._publish_conn.execute("SELECT pg_notify($1, $2)", PG_NOTIFY_CHANNEL, payload)
+            except (OSError, asyncpg.exceptions.ConnectionDoesNotExistError):
+                # 連線已失效：下次發布時重新連線
+                self._publish_conn.terminate()
+                self._publish_conn = None
+                raise
+
+
+def _build_broker():
+    if settings.EVENT_BROKER == "postgres":
+        return PostgresBroker(settings.DATABASE_URL)
+    return InProcessBroker()
+
+
+broker = _build_broker()
+
+
+async def publish(channels: Iterable[str], event_type: str, **data) -> None:
+    """
+    發布事件。事件只帶識別資訊，前端收到後再自行重新讀取。
+    發布失敗不應影響主要流程，因此只記錄錯誤。
+    """
+    channels = list(channels)
+    if not channels:
+        return
+    try:
+        await broker.publish(channels, {"type": event_type, **data})
+    except Exception as e:
+        print(f"[ERROR] 事件發布失敗 ({event_type}): {e}")
+
+
+async def subscribe(channels: List[str]) -> AsyncIterator[dict]:
+    async for event in broker.subscribe(channels):
+        yield event
@@ -0,0 +1,476 @@
+# backend/app/services/org_graph_service.py
+
+import asyncio
+import glob
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.core.cache import get_generation, ORG_DATA
+from app.core.config import settings
+from app.models import Employee, Supervisor, Project, ProjectMember
+
+# 多主管 (DAG) 時 Euler tour 會重複展開共同下級，超過此倍數就放棄改回資料庫查詢
+MAX_TOUR_FACTOR = 8
+
+# --- 快照檔格式 ---
+# 檔頭: magic, 格式版本, 內容 CRC32, 資料版本, 區段數；接著每個區段的 (位移, 筆數)
+# 區段依 SNAPSHOT_SECTIONS 的順序存放，皆以 8 bytes 對齊，使用 little-endian
+SNAPSHOT_MAGIC = b"TSCORGv1"
+SNAPSHOT_FORMAT = 1
+_HEADER = struct.Struct("<8sIIQI")
+_SECTION = struct.Struct("<QQ")
+
+# (區段名稱, array typecode)；員工/專案ID 用 int64，節點索引與位置用 int32
+SNAPSHOT_SECTIONS = (
+    ("ids", "q"),              # 節點索引 -> 員工ID (遞增排序)
+    ("id_index", "i"),         # 員工ID -> 節點索引 (ID 稀疏時為空，改用二分搜尋)
+    ("child_offsets", "i"),
+    ("children", "i"),
+    ("parent_offsets", "i"),
+    ("parents", "i"),
+    ("tour", "q"),             # 前序走訪的員工ID
+    ("first_in", "i"),
+    ("first_out", "i"),
+    ("occ_offsets", "i"),
+    ("occ_pos", "i"),
+    ("project_offsets", "i"),
+    ("projects", "q"),         # 員工擔任 PM 或為成員的專案ID
+)
+
+
+class OrgGraphCycleError(ValueError):
+    """主管關係中有循環，無法建立 Euler tour"""
+
+
+class OrgGraph:
+    """
+    以整數員工ID為鍵、陣列儲存的組織圖 (不可變，版本更新時整個替換)：
+    - children/parents 為 CSR 鄰接表 (offsets + 扁平陣列)
+    - tour 為由根節點前序走訪的員工ID序列，每個員工第一次出現的區間
+      [first_in, first_out) 即為「自己 + 所有下級」，下級列表是一段連續切片
+    - 有多位主管的員工會在 tour 中出現多次，occ_* 記錄每次出現的位置
+    - projects 為每位員工參與 (PM 或成員) 的專案ID
+    各區段可以是 array，也可以是直接對應快照檔的 memoryview (不複製)。
+    """
+
+    def __init__(self, generation: int, sections: Dict[str, Sequence[int]]):
+        self.generation = generation
+        for name, _ in SNAPSHOT_SECTIONS:
+            setattr(self, "_" + name, sections[name])
+        # 有員工出現一次以上即代表有多位主管
+        self.has_multiple_parents = len(self._tour) > len(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _node(self, employee_id: int) -> Optional[int]:
+        if employee_id is None or employee_id < 0:
+            return None
+        id_index = self._id_index
+        if len(id_index):
+            if employee_id < len(id_index) and id_index[employee_id] >= 0:
+                return id_index[employee_id]
+            return None
+        i = bisect_left(self._ids, employee_id)
+        if i < len(self._ids) and self._ids[i] == employee_id:
+            return i
+        return None
+
+    def is_ancestor(self, supervisor_id: int, employee_id: int) -> bool:
+        """supervisor_id 是否為 employee_id 的直屬或間接主管"""
+        s = self._node(supervisor_id)
+        e = self._node(employee_id)
+        if s is None or e is None:
+            return False
+        lo, hi = self._first_in[s], self._first_out[s]
+        # 單一主管時只有一個出現位置，即 O(1) 區間比較
+        for k in range(self._occ_offsets[e], self._occ_offsets[e + 1]):
+            if lo < self._occ_pos[k] < hi:
+                return True
+        return False
+
+    def descendant_slice(self, supervisor_id: int) -> Sequence[int]:
+        """所有下級員工ID 的連續切片 (多主管時可能含重複ID)"""
+        s = self._node(supervisor_id)
+        if s is None:
+            return self._tour[0:0]
+        return self._tour[self._first_in[s] + 1:self._first_out[s]]
+
+    def descendant_ids(self, supervisor_id: int) -> List[int]:
+        """所有下級員工ID（直屬與間接，不重複），依組織走訪順序"""
+        descendants = self.descendant_slice(supervisor_id).tolist()
+        if self.has_multiple_parents:
+            return list(dict.fromkeys(descendants))
+        return descendants
+
+    def has_subordinates(self, supervisor_id: int) -> bool:
+        s = self._node(supervisor_id)
+        return s is not None and self._child_offsets[s] < self._child_offsets[s + 1]
+
+    def child_ids(self, supervisor_id: int) -> List[int]:
+        """直屬下級員工ID"""
+        s = self._node(supervisor_id)
+        if s is None:
+            return []
+        return [self._ids[c] for c in self._children[self._child_offsets[s]:self._child_offsets[s + 1]]]
+
+    def ancestor_ids(self, employee_id: int) -> List[int]:
+        """所有上級主管ID（直屬與間接，不重複）"""
+        e = self._node(employee_id)
+        if e is None:
+            return []
+        seen = set()
+        result = []
+        frontier = [e]
+        while frontier:
+            node = frontier.pop()
+            for k in range(self._parent_offsets[node], self._parent_offsets[node + 1]):
+                parent = self._parents[k]
+                if parent not in seen:
+                    seen.add(parent)
+                    result.append(self._ids[parent])
+                    frontier.append(parent)
+        return result
+
+    def project_ids(self, employee_id: int) -> List[int]:
+        """員工擔任 PM 或為成員的專案ID (含已停用的專案)"""
+        e = self._node(employee_id)
+        if e is None:
+            return []
+        return self._projects[self._project_offsets[e]:self._project_offsets[e + 1]].tolist()
+
+    # --- 快照檔 ---
+
+    def to_bytes(self) -> bytes:
+        """序列化為快照檔內容"""
+        if sys.byteorder != "little":
+            raise RuntimeError("快照檔僅支援 little-endian 平台")
+        payload = bytearray()
+        table = []
+        data_start = _HEADER.size + _SECTION.size * len(SNAPSHOT_SECTIONS)
+        data_start += -data_start % 8
+        for name, typecode in SNAPSHOT_SECTIONS:
+            values = getattr(self, "_" + name)
+            chunk = array(typecode, values)
+            table.append((data_start + len(payload), len(chunk)))
+            payload += chunk.tobytes()
+            payload += b"\0" * (-len(payload) % 8)
+
+        header = bytearray(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, 0, self.generation, len(table)))
+        for offset, count in table:
+            header += _SECTION.pack(offset, count)
+        header += b"\0" * (data_start - len(header))
+        crc = zlib.crc32(payload)
+        header[:_HEADER.size] = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, crc, self.generation, len(table))
+        return bytes(header + payload)
+
+    @classmethod
+    def from_buffer(cls, buffer) -> "OrgGraph":
+        """由快照內容 (bytes 或 mmap) 建立組織圖，各區段直接引用 buffer 不複製"""
+        view = memoryview(buffer)
+        if len(view) < _HEADER.size:
+            raise ValueError("快照檔過短")
+        magic, fmt, crc, generation, count = _HEADER.unpack_from(view, 0)
+        if magic != SNAPSHOT_MAGIC or fmt != SNAPSHOT_FORMAT or count != len(SNAPSHOT_SECTIONS):
+            raise ValueError("快照檔格式不符")
+
+        sections = {}
+        data_start = None
+        for i, (name, typecode) in enumerate(SNAPSHOT_SECTIONS):
+            offset, items = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            if data_start is None:
+                data_start = offset
+            end = offset + items * struct.calcsize("<" + typecode)
+            if end > len(view):
+                raise ValueError("快照檔內容不完整")
+            sections[name] = view[offset:end].cast(typecode)
+        if zlib.crc32(view[data_start:]) != crc:
+            raise ValueError("快照檔檢查碼不符")
+        return cls(generation, sections)
+
+
+def build_org_graph_from_rows(
+    generation: int,
+    employee_ids: Iterable[int],
+    edges: Iterable[Tuple[int, int]],
+    memberships: Iterable[Tuple[int, int]] = (),
+) -> OrgGraph:
+    """
+    由員工ID、(主管ID, 員工ID) 關係與 (員工ID, 專案ID) 參與關係建立組織圖。
+    主管關係有循環時拋出 OrgGraphCycleError。
+    """
+    ids = sorted(set(employee_ids))
+    n = len(ids)
+    index = {emp_id: i for i, emp_id in enumerate(ids)}
+
+    # 員工ID 大致連續時以陣列直接查表，否則用二分搜尋
+    max_id = ids[-1] if ids else -1
+    if ids and ids[0] >= 0 and max_id <= 4 * n + 1024:
+        id_index = array("i", [-1]) * (max_id + 1)
+        for i, emp_id in enumerate(ids):
+            id_index[emp_id] = i
+    else:
+        id_index = array("i")
+
+    pairs = sorted({
+        (index[sup_id], index[emp_id])
+        for sup_id, emp_id in edges
+        if sup_id in index and emp_id in index
+    })
+    child_offsets, children = _build_csr(n, pairs)
+    parent_offsets, parents = _build_csr(n, sorted((c, p) for p, c in pairs))
+
+    member_pairs = sorted({
+        (index[emp_id], project_id)
+        for emp_id, project_id in memberships
+        if emp_id in index
+    })
+    project_offsets, projects = _build_csr(n, member_pairs, typecode="q")
+
+    sections = {
+        "ids": array("q", ids),
+        "id_index": id_index,
+        "child_offsets": child_offsets,
+        "children": children,
+        "parent_offsets": parent_offsets,
+        "parents": parents,
+        "project_offsets": project_offsets,
+        "projects": projects,
+    }
+    sections.update(_build_tour(sections, n, max_length=MAX_TOUR_FACTOR * n + 1024))
+    return OrgGraph(generation, sections)
+
+
+def _build_tour(sections: Dict[str, array], n: int, max_length: int) -> Dict[str, array]:
+    child_offsets, children, ids = sections["child_offsets"], sections["children"], sections["ids"]
+    parent_offsets = sections["parent_offsets"]
+    tour = array("q")
+    first_in = array("i", [-1]) * n
+    first_out = array("i", [-1]) * n
+    occurrences: List[List[int]] = [[] for _ in range(n)]
+    on_path = bytearray(n)
+
+    roots = [i for i in range(n) if parent_offsets[i] == parent_offsets[i + 1]]
+    for root in roots:
+        # 以明確堆疊進行 DFS，避免組織層級過深時超過遞迴上限
+        stack = [[root, child_offsets[root]]]
+        first_in[root] = len(tour)
+        occurrences[root].append(len(tour))
+        tour.append(ids[root])
+        on_path[root] = 1
+        while stack:
+            frame = stack[-1]
+            node, k = frame
+            if k < child_offsets[node + 1]:
+                frame[1] = k + 1
+                child = children[k]
+                if on_path[child]:
+                    raise OrgGraphCycleError(f"主管關係循環: 員工 {ids[node]} -> {ids[child]}")
+                if len(tour) >= max_length:
+                    raise OrgGraphCycleError("多主管關係展開後過大")
+                if first_in[child] == -1:
+                    first_in[child] = len(tour)
+                occurrences[child].append(len(tour))
+                tour.append(ids[child])
+                on_path[child] = 1
+                stack.append([child, child_offsets[child]])
+            else:
+                on_path[node] = 0
+                if first_out[node] == -1:
+                    first_out[node] = len(tour)
+                stack.pop()
+
+    if any(pos == -1 for pos in first_in):
+        # 沒有根節點可到達的員工只可能位於循環中
+        raise OrgGraphCycleError("主管關係循環: 部分員工無法由最上層主管到達")
+
+    occ_offsets = array("i", [0])
+    occ_pos = array("i")
+    for positions in occurrences:
+        occ_pos.extend(positions)
+        occ_offsets.append(len(occ_pos))
+    return {
+        "tour": tour,
+        "first_in": first_in,
+        "first_out": first_out,
+        "occ_offsets": occ_offsets,
+        "occ_pos": occ_pos,
+    }
+
+
+def _build_csr(n: int, pairs: List[Tuple[int, int]], typecode: str = "i") -> Tuple[array, array]:
+    """由已排序的 (來源, 目標) 節點對建立 CSR 鄰接表"""
+    offsets = array("i", [0]) * (n + 1)
+    for source, _ in pairs:
+        offsets[source + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    targets = array(typecode, (target for _, target in pairs))
+    return offsets, targets
+
+
+async def build_org_graph(db: AsyncSession, generation: int) -> OrgGraph:
+    """從 employees、supervisors 與專案相關表建立組織圖"""
+    employee_rows = await db.execute(select(Employee.id, Employee.empno))
+    employees = employee_rows.all()
+    id_by_empno = {empno: emp_id for emp_id, empno in employees}
+
+    relation_rows = await db.execute(select(Supervisor.supervisor, Supervisor.empno))
+    edges = [
+        (id_by_empno[sup_empno], id_by_empno[empno])
+        for sup_empno, empno in relation_rows.all()
+        if sup_empno in id_by_empno and empno in id_by_empno
+    ]
+
+    pm_rows = await db.execute(select(Project.pm_empno, Project.id))
+    member_rows = await db.execute(
+        select(ProjectMember.part_empno, Project.id).join(Project, Project.planno == ProjectMember.planno)
+    )
+    memberships = [
+        (id_by_empno[empno], project_id)
+        for empno, project_id in list(pm_rows.all()) + list(member_rows.all())
+        if empno in id_by_empno
+    ]
+    return build_org_graph_from_rows(generation, [emp_id for emp_id, _ in employees], edges, memberships)
+
+
+# --- 跨 worker 共用的快照檔 ---
+
+def snapshot_dir() -> str:
+    return settings.ORG_SNAPSHOT_DIR or os.path.join(tempfile.gettempdir(), "tsc_org_snapshot")
+
+
+def snapshot_path(generation: int) -> str:
+    # 檔名含資料版本：Windows 無法覆寫已被 mmap 的檔案，每個版本各自一個檔
+    return os.path.join(snapshot_dir(), f"org_snapshot_{generation}.bin")
+
+
+def write_snapshot(graph: OrgGraph) -> str:
+    """
+    將組織圖寫成快照檔 (先寫暫存檔再改名，讀取端不會看到寫到一半的檔案)，
+    並清除舊版本的快照檔。回傳快照檔路徑。
+    """
+    directory = snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(graph.generation)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".org_snapshot_", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(graph.to_bytes())
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp 建立的檔案只有擁有者可讀，同步腳本與 API 可能以不同帳號執行
+        os.chmod(tmp_path, 0o644)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # 同版本的快照檔已被其他 worker 寫入且正在使用 (Windows)，內容相同可直接沿用
+            os.remove(tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    for old_path in glob.glob(os.path.join(directory, "org_snapshot_*.bin")):
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                # 仍被其他 worker 對應中 (Windows)，下次再清
+                pass
+    return path
+
+
+def map_snapshot(generation: int) -> Optional[OrgGraph]:
+    """以 mmap 載入指定版本的快照檔 (多個 worker 共用同一份記憶體分頁)；不存在或損毀時回傳 None"""
+    path = snapshot_path(generation)
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # 檔案不存在或為空檔
+        return None
+    try:
+        graph = OrgGraph.from_buffer(mapped)
+    except ValueError as e:
+        print(f"[WARNING] 組織快照檔無法使用 ({path}): {e}")
+        return None
+    if graph.generation != generation:
+        return None
+    return graph
+
+
+async def publish_snapshot(db: AsyncSession, generation: int) -> Optional[OrgGraph]:
+    """由資料庫建立組織圖並寫出快照檔 (同步腳本完成後呼叫)"""
+    try:
+        graph = await build_org_graph(db, generation)
+    except OrgGraphCycleError as e:
+        print(f"[WARNING] 無法建立組織圖 (版本 {generation})，改用資料庫查詢: {e}")
+        return None
+    path = write_snapshot(graph)
+    print(f"[SUCCESS] 組織快照檔已寫入 - 版本: {generation}, 員工數: {len(graph)}, 路徑: {path}")
+    return graph
+
+
+# 目前使用中的組織圖：(資料版本, 組織圖)；建立失敗時組織圖為 None，該版本改用資料庫查詢
+_current: Optional[Tuple[int, Optional[OrgGraph]]] = None
+_load_lock = asyncio.Lock()
+
+
+async def load_org_graph(db: AsyncSession) -> Optional[OrgGraph]:
+    """
+    載入目前資料版本的組織圖並替換 (啟動時與資料版本變更時呼叫)：
+    優先 mmap 既有的快照檔；沒有時自行由資料庫建立並寫出快照檔，讓其他 worker 直接共用。
+    """
+    global _current
+    generation = await get_generation(db, ORG_DATA)
+    start = time.perf_counter()
+
+    graph = map_snapshot(generation)
+    source = "快照檔"
+    if graph is None:
+        source = "資料庫"
+        try:
+            graph = await build_org_graph(db, generation)
+        except OrgGraphCycleError as e:
+            print(f"[WARNING] 無法建立組織圖 (版本 {generation})，改用資料庫查詢: {e}")
+        else:
+            try:
+                write_snapshot(graph)
+                graph = map_snapshot(generation) or graph
+            except OSError as e:
+                print(f"[WARNING] 組織快照檔寫入失敗，僅在此程序內使用: {e}")
+
+    if graph is not None:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"[INFO] 組織圖已載入 ({source}) - 版本: {generation}, 員工數: {len(graph)}, 耗時: {elapsed_ms:.1f}ms")
+    _current = (generation, graph)
+    return graph
+
+
+async def get_org_graph(db: AsyncSession) -> Optional[OrgGraph]:
+    """
+    取得與目前資料版本一致的組織圖。
+    資料同步後版本號改變時重新載入並整個替換；回傳 None 表示應改用資料庫查詢。
+    """
+    generation = await get_generation(db, ORG_DATA)
+    current = _current
+    if current is not None and current[0] == generation:
+        return current[1]
+
+    async with _load_lock:
+        current = _current
+        if current is not None and current[0] == generation:
+            return current[1]
+        return await load_org_graph(db)
@@ -2,43 +2,62 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_, and_
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, Optional
 
 from app.models.project import Project
 from app.models.department import Department
 from app.models.employee import Employee
-from app.schemas.project import ProjectCreate
+from app.schemas.project import ProjectCreate, Project as ProjectSchema
+from app.core.cache import VersionedCache, get_generation, bump_generation, ORG_DATA
+from app.services import org_graph_service
 
-async def get_all_active(db: AsyncSession) -> List[Project]:
-    query = select(Project).where(Project.is_active == True).order_by(Project.plan_subj_c)
-    result = await db.execute(query)
-    return result.scalars().all()
+# 專案列表只會在同步腳本執行或新增專案時改變，以資料版本號控制的記憶體快取
+_project_list_cache = VersionedCache()
 
-# backend/app/services/projects_service.py
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, and_
-from sqlalchemy.orm import selectinload
-from typing import List
+async def get_all_active(db: AsyncSession) -> List[ProjectSchema]:
+    generation = await get_generation(db, ORG_DATA)
+    cached = _project_list_cache.get("all", generation)
+    if cached is not None:
+        return cached
 
-from app.models.project import Project
-from app.models.department import Department
-from app.models.employee import Employee
-from app.schemas.project import ProjectCreate
-
-async def get_all_active(db: AsyncSession) -> List[Project]:
     query = select(Project).where(Project.is_active == True).order_by(Project.plan_subj_c)
     result = await db.execute(query)
-    return result.scalars().all()
+    projects = [ProjectSchema.model_validate(p) for p in result.scalars().all()]
+    _project_list_cache.set("all", generation, projects)
+    return projects
 
-async def get_projects_for_employee(db: AsyncSession, employee: Employee) -> List[Project]:
+async def get_by_id(db: AsyncSession, project_id: int) -> Optional[ProjectSchema]:
+    """以 ID 取得專案 (包含已停用的專案)，整張專案表依資料版本號快取於記憶體"""
+    generation = await get_generation(db, ORG_DATA)
+    projects = _project_list_cache.get("by_id", generation)
+    if projects is None:
+        result = await db.execute(select(Project))
+        projects = {p.id: ProjectSchema.model_validate(p) for p in result.scalars().all()}
+        _project_list_cache.set("by_id", generation, projects)
+    return projects.get(project_id)
+
+async def get_projects_for_employee(db: AsyncSession, employee: Employee) -> List[ProjectSchema]:
     """
     (優化後) 取得員工可用的工作計畫，使用單一查詢。
     基於：
     1. 員工作為專案經理
     2. 員工是專案成員
+    結果依員工編號快取，直到資料版本號改變。
+    組織快照可用時直接由快照中的參與專案過濾進行中專案列表，不需查詢資料庫。
     """
     from app.models import ProjectMember
 
+    graph = await org_graph_service.get_org_graph(db)
+    if graph is not None:
+        project_ids = set(graph.project_ids(employee.id))
+        return [p for p in await get_all_active(db) if p.id in project_ids]
+
+    generation = await get_generation(db, ORG_DATA)
+    cache_key = ("employee", employee.empno)
+    cached = _project_list_cache.get(cache_key, generation)
+    if cached is not None:
+        return cached
+
     # 建立所有可能的條件 - 只包含員工直接相關的專案
     conditions = [
         # 條件1: 員工作為專案經理
@@ -70,7 +89,9 @@ async def get_projects_for_employee(db: AsyncSession, employee: Employee) -> Lis
 
     # 執行一次查詢
     result = await db.execute(query)
-    return result.scalars().all()
+    projects = [ProjectSchema.model_validate(p) for p in result.scalars().all()]
+    _project_list_cache.set(cache_key, generation, projects)
+    return projects
 
 async def create(db: AsyncSession, *, obj_in: ProjectCreate) -> Project:
     db_obj = Project(
@@ -81,6 +102,8 @@ async def create(db: AsyncSession, *, obj_in: ProjectCreate) -> Project:
         department_id=obj_in.department_id
     )
     db.add(db_obj)
+    await bump_generation(db, ORG_DATA)
     await db.commit()
     await db.refresh(db_obj)
+    _project_list_cache.clear()
     return db_obj
@@ -0,0 +1,160 @@
+# backend/app/services/prompt_budget_service.py
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services import retrieval_service
+
+# 切塊時優先在段落，其次在句子結尾斷開
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT = re.compile(r"(?<=[。！？；.!?;\n])")
+# 切塊時片段之間的換行
+_JOIN_TOKENS = 1
+# 每個參考片段額外佔用的 token 上限：文件標題 "[參考文件 N]" 或片段之間的 "..." 分隔
+_SECTION_OVERHEAD_TOKENS = 10
+
+
+def count_tokens(text: str) -> int:
+    """
+    在本機估算文字的 token 數 (不需呼叫 API 或下載詞表)。
+    中文等寬字元以 4/3 個 token 計、其餘字元以每 4 個字元 1 個 token 計，
+    對 GPT 系列的 tokenizer 來說是偏保守 (略為高估) 的估計。
+    寬字元 (U+0800 以上，主要為中日韓文字與全形標點) 的數量由 UTF-8 編碼長度推算，
+    UTF-8 下它們佔 3 bytes、ASCII 佔 1 byte，不必逐字比對。
+    """
+    if not text:
+        return 0
+    wide = (len(text.encode("utf-8", "surrogatepass")) - len(text)) // 2
+    other = len(text) - wide
+    return (wide * 4 + 2) // 3 + (other + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """將文字截斷到 max_tokens 以內 (以二分搜尋找出最長的前綴)"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    # 每個字元至少 1/4 個 token，超過 4 * max_tokens 個字元必定超出預算
+    low, high = 0, min(len(text), max_tokens * 4 + 3)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+
+def chunk_text(text: str, chunk_tokens: int) -> List[str]:
+    """
+    將長文件切成每塊約 chunk_tokens 的片段。
+    依段落累積，段落過長時改以句子累積，單一句子仍過長時直接硬切。
+    """
+    pieces: List[str] = []
+    for paragraph in _PARAGRAPH_SPLIT.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) <= chunk_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_SPLIT.split(paragraph):
+            sentence = sentence.strip()
+            while sentence:
+                head = truncate_to_tokens(sentence, chunk_tokens) or sentence[:1]
+                pieces.append(head)
+                sentence = sentence[len(head):].strip()
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece in pieces:
+        # 片段之間以換行連接，換行也計入 token
+        piece_tokens = count_tokens(piece) + (_JOIN_TOKENS if current else 0)
+        if current and current_tokens + piece_tokens > chunk_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+            piece_tokens = count_tokens(piece)
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class PackedPrompt:
+    """依 token 預算裁切後的筆記與參考資料，以及裁切統計"""
+
+    def __init__(self, notes: str, references: str, stats: Dict):
+        self.notes = notes
+        self.references = references
+        self.stats = stats
+
+
+def pack_prompt(
+    notes: str,
+    reference_texts: List[str],
+    budget_tokens: Optional[int] = None,
+    chunk_tokens: Optional[int] = None,
+    top_k: Optional[int] = None,
+) -> PackedPrompt:
+    """
+    在 token 預算內組出筆記與參考資料。
+    - 筆記優先；有參考資料時筆記最多使用 (1 - AI_REFERENCE_MIN_SHARE) 的預算
+    - 參考資料切塊後以 BM25 (見 retrieval_service) 依與筆記的相關度排序，
+      取前 AI_REFERENCE_TOP_K 個放入剩餘預算，再依原文件順序排列
+    """
+    budget_tokens = budget_tokens if budget_tokens is not None else settings.AI_PROMPT_TOKEN_BUDGET
+    chunk_tokens = chunk_tokens if chunk_tokens is not None else settings.AI_REFERENCE_CHUNK_TOKENS
+    top_k = top_k if top_k is not None else settings.AI_REFERENCE_TOP_K
+    reference_texts = [t for t in reference_texts if t and t.strip()]
+
+    notes_limit = budget_tokens
+    if reference_texts:
+        notes_limit = int(budget_tokens * (1 - settings.AI_REFERENCE_MIN_SHARE))
+    notes_tokens = count_tokens(notes)
+    packed_notes = truncate_to_tokens(notes, notes_limit)
+    packed_notes_tokens = count_tokens(packed_notes)
+    reference_budget = budget_tokens - packed_notes_tokens
+
+    # (文件序號, 片段序號, 內容, token 數)
+    chunks: List[Tuple[int, int, str, int]] = []
+    for doc_index, text in enumerate(reference_texts):
+        for chunk_index, chunk in enumerate(chunk_text(text, chunk_tokens)):
+            chunks.append((doc_index, chunk_index, chunk, count_tokens(chunk)))
+    scores = retrieval_service.rank_chunks(notes, [c[2] for c in chunks])
+
+    # 分數高的優先，相同時保留較前面的片段
+    selected = []
+    used_tokens = 0
+    for index in sorted(range(len(chunks)), key=lambda i: (-scores[i], i)):
+        if len(selected) >= top_k:
+            break
+        chunk = chunks[index]
+        chunk_cost = chunk[3] + _SECTION_OVERHEAD_TOKENS
+        if used_tokens + chunk_cost <= reference_budget:
+            selected.append(chunk)
+            used_tokens += chunk_cost
+    selected.sort(key=lambda c: (c[0], c[1]))
+
+    sections = []
+    for doc_index in sorted({c[0] for c in selected}):
+        body = "\n...\n".join(c[2] for c in selected if c[0] == doc_index)
+        sections.append(f"[參考文件 {doc_index + 1}]\n{body}")
+
+    references = "\n\n".join(sections)
+    reference_tokens = sum(c[3] for c in chunks)
+    stats = {
+        "budget_tokens": budget_tokens,
+        "notes_tokens": notes_tokens,
+        "notes_truncated": packed_notes_tokens < notes_tokens,
+        "reference_documents": len(reference_texts),
+        "reference_tokens": reference_tokens,
+        "reference_tokens_used": count_tokens(references),
+        "chunks_total": len(chunks),
+        "chunks_used": len(selected),
+        "truncated": packed_notes_tokens < notes_tokens or len(selected) < len(chunks),
+    }
+    return PackedPrompt(packed_notes, references, stats)
@@ -1,50 +1,206 @@
 # backend/app/services/records_service.py
 
-from collections import defaultdict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import select, update, delete
-from datetime import date, datetime, time
-from typing import List
-from app.services import azure_ai_service, document_analysis_service
+from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import select, update, delete, func, case
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+from app.core.circuit_breaker import openai_breaker, OPEN as CIRCUIT_OPEN
+from app.core import deadline
+from app.core.deadline import DeadlineExceeded
+from app.core.workday import current_work_date
+from app.core.single_flight import SingleFlight, input_hash, advisory_xact_lock
+from typing import Dict, List, Optional
+from app.services import azure_ai_service, ai_rate_limit_service, document_analysis_service, projects_service, summarization_service
 from app.models import work_record as models
-from app.models.project import Project as ProjectModel
+from app.models.daily_project_summary import DailyProjectSummary
+from app.schemas.project import Project as ProjectSchema
 from app.schemas.work_record import WorkRecord as WorkRecordSchema, WorkRecordCreate, ConsolidatedReport, FileAttachment as FileAttachmentSchema, WorkRecordUpdate
 
-async def create(db: AsyncSession, *, obj_in: WorkRecordCreate, employee_id: int) -> models.WorkRecord:
-    db_obj = models.WorkRecord(
-        content=obj_in.content,
-        project_id=obj_in.project_id, # <-- 使用 project_id
-        employee_id=employee_id,
-        execution_time_minutes=obj_in.execution_time_minutes,
+async def create(db: AsyncSession, *, obj_in: WorkRecordCreate, employee_id: int) -> WorkRecordSchema:
+    records = await create_many(db, objs_in=[obj_in], employee_id=employee_id)
+    return records[0]
+
+async def create_many(db: AsyncSession, *, objs_in: List[WorkRecordCreate], employee_id: int) -> List[WorkRecordSchema]:
+    """
+    在同一個交易中新增多筆工作紀錄，並直接組出回應 (不再重新查詢)。
+    紀錄與附件各以一個 INSERT ... RETURNING 批次寫入，當日專案彙整以一個 upsert 更新；
+    專案資訊取自記憶體中的專案快取。專案不存在時拋出 ValueError。
+    """
+    projects = {}
+    for obj_in in objs_in:
+        project = await projects_service.get_by_id(db, obj_in.project_id)
+        if project is None:
+            raise ValueError(f"找不到專案 {obj_in.project_id}")
+        projects[obj_in.project_id] = project
+
+    work_date = current_work_date()
+    record_rows = [
+        {
+            "content": obj_in.content,
+            "project_id": obj_in.project_id,
+            "employee_id": employee_id,
+            "execution_time_minutes": obj_in.execution_time_minutes,
+            "work_date": work_date,
+        }
+        for obj_in in objs_in
+    ]
+    result = await db.execute(
+        insert(models.WorkRecord).returning(
+            models.WorkRecord.id, models.WorkRecord.created_at, sort_by_parameter_order=True
+        ),
+        record_rows
     )
+    inserted = result.all()
+
+    file_rows = [
+        {**file_in.model_dump(), "work_record_id": record_id}
+        for obj_in, (record_id, _) in zip(objs_in, inserted)
+        for file_in in obj_in.files
+    ]
+    file_ids = []
+    if file_rows:
+        result = await db.execute(
+            insert(models.FileAttachment).returning(models.FileAttachment.id, sort_by_parameter_order=True),
+            file_rows
+        )
+        file_ids = result.scalars().all()
+
+    records = []
+    file_iter = iter(zip(file_ids, file_rows))
+    for obj_in, row, (record_id, created_at) in zip(objs_in, record_rows, inserted):
+        files = [
+            FileAttachmentSchema(id=file_id, **file_in.model_dump())
+            for file_in, (file_id, _) in zip(obj_in.files, file_iter)
+        ]
+        records.append(WorkRecordSchema(
+            id=record_id,
+            created_at=created_at,
+            files=files,
+            project=projects[obj_in.project_id],
+            ai_content=None,
+            **{k: row[k] for k in ("content", "project_id", "employee_id", "execution_time_minutes")}
+        ))
+
+    await _add_records_to_summary(db, employee_id=employee_id, work_date=work_date, records=records)
+    await db.commit()
+    return records
 
-    if obj_in.files:
-        for file_in in obj_in.files:
-            db_file = models.FileAttachment(**file_in.model_dump())
-            db_obj.files.append(db_file)
+def _file_payload(file) -> dict:
+    """附件存入彙整表 files 欄位的格式 (與 API 的 FileAttachment 相同)"""
+    return FileAttachmentSchema.model_validate(file).model_dump(mode="json")
 
-    db.add(db_obj)
-    await db.commit()
-    await db.refresh(db_obj)
-    
-    query = select(models.WorkRecord).where(models.WorkRecord.id == db_obj.id).options(
-        selectinload(models.WorkRecord.files), 
-        selectinload(models.WorkRecord.project) # <-- 預先載入專案資訊
+async def _add_records_to_summary(db: AsyncSession, *, employee_id: int, work_date, records: List[WorkRecordSchema]) -> None:
+    """
+    將新紀錄併入當日專案彙整 (單一 upsert)。
+    同一專案的多筆紀錄先在記憶體中合併，與彙整列表一致，較新的紀錄內容與附件放在前面。
+    """
+    groups = {}
+    for record in sorted(records, key=lambda r: r.created_at, reverse=True):
+        group = groups.setdefault(record.project_id, {
+            "employee_id": employee_id,
+            "work_date": work_date,
+            "project_id": record.project_id,
+            "contents": [],
+            "record_count": 0,
+            "total_execution_time_minutes": 0,
+            "files": [],
+            "last_record_at": record.created_at,
+        })
+        content = (record.content or "").strip()
+        if content:
+            group["contents"].append(content)
+        group["record_count"] += 1
+        group["total_execution_time_minutes"] += record.execution_time_minutes or 0
+        group["files"].extend(f.model_dump(mode="json") for f in record.files)
+    rows = [
+        {**{k: v for k, v in group.items() if k != "contents"}, "content": "\n\n".join(group["contents"])}
+        for group in groups.values()
+    ]
+
+    stmt = insert(DailyProjectSummary).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        constraint="unique_daily_project_summary",
+        set_={
+            "content": case(
+                (stmt.excluded.content == "", DailyProjectSummary.content),
+                (DailyProjectSummary.content == "", stmt.excluded.content),
+                else_=stmt.excluded.content + "\n\n" + DailyProjectSummary.content,
+            ),
+            "record_count": DailyProjectSummary.record_count + stmt.excluded.record_count,
+            "total_execution_time_minutes": DailyProjectSummary.total_execution_time_minutes
+                + stmt.excluded.total_execution_time_minutes,
+            "files": stmt.excluded.files.op("||")(DailyProjectSummary.files),
+            "last_record_at": func.greatest(DailyProjectSummary.last_record_at, stmt.excluded.last_record_at),
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+
+def _summary_to_report(summary: DailyProjectSummary, project: Optional[ProjectSchema] = None) -> ConsolidatedReport:
+    return ConsolidatedReport(
+        project=project if project is not None else summary.project,
+        content=summary.content,
+        files=[FileAttachmentSchema.model_validate(f) for f in summary.files],
+        record_count=summary.record_count,
+        ai_content=summary.ai_content,
+        total_execution_time_minutes=summary.total_execution_time_minutes,
+    )
+
+async def _get_today_summary(db: AsyncSession, *, employee_id: int, project_id: int) -> Optional[DailyProjectSummary]:
+    query = (
+        select(DailyProjectSummary)
+        .where(
+            DailyProjectSummary.employee_id == employee_id,
+            DailyProjectSummary.work_date == current_work_date(),
+            DailyProjectSummary.project_id == project_id
+        )
+        .options(joinedload(DailyProjectSummary.project))
     )
     result = await db.execute(query)
-    return result.scalar_one()
+    return result.scalar_one_or_none()
+
+def _sync_day_records(*, employee_id: int, work_date, project_id: int, **values):
+    """
+    同步當日該專案各筆紀錄的 content / ai_content (回傳 data-modifying CTE，附加在彙整的寫入語句上一併執行)。
+    彙整的內容與 AI 內容放在最早的一筆 (主要) 紀錄上，其餘紀錄清空，
+    /records/today 讀到的紀錄因此與彙整一致。
+    """
+    day_filter = (
+        models.WorkRecord.employee_id == employee_id,
+        models.WorkRecord.project_id == project_id,
+        models.WorkRecord.work_date == work_date,
+    )
+    main_record_id = (
+        select(models.WorkRecord.id)
+        .where(*day_filter)
+        .order_by(models.WorkRecord.created_at.asc(), models.WorkRecord.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    empty = {"content": "", "ai_content": None}
+    return (
+        update(models.WorkRecord)
+        .where(*day_filter)
+        .values(
+            **{
+                column: case((models.WorkRecord.id == main_record_id, value), else_=empty[column])
+                for column, value in values.items()
+            },
+            updated_at=func.now(),
+        )
+        .returning(models.WorkRecord.id)
+        .cte("synced_records")
+    )
 
 async def get_multi_by_employee_today(db: AsyncSession, *, employee_id: int):
-    today_start = datetime.combine(date.today(), time.min)
-    today_end = datetime.combine(date.today(), time.max)
+    work_date = current_work_date()
     
     query = (
         select(models.WorkRecord)
         .where(
             models.WorkRecord.employee_id == employee_id,
-            models.WorkRecord.created_at >= today_start,
-            models.WorkRecord.created_at <= today_end
+            models.WorkRecord.work_date == work_date
         )
         .options(
             selectinload(models.WorkRecord.files), 
@@ -55,60 +211,106 @@ async def get_multi_by_employee_today(db: AsyncSession, *, employee_id: int):
     result = await db.execute(query)
     return result.scalars().all()
 
+async def get_today_version(db: AsyncSession, *, employee_id: int) -> tuple:
+    """
+    今日紀錄的版本資訊 (筆數, 紀錄最後更新時間, 彙整最後更新時間)，只需一次查詢。
+    供條件式 GET 判斷資料是否變動，不必載入紀錄與附件。
+    """
+    work_date = current_work_date()
+
+    summary_updated_at = select(func.max(DailyProjectSummary.updated_at)).where(
+        DailyProjectSummary.employee_id == employee_id,
+        DailyProjectSummary.work_date == work_date
+    ).scalar_subquery()
+    query = select(
+        func.count(models.WorkRecord.id),
+        func.max(models.WorkRecord.updated_at),
+        summary_updated_at
+    ).where(
+        models.WorkRecord.employee_id == employee_id,
+        models.WorkRecord.work_date == work_date
+    )
+    result = await db.execute(query)
+    return tuple(result.one())
+
 async def get_consolidated_today(db: AsyncSession, *, employee_id: int) -> List[ConsolidatedReport]:
+    """今日各專案的彙整報告，直接讀取 daily_project_summary (最近有紀錄的專案在前)"""
     print(f"[INFO] get_consolidated_today 開始 - employee_id: {employee_id}")
-    today_records = await get_multi_by_employee_today(db=db, employee_id=employee_id)
-    print(f"   [INFO] 從資料庫取得 {len(today_records)} 筆今日記錄")
-    project_groups = defaultdict(lambda: {"content": [], "files": [], "record_count": 0, "project_obj": None, "ai_content": None, "total_execution_time": 0})
-    
-    for i, record in enumerate(today_records):
-        print(f"   [INFO] 處理記錄 {i+1}: project_id={record.project_id}, files={len(record.files)}, execution_time={record.execution_time_minutes}min")
-        if record.project:
-            proj_id = record.project_id
-            # 只有在 content 存在且不為純空白時才加入列表
-            if record.content and record.content.strip():
-                project_groups[proj_id]["content"].append(record.content.strip())
-            
-            for j, file in enumerate(record.files):
-                print(f"      📎 檔案 {j+1}: {file.name} (is_selected_for_ai: {file.is_selected_for_ai})")
-            
-            project_groups[proj_id]["files"].extend(record.files)
-            project_groups[proj_id]["record_count"] += 1
-            project_groups[proj_id]["project_obj"] = record.project
-            project_groups[proj_id]["total_execution_time"] += record.execution_time_minutes
-            # 以第一筆紀錄的 ai_content 為主
-            if project_groups[proj_id]["ai_content"] is None:
-                project_groups[proj_id]["ai_content"] = record.ai_content
-            
-    consolidated_list = []
-    for project_id, data in project_groups.items():
-        if data["project_obj"]:
-            # 過濾掉所有可能的空字串，然後用換行符連接
-            valid_content = [c for c in data["content"] if c]
-            final_content = "\n\n".join(valid_content)
-
-            files_schema = [FileAttachmentSchema.model_validate(f) for f in data["files"]]
-            consolidated_list.append(
-                ConsolidatedReport(
-                    project=data["project_obj"],
-                    content=final_content,
-                    files=files_schema,
-                    record_count=data["record_count"],
-                    ai_content=data["ai_content"],
-                    total_execution_time_minutes=data["total_execution_time"],
-                )
-            )
-    return consolidated_list
+    query = (
+        select(DailyProjectSummary)
+        .where(
+            DailyProjectSummary.employee_id == employee_id,
+            DailyProjectSummary.work_date == current_work_date()
+        )
+        .options(joinedload(DailyProjectSummary.project))
+        .order_by(DailyProjectSummary.last_record_at.desc().nulls_last(), DailyProjectSummary.id)
+    )
+    result = await db.execute(query)
+    summaries = result.scalars().all()
+    print(f"   [INFO] 從資料庫取得 {len(summaries)} 個專案彙整")
+    return [_summary_to_report(summary) for summary in summaries]
 
 # --- ↓↓↓ 新增這個函式 ↓↓↓ ---
-async def enhance_all_today(db: AsyncSession, *, employee_id: int) -> List[ConsolidatedReport]:
-    """一鍵潤飾今天所有的專案報告"""
+async def enhance_all_today(db: AsyncSession, *, employee_id: int, batched: Optional[bool] = None) -> List[ConsolidatedReport]:
+    """
+    一鍵潤飾今天所有的專案報告。
+    batched 為 True 時多個專案合併成一次 AI 請求 (未指定時依 AI_ENHANCE_BATCH_MODE)。
+    """
     print(f"[INFO] enhance_all_today 開始 - employee_id: {employee_id}")
+    # AI 請求依員工公平排隊
+    ai_rate_limit_service.current_user_key.set(f"employee:{employee_id}")
+    if batched is None:
+        batched = settings.AI_ENHANCE_BATCH_MODE
     
     consolidated_reports = await get_consolidated_today(db=db, employee_id=employee_id)
     print(f"[INFO] 取得 {len(consolidated_reports)} 個彙整報告")
-    
-    for i, report in enumerate(consolidated_reports):
+
+    # 相同輸入的並行請求 (重複點擊、多個分頁) 只執行一次
+    input_hashes = {report.project.id: _ai_input_hash(report) for report in consolidated_reports}
+    key = ("enhance_all", employee_id, batched, tuple(input_hashes.values()))
+    return await _enhance_flight.do(
+        key,
+        lambda: _enhance_reports(
+            db, employee_id=employee_id, consolidated_reports=consolidated_reports,
+            input_hashes=input_hashes, batched=batched,
+        ),
+    )
+
+
+async def _enhance_reports(
+    db: AsyncSession,
+    *,
+    employee_id: int,
+    consolidated_reports: List[ConsolidatedReport],
+    input_hashes: Dict[int, str],
+    batched: bool,
+) -> List[ConsolidatedReport]:
+    """
+    潤飾並儲存多個專案報告 (enhance_all_today 的實際執行部分)。
+    分析附件與呼叫 AI 期間不開啟交易 (不佔用資料庫連線)，結果在最後的短交易中寫回。
+    時間預算用完時停止分析附件與呼叫 AI，尚未潤飾的專案保留原本的 AI 內容並標記 ai_deadline_exceeded；
+    潤飾失敗的專案同樣保留原本的 AI 內容 (不儲存輸入雜湊)，並以 ai_error 標記失敗原因。
+    """
+    await deadline.set_statement_timeout(db)
+    # 之前 (或其他 worker) 已以相同輸入潤飾過的專案直接沿用結果
+    reused = await _stored_ai_content(db, employee_id=employee_id, input_hashes=input_hashes)
+    # 結束讀取的交易，之後的附件分析與 AI 呼叫不佔用資料庫連線
+    await db.commit()
+    for report in consolidated_reports:
+        if report.project.id in reused:
+            report.ai_content = reused[report.project.id]
+    pending_reports = [report for report in consolidated_reports if report.project.id not in reused]
+
+    references_by_project = {report.project.id: [] for report in pending_reports}
+    reports_to_analyze = pending_reports
+    if openai_breaker.state == CIRCUIT_OPEN:
+        # AI 服務斷路器開啟中：不分析附件，直接由 enhance_report 快速回傳失敗結果 (保留原本的 AI 內容)
+        print("[WARNING] AI 服務斷路器開啟中，略過附件分析")
+        reports_to_analyze = []
+    for i, report in enumerate(reports_to_analyze):
+        if deadline.expired():
+            print("[WARNING] 時間預算用完，略過其餘附件分析")
+            break
         print(f"🚀 處理第 {i+1} 個報告: {report.project.plan_subj_c}")
         reference_texts = []
 
@@ -122,109 +324,208 @@ async def enhance_all_today(db: AsyncSession, *, employee_id: int) -> List[Conso
                     analyzed_text = await document_analysis_service.analyze_document_from_path(file_attachment.url)
                     print(f"[SUCCESS] 檔案分析成功，提取文字長度: {len(analyzed_text)}")
                     reference_texts.append(analyzed_text)
+                except DeadlineExceeded:
+                    print("[WARNING] 時間預算用完，停止分析附件")
+                    break
                 except Exception as e:
                     print(f"[ERROR] 檔案分析失敗: {str(e)}")
                     import traceback
                     traceback.print_exc()
 
 
-        # 呼叫 AI 服務
-        print(f"🤖 呼叫 Azure AI 服務 - 專案: {report.project.plan_subj_c}, 參考檔案數: {len(reference_texts)}")
-        print(f"[INFO] 原始內容長度: {len(report.content)}")
-        try:
-            ai_text = await azure_ai_service.get_ai_enhanced_report(
-                original_content=report.content,
+        # 大型附件先以分段摘要濃縮 (片段摘要快取於資料庫，以各自的短交易讀寫)
+        references_by_project[report.project.id] = await summarization_service.condense_references(
+            reference_texts, cache=summarization_service.DatabaseSummaryCache()
+        )
+
+    batch_results = {}
+    if batched and len(pending_reports) > 1:
+        print(f"🤖 批次呼叫 Azure AI 服務 - 專案數: {len(pending_reports)}")
+        batch_results = await azure_ai_service.enhance_reports_batch([
+            azure_ai_service.BatchEnhanceItem(
+                project_id=report.project.id,
                 project_name=report.project.plan_subj_c,
-                reference_texts=reference_texts
+                content=report.content,
+                reference_texts=references_by_project[report.project.id]
             )
-            print(f"[SUCCESS] AI 潤飾成功，結果長度: {len(ai_text)}")
-            report.ai_content = ai_text
+            for report in pending_reports
+        ])
+
+    enhanced_contents = {}
+    for report in pending_reports:
+        reference_texts = references_by_project[report.project.id]
+        try:
+            enhanced = batch_results.get(report.project.id)
+            if enhanced is None:
+                # 呼叫 AI 服務
+                print(f"🤖 呼叫 Azure AI 服務 - 專案: {report.project.plan_subj_c}, 參考檔案數: {len(reference_texts)}")
+                print(f"[INFO] 原始內容長度: {len(report.content)}")
+                enhanced = await azure_ai_service.enhance_report(
+                    original_content=report.content,
+                    project_name=report.project.plan_subj_c,
+                    reference_texts=reference_texts
+                )
+            report.reference_stats = enhanced.reference_stats
+            if enhanced.error:
+                # 保留原本的 AI 內容，不把錯誤訊息當成潤飾結果儲存
+                print(f"[WARNING] AI 潤飾失敗 ({enhanced.error})，保留原本的內容 - 專案: {report.project.plan_subj_c}")
+                report.ai_error = enhanced.error
+                continue
+            print(f"[SUCCESS] AI 潤飾成功，結果長度: {len(enhanced.content)}")
+            enhanced_contents[report.project.id] = enhanced.content
+        except DeadlineExceeded:
+            # 保留原本的 AI 內容，回傳已完成的部分
+            print(f"[WARNING] 時間預算用完，未潤飾專案: {report.project.plan_subj_c}")
+            report.ai_deadline_exceeded = True
+            continue
         except Exception as e:
             print(f"[ERROR] AI 潤飾失敗: {str(e)}")
             import traceback
             traceback.print_exc()
-            report.ai_content = report.content  # 失敗時使用原始內容
-        
-        # 將 AI 結果存回資料庫 (只更新第一筆)
-        today_start = datetime.combine(date.today(), time.min)
-        first_record_query = select(models.WorkRecord).where(
-            models.WorkRecord.employee_id == employee_id,
-            models.WorkRecord.project_id == report.project.id,
-            models.WorkRecord.created_at >= today_start
-        ).limit(1)
-        
-        result = await db.execute(first_record_query)
-        record_to_update = result.scalar_one_or_none()
-        if record_to_update:
-            record_to_update.ai_content = ai_text
-            await db.commit()
-            
+            report.ai_error = azure_ai_service.ENHANCE_FAILED
+            continue
+
+    # 將 AI 結果存回當日專案彙整
+    saved = await _save_enhanced(db, employee_id=employee_id, contents=enhanced_contents, input_hashes=input_hashes)
+    for report in pending_reports:
+        if report.project.id in saved:
+            report.ai_content = saved[report.project.id]
+
     return consolidated_reports
 
 
-async def enhance_one_today(db: AsyncSession, *, employee_id: int, project_id: int) -> ConsolidatedReport:
+# 相同輸入的並行潤飾請求只執行一次 (同一個 worker 內)
+_enhance_flight = SingleFlight("AI 潤飾")
 
+def _ai_input_hash(report: ConsolidatedReport) -> str:
+    """潤飾的輸入雜湊：專案名稱、彙整內容與選用的附件"""
+    return input_hash(
+        report.project.plan_subj_c,
+        report.content,
+        [f.url for f in report.files if f.is_selected_for_ai],
+    )
 
-    # 1. 取得該使用者、該專案今天的所有紀錄
-    today_start = datetime.combine(date.today(), time.min)
-    today_end = datetime.combine(date.today(), time.max)
-    
-    query = (
-        select(models.WorkRecord)
+async def _stored_ai_content(db: AsyncSession, *, employee_id: int, input_hashes: Dict[int, str]) -> Dict[int, str]:
+    """回傳今日已以相同輸入潤飾過的專案 {project_id: ai_content} (儲存的 ai_input_hash 與此次相同)"""
+    if not input_hashes:
+        return {}
+    result = await db.execute(
+        select(DailyProjectSummary.project_id, DailyProjectSummary.ai_input_hash, DailyProjectSummary.ai_content)
         .where(
-            models.WorkRecord.employee_id == employee_id,
-            models.WorkRecord.project_id == project_id,
-            models.WorkRecord.created_at >= today_start,
-            models.WorkRecord.created_at <= today_end
-        )
-        .options(
-            selectinload(models.WorkRecord.files), 
-            selectinload(models.WorkRecord.project)
+            DailyProjectSummary.employee_id == employee_id,
+            DailyProjectSummary.work_date == current_work_date(),
+            DailyProjectSummary.project_id.in_(list(input_hashes))
         )
-        .order_by(models.WorkRecord.created_at.asc()) # 確保第一筆是時間最早的
     )
-    result = await db.execute(query)
-    today_records = result.scalars().all()
+    return {
+        project_id: ai_content
+        for project_id, stored_hash, ai_content in result.all()
+        if ai_content is not None and stored_hash == input_hashes[project_id]
+    }
+
+async def _save_enhanced(
+    db: AsyncSession, *, employee_id: int, contents: Dict[int, str], input_hashes: Dict[int, str]
+) -> Dict[int, str]:
+    """
+    在一個短交易中寫回潤飾結果，回傳各專案最終的 AI 內容。
+    依專案順序取得 advisory lock (commit 時釋放)；其他 worker 在潤飾期間已先以相同輸入寫回的專案沿用其結果，不覆寫。
+    """
+    if not contents:
+        return {}
+    for project_id in sorted(contents):
+        await advisory_xact_lock(db, f"enhance:{employee_id}:{project_id}")
+    saved = await _stored_ai_content(
+        db, employee_id=employee_id, input_hashes={project_id: input_hashes[project_id] for project_id in contents}
+    )
+    for project_id, ai_content in contents.items():
+        if project_id in saved:
+            print(f"[INFO] 專案 {project_id} 已由其他 worker 以相同輸入潤飾，沿用其結果")
+            continue
+        if await _save_summary_ai_content(
+            db, employee_id=employee_id, project_id=project_id, ai_content=ai_content,
+            ai_input_hash=input_hashes[project_id],
+        ):
+            saved[project_id] = ai_content
+    await db.commit()
+    return saved
+
+
+async def enhance_one_today(db: AsyncSession, *, employee_id: int, project_id: int) -> ConsolidatedReport:
 
-    if not today_records:
+    ai_rate_limit_service.current_user_key.set(f"employee:{employee_id}")
+
+    # 1. 取得該使用者、該專案今天的彙整
+    summary = await _get_today_summary(db, employee_id=employee_id, project_id=project_id)
+
+    if summary is None:
         print("--- DEBUG結束: 未找到記錄，返回 None ---")
         return None
 
-    # 2. 彙整成單一報告物件
-    project_obj = today_records[0].project
-    content_list = [r.content for r in today_records]
-    files_list = [f for r in today_records for f in r.files]
-    
-    report = ConsolidatedReport(
-        project=project_obj,
-        content="\n\n".join(content_list),
-        files=[FileAttachmentSchema.model_validate(f) for f in files_list],
-        record_count=len(today_records),
-        ai_content=today_records[0].ai_content # 使用第一筆的 ai_content
+    # 2. 轉成單一報告物件
+    report = _summary_to_report(summary)
+
+    # 相同輸入的並行請求 (重複點擊、多個分頁) 只執行一次
+    ai_input_hash = _ai_input_hash(report)
+    key = ("enhance_one", employee_id, project_id, ai_input_hash)
+    return await _enhance_flight.do(
+        key,
+        lambda: _enhance_one(db, employee_id=employee_id, report=report, ai_input_hash=ai_input_hash),
     )
 
+
+async def _enhance_one(
+    db: AsyncSession,
+    *,
+    employee_id: int,
+    report: ConsolidatedReport,
+    ai_input_hash: str,
+) -> ConsolidatedReport:
+    """
+    潤飾並儲存單一專案報告 (enhance_one_today 的實際執行部分)，時間預算用完時拋出 DeadlineExceeded。
+    分析附件與呼叫 AI 期間不開啟交易；潤飾失敗時不更新資料庫，回傳的報告以 ai_error 標記失敗原因。
+    """
+    await deadline.set_statement_timeout(db)
+    input_hashes = {report.project.id: ai_input_hash}
+    reused = await _stored_ai_content(db, employee_id=employee_id, input_hashes=input_hashes)
+    # 結束讀取的交易，之後的附件分析與 AI 呼叫不佔用資料庫連線
+    await db.commit()
+    if reused:
+        # 已以相同輸入潤飾過
+        report.ai_content = reused[report.project.id]
+        return report
+
     # 3. 呼叫 AI 服務
     print("準備呼叫 AI 服務...")
     reference_texts = []
-    for file_attachment in report.files:
-        if file_attachment.is_selected_for_ai:
-            analyzed_text = await document_analysis_service.analyze_document_from_path(file_attachment.url)
-            reference_texts.append(analyzed_text)
-    print(f"AI 文件分析結果: {reference_texts}")
+    # AI 服務斷路器開啟中時不分析附件，直接由 enhance_report 快速回傳失敗結果
+    if openai_breaker.state != CIRCUIT_OPEN:
+        for file_attachment in report.files:
+            if file_attachment.is_selected_for_ai:
+                analyzed_text = await document_analysis_service.analyze_document_from_path(file_attachment.url)
+                reference_texts.append(analyzed_text)
+        print(f"AI 文件分析結果: {reference_texts}")
+        reference_texts = await summarization_service.condense_references(
+            reference_texts, cache=summarization_service.DatabaseSummaryCache()
+        )
 
-    ai_text = await azure_ai_service.get_ai_enhanced_report(
+    enhanced = await azure_ai_service.enhance_report(
         original_content=report.content,
         project_name=report.project.plan_subj_c,
         reference_texts=reference_texts
     )
-    report.ai_content = ai_text
+    report.reference_stats = enhanced.reference_stats
+    if enhanced.error:
+        # 保留原本的 AI 內容與輸入雜湊，由 API 回傳對應的錯誤
+        print(f"[WARNING] AI 潤飾失敗 ({enhanced.error})，保留原本的內容")
+        report.ai_error = enhanced.error
+        return report
     print("AI 服務呼叫完成")
-    
-    # 4. 將 AI 結果存回資料庫 (只更新第一筆)
-    record_to_update = today_records[0]
-    record_to_update.ai_content = ai_text
-    await db.commit()
-    await db.refresh(record_to_update)
+
+    # 4. 將 AI 結果存回當日專案彙整
+    saved = await _save_enhanced(
+        db, employee_id=employee_id, contents={report.project.id: enhanced.content}, input_hashes=input_hashes
+    )
+    report.ai_content = saved.get(report.project.id, enhanced.content)
     print("AI 結果已存回資料庫")
     print("--- DEBUG結束: 成功返回報告 ---")
             
@@ -232,79 +533,154 @@ async def enhance_one_today(db: AsyncSession, *, employee_id: int, project_id: i
 
 
 
+async def _save_summary_ai_content(
+    db: AsyncSession, *, employee_id: int, project_id: int, ai_content: str, ai_input_hash: Optional[str] = None
+) -> bool:
+    """
+    將 AI 內容寫入今日該專案的彙整 (不 commit)，回傳是否有對應的彙整。
+    ai_input_hash 為產生此內容的輸入雜湊；使用者手動編輯時為 None。
+    """
+    work_date = current_work_date()
+    result = await db.execute(
+        update(DailyProjectSummary)
+        .where(
+            DailyProjectSummary.employee_id == employee_id,
+            DailyProjectSummary.work_date == work_date,
+            DailyProjectSummary.project_id == project_id
+        )
+        .values(ai_content=ai_content, ai_input_hash=ai_input_hash, updated_at=func.now())
+        # 同一個語句同步紀錄的 ai_content
+        .add_cte(_sync_day_records(
+            employee_id=employee_id, work_date=work_date, project_id=project_id, ai_content=ai_content
+        ))
+    )
+    return result.rowcount > 0
+
+
 # --- ↓↓↓ 新增這個函式 ↓↓↓ ---
 async def update_ai_report(db: AsyncSession, *, project_id: int, ai_content: str, employee_id: int) -> bool:
     """儲存使用者編輯後的 AI 內容"""
-    today_start = datetime.combine(date.today(), time.min)
-    
-    # 找到今天該專案的第一筆紀錄來儲存 AI 內容
-    first_record_query = select(models.WorkRecord).where(
-        models.WorkRecord.employee_id == employee_id,
-        models.WorkRecord.project_id == project_id,
-        models.WorkRecord.created_at >= today_start
-    ).limit(1)
-
-    result = await db.execute(first_record_query)
-    record_to_update = result.scalar_one_or_none()
-    
-    if record_to_update:
-        record_to_update.ai_content = ai_content
+    updated = await _save_summary_ai_content(
+        db, employee_id=employee_id, project_id=project_id, ai_content=ai_content
+    )
+    if updated:
         await db.commit()
-        return True
-    return False
+    return updated
 
 
 
 # --- ↓↓↓ 使用這個功能更完整的版本覆蓋舊的函式 ↓↓↓ ---
-async def update_consolidated_report(db: AsyncSession, *, project_id: int, content: str, files: List, employee_id: int) -> bool:
+async def update_consolidated_report(db: AsyncSession, *, project_id: int, content: str, files: List, employee_id: int) -> Optional[ConsolidatedReport]:
     """
-    更新一個專案的彙整報告。
-    此版本將智慧處理檔案的新增、刪除與狀態更新。
+    更新一個專案的彙整報告，回傳更新後的報告 (找不到當日紀錄時回傳 None)。
+    編輯後的內容寫入當日專案彙整，並在同一個語句中同步到主要 (最早的) 紀錄，其餘紀錄的內容清空 (紀錄本身與時數保留)；
+    附件以集合操作處理：批次刪除、批次更新 AI 選取狀態、批次新增 (掛在最早的一筆紀錄上)，
+    不論附件數量多寡，語句數固定。
     """
-    today_start = datetime.combine(date.today(), time.min)
-    today_end = datetime.combine(date.today(), time.max)
+    work_date = current_work_date()
 
-    query = select(models.WorkRecord).where(
-        models.WorkRecord.employee_id == employee_id,
-        models.WorkRecord.project_id == project_id,
-        models.WorkRecord.created_at >= today_start,
-        models.WorkRecord.created_at <= today_end
-    ).options(selectinload(models.WorkRecord.files))
-    
+    # 1. 一次取得當日該專案的紀錄與附件 (最早的紀錄在前)
+    query = (
+        select(models.WorkRecord.id, models.FileAttachment)
+        .outerjoin(models.FileAttachment, models.FileAttachment.work_record_id == models.WorkRecord.id)
+        .where(
+            models.WorkRecord.employee_id == employee_id,
+            models.WorkRecord.project_id == project_id,
+            models.WorkRecord.work_date == work_date
+        )
+        .order_by(models.WorkRecord.created_at.asc(), models.WorkRecord.id)
+    )
     result = await db.execute(query)
-    records_to_update = result.scalars().all()
+    rows = result.all()
 
-    if not records_to_update:
+    if not rows:
         print("DEBUG: 沒有找到可更新的記錄")
-        return False
+        return None
 
-    main_record = records_to_update[0]
-    main_record.content = content
-    
-    existing_files_map = {f.url: f for f in main_record.files}
+    main_record_id = rows[0][0]
+    existing_files_map = {f.url: f for _, f in rows if f is not None}
     new_files_map = {f.url: f for f in files}
 
-    # 刪除：存在於舊列表但不存在於新列表的檔案
-    for url, file_to_delete in existing_files_map.items():
-        if url not in new_files_map:
-            await db.delete(file_to_delete)
+    # 2. 刪除：存在於舊列表但不存在於新列表的檔案
+    delete_ids = [f.id for url, f in existing_files_map.items() if url not in new_files_map]
+    if delete_ids:
+        await db.execute(
+            delete(models.FileAttachment)
+            .where(models.FileAttachment.id.in_(delete_ids))
+            .execution_options(synchronize_session=False)
+        )
+
+    # 3. 更新：只更新 AI 選取狀態有變動的檔案
+    selection_changes = {
+        existing_files_map[url].id: bool(new_file_data.is_selected_for_ai)
+        for url, new_file_data in new_files_map.items()
+        if url in existing_files_map
+        and bool(existing_files_map[url].is_selected_for_ai) != bool(new_file_data.is_selected_for_ai)
+    }
+    if selection_changes:
+        await db.execute(
+            update(models.FileAttachment)
+            .where(models.FileAttachment.id.in_(list(selection_changes)))
+            .values(is_selected_for_ai=case(selection_changes, value=models.FileAttachment.id))
+            .execution_options(synchronize_session=False)
+        )
 
-    # 新增或更新
+    # 4. 新增：建立新檔案，排除可能的 id 屬性
+    new_file_rows = []
     for url, new_file_data in new_files_map.items():
-        if url in existing_files_map:
-            existing_files_map[url].is_selected_for_ai = new_file_data.is_selected_for_ai
-        else:
-            # 建立新檔案，排除可能的 id 屬性
+        if url not in existing_files_map:
             file_data = new_file_data.model_dump()
             file_data.pop('id', None)  # 安全地移除 id 如果存在
-            new_file = models.FileAttachment(**file_data)
-            main_record.files.append(new_file)
+            file_data['work_record_id'] = main_record_id
+            new_file_rows.append(file_data)
+    new_file_ids = {}
+    if new_file_rows:
+        result = await db.execute(
+            insert(models.FileAttachment).returning(models.FileAttachment.id, sort_by_parameter_order=True),
+            new_file_rows
+        )
+        new_file_ids = {row["url"]: file_id for row, file_id in zip(new_file_rows, result.scalars().all())}
 
-    # 刪除除了第一筆之外的所有多餘筆記
-    for record in records_to_update[1:]:
-        for file_to_delete in record.files:
-            await db.delete(file_to_delete)
-        await db.delete(record)
+    # 5. 依新列表的順序組出彙整的附件
+    summary_files = []
+    for url, new_file_data in new_files_map.items():
+        if url in existing_files_map:
+            payload = _file_payload(existing_files_map[url])
+            payload["is_selected_for_ai"] = bool(new_file_data.is_selected_for_ai)
+        else:
+            payload = {**new_file_data.model_dump(mode="json"), "id": new_file_ids[url]}
+        summary_files.append(payload)
+
+    # 6. 寫入彙整 (彙整不存在時，例如舊資料，依當日紀錄補建)
+    day_records = select(models.WorkRecord).where(
+        models.WorkRecord.employee_id == employee_id,
+        models.WorkRecord.project_id == project_id,
+        models.WorkRecord.work_date == work_date
+    ).subquery()
+    stmt = insert(DailyProjectSummary).values(
+        employee_id=employee_id,
+        work_date=work_date,
+        project_id=project_id,
+        content=content,
+        files=summary_files,
+        record_count=select(func.count()).select_from(day_records).scalar_subquery(),
+        total_execution_time_minutes=select(
+            func.coalesce(func.sum(day_records.c.execution_time_minutes), 0)
+        ).scalar_subquery(),
+        last_record_at=select(func.max(day_records.c.created_at)).scalar_subquery(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="unique_daily_project_summary",
+        # 只異動附件時內容可能不變，明確更新版本時間
+        set_={"content": stmt.excluded.content, "files": stmt.excluded.files, "updated_at": func.now()},
+    ).returning(DailyProjectSummary)
+    # 同一個語句同步紀錄的 content (編輯後的內容放在主要紀錄上)
+    stmt = stmt.add_cte(_sync_day_records(
+        employee_id=employee_id, work_date=work_date, project_id=project_id, content=content
+    ))
+    result = await db.execute(stmt, execution_options={"populate_existing": True})
+    summary = result.scalar_one()
+    project = await projects_service.get_by_id(db, project_id)
 
     await db.commit()
-    return True
\ No newline at end of file
+    return _summary_to_report(summary, project)
@@ -0,0 +1,157 @@
+# backend/app/services/structured_output_service.py
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Type, TypeVar
+
+from openai import AsyncAzureOpenAI
+from pydantic import BaseModel, ValidationError
+
+from app.core import deadline
+from app.services import azure_ai_service
+
+M = TypeVar("M", bound=BaseModel)
+
+# ```json ... ``` 這類 Markdown 程式碼區塊
+_FENCE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)```", re.DOTALL)
+
+# 所有 StructuredOutputMetrics 實例 (名稱 -> 實例)，供 /api/ai/metrics 使用
+_registry: Dict[str, "StructuredOutputMetrics"] = {}
+
+REPAIR_SYSTEM_PROMPT = (
+    "你會收到一段應符合 <SCHEMA> 的 JSON 輸出，但它無法解析或未通過驗證 (錯誤訊息在 <ERROR>)。\n"
+    "請修正為符合 <SCHEMA> 的 JSON 物件，保留原本的文字內容，不要新增內容。\n"
+    "只輸出 JSON，不得包含任何 JSON 之外的文字。"
+)
+
+
+class StructuredOutputMetrics:
+    """結構化 (JSON) 回應的解析統計 (程序內)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.responses = 0
+        self.parsed = 0
+        self.extracted = 0
+        self.repair_attempts = 0
+        self.repaired = 0
+        self.parse_failures = 0
+        self.fallbacks = 0
+        _registry[name] = self
+
+    def snapshot(self) -> Dict:
+        return {
+            # 送出的 AI 請求 (由呼叫端計數) 與實際取得的回應
+            "requests": self.requests,
+            "responses": self.responses,
+            # 直接通過驗證的回應
+            "parsed": self.parsed,
+            # 含程式碼區塊或前後說明文字，擷取後才通過驗證的回應
+            "extracted": self.extracted,
+            "repair_attempts": self.repair_attempts,
+            "repaired": self.repaired,
+            # 修正後仍無法使用的回應
+            "parse_failures": self.parse_failures,
+            "parse_failure_rate": round(self.parse_failures / self.responses, 4) if self.responses else 0.0,
+            # 最後改用本機替代結果的請求 (含請求失敗、斷路器開啟、逾時)
+            "fallbacks": self.fallbacks,
+            "fallback_rate": round(self.fallbacks / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+def snapshot_all() -> Dict[str, Dict]:
+    return {name: metrics.snapshot() for name, metrics in _registry.items()}
+
+
+def extract_json(text: Optional[str]) -> Any:
+    """
+    由模型回應取出 JSON 值：先直接解析，再嘗試 Markdown 程式碼區塊內的內容，
+    最後由第一個 { 或 [ 開始解析 (忽略前後的說明文字)。找不到時拋出 ValueError。
+    """
+    text = (text or "").strip()
+    candidates = [text] + [m.group(1).strip() for m in _FENCE.finditer(text)]
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            pass
+
+    decoder = json.JSONDecoder()
+    for candidate in candidates:
+        for match in re.finditer(r"[{\[]", candidate):
+            try:
+                value, _ = decoder.raw_decode(candidate, match.start())
+                return value
+            except ValueError:
+                continue
+    raise ValueError("回應中找不到 JSON")
+
+
+def _validate(model: Type[M], content: Optional[str]) -> M:
+    """解析並驗證回應，失敗時拋出 ValueError (ValidationError 為其子類別)"""
+    return model.model_validate(extract_json(content))
+
+
+async def parse_or_repair(
+    client: AsyncAzureOpenAI,
+    model: Type[M],
+    content: Optional[str],
+    *,
+    metrics: StructuredOutputMetrics,
+    max_tokens: int,
+) -> Optional[M]:
+    """
+    將 AI 回應解析為 model。無法解析或驗證失敗時送出一次修正請求：
+    只附上結構描述、錯誤訊息與原本的輸出 (不重送原始提示詞)，請模型改寫成合法的 JSON。
+    仍失敗時回傳 None，由呼叫端改用替代結果。
+    """
+    metrics.responses += 1
+    try:
+        result = model.model_validate_json(content or "")
+        metrics.parsed += 1
+        return result
+    except ValidationError:
+        pass
+    try:
+        result = _validate(model, content)
+        metrics.extracted += 1
+        return result
+    except ValueError as e:
+        error = str(e)
+
+    if deadline.expired():
+        metrics.parse_failures += 1
+        return None
+
+    metrics.repair_attempts += 1
+    print(f"[WARNING] {metrics.name}: 回應不符合格式，送出修正請求")
+    messages: List[dict] = [
+        {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                f"<SCHEMA>\n{json.dumps(model.model_json_schema(), ensure_ascii=False)}\n</SCHEMA>\n"
+                f"<ERROR>\n{error[:500]}\n</ERROR>\n"
+                f"<OUTPUT>\n{content or ''}\n</OUTPUT>"
+            ),
+        },
+    ]
+    try:
+        response = await azure_ai_service.create_chat_completion(
+            client,
+            messages=messages,
+            temperature=0,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+        )
+        result = _validate(model, response.choices[0].message.content)
+    except ValueError as e:
+        print(f"[WARNING] {metrics.name}: 修正後仍無法解析: {str(e)[:200]}")
+        metrics.parse_failures += 1
+        return None
+    except Exception:
+        metrics.parse_failures += 1
+        raise
+    metrics.repaired += 1
+    return result
@@ -0,0 +1,209 @@
+# backend/app/services/summarization_service.py
+
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.deadline import DeadlineExceeded
+from app.core.database import AsyncSessionFactory
+from app.models.ai_chunk_summary import AIChunkSummary
+from app.services import azure_ai_service, prompt_budget_service
+
+# 摘要提示詞或切塊方式改變時遞增，讓舊的快取自然失效
+SUMMARY_PROMPT_VERSION = "v1"
+
+# 與 azure_ai_service.get_completion 相同的介面 (prompt, temperature, max_tokens)，測試時可換成假的模型
+CompletionFunc = Callable[..., Awaitable[str]]
+
+_MAP_PROMPT = (
+    "以下是一份附件文件的其中一段。請以繁體中文條列摘要這一段的重點，"
+    "保留專有名詞、數字、日期與待辦事項，不要加入原文沒有的內容。\n\n"
+    "<SECTION>\n{chunk}\n</SECTION>"
+)
+
+_REDUCE_PROMPT = (
+    "以下是同一份附件文件各段落的摘要 (依原文順序排列)。"
+    "請整合成一份完整、不重複的繁體中文重點摘要，保留專有名詞、數字、日期與待辦事項，"
+    "不要加入摘要中沒有的內容。\n\n"
+    "<SUMMARIES>\n{summaries}\n</SUMMARIES>"
+)
+
+
+def chunk_hash(chunk: str) -> str:
+    """片段快取鍵：摘要提示詞版本 + 片段內容的 SHA-256"""
+    return hashlib.sha256(f"{SUMMARY_PROMPT_VERSION}\n{chunk}".encode("utf-8")).hexdigest()
+
+
+class MemorySummaryCache:
+    """程序內的片段摘要快取 (測試或不需持久化時使用)"""
+
+    def __init__(self):
+        self.entries: Dict[str, str] = {}
+
+    async def get_many(self, hashes: Iterable[str]) -> Dict[str, str]:
+        return {h: self.entries[h] for h in hashes if h in self.entries}
+
+    async def set_many(self, summaries: Dict[str, str]) -> None:
+        self.entries.update(summaries)
+
+
+class DatabaseSummaryCache:
+    """
+    以 ai_chunk_summaries 表保存的片段摘要快取，跨日、跨 worker 共用。
+    每次讀寫各自使用一個短交易 (不沿用呼叫端的 session)，摘要與 AI 呼叫期間不佔用資料庫連線。
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = AsyncSessionFactory):
+        self.session_factory = session_factory
+
+    async def get_many(self, hashes: Iterable[str]) -> Dict[str, str]:
+        hashes = list(hashes)
+        if not hashes:
+            return {}
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(AIChunkSummary.chunk_hash, AIChunkSummary.summary).where(AIChunkSummary.chunk_hash.in_(hashes))
+            )
+            return dict(result.all())
+
+    async def set_many(self, summaries: Dict[str, str]) -> None:
+        if not summaries:
+            return
+        async with self.session_factory() as db:
+            await db.execute(
+                insert(AIChunkSummary)
+                .values([{"chunk_hash": h, "summary": s} for h, s in summaries.items()])
+                .on_conflict_do_nothing(index_elements=[AIChunkSummary.chunk_hash])
+            )
+            await db.commit()
+
+
+async def _map_chunks(
+    chunks: List[str],
+    *,
+    cache,
+    complete: CompletionFunc,
+    semaphore: asyncio.Semaphore,
+    summary_tokens: int,
+) -> List[str]:
+    """
+    map 階段：逐段摘要 (已快取的片段直接取用，其餘在並行上限內同時呼叫模型)。
+    時間預算用完或斷路器開啟時其餘片段不再呼叫模型，快取已完成的摘要後拋出該例外。
+    """
+    hashes = [chunk_hash(chunk) for chunk in chunks]
+    cached = await cache.get_many(set(hashes))
+    missing = {h: chunk for h, chunk in zip(hashes, chunks) if h not in cached}
+    print(f"[INFO] 分段摘要: 共 {len(chunks)} 段, 快取命中 {len(chunks) - len(missing)} 段")
+    stop_errors: List[Exception] = []
+
+    async def summarize(chunk: str) -> Optional[str]:
+        async with semaphore:
+            if stop_errors:
+                return None
+            try:
+                return await complete(_MAP_PROMPT.format(chunk=chunk), temperature=0.2, max_tokens=summary_tokens)
+            except (DeadlineExceeded, CircuitOpenError) as e:
+                stop_errors.append(e)
+                return None
+            except Exception as e:
+                print(f"[WARNING] 分段摘要失敗，改用截斷的原文: {str(e)}")
+                return None
+
+    results = await asyncio.gather(*(summarize(chunk) for chunk in missing.values()))
+    # 只快取模型實際產生的摘要 (空白回應不快取，下次重新摘要)
+    new_summaries = {h: s for h, s in zip(missing, results) if s and s.strip()}
+    await cache.set_many(new_summaries)
+    if stop_errors:
+        print(f"[WARNING] 停止分段摘要 ({type(stop_errors[0]).__name__})，已完成 {len(new_summaries)}/{len(missing)} 段")
+        raise stop_errors[0]
+
+    summaries = {**cached, **new_summaries}
+    return [
+        summaries.get(h) or prompt_budget_service.truncate_to_tokens(chunk, summary_tokens)
+        for h, chunk in zip(hashes, chunks)
+    ]
+
+
+async def summarize_document(
+    text: str,
+    *,
+    cache,
+    complete: Optional[CompletionFunc] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    chunk_tokens: Optional[int] = None,
+    summary_tokens: Optional[int] = None,
+) -> str:
+    """
+    階層式 (map-reduce) 摘要大型文件：
+    1. 切塊後並行摘要每一段 (map)，結果依片段雜湊快取
+    2. 各段摘要合計仍超過一塊時，將摘要再切塊摘要一次，直到放得進一塊
+    3. 最後整合成一份摘要 (reduce，不快取)
+    時間預算用完或斷路器開啟時拋出 DeadlineExceeded / CircuitOpenError (已完成的片段摘要仍會快取)。
+    """
+    complete = complete or azure_ai_service.get_completion
+    semaphore = semaphore or asyncio.Semaphore(settings.AI_SUMMARY_CONCURRENCY)
+    chunk_tokens = chunk_tokens or settings.AI_SUMMARY_CHUNK_TOKENS
+    summary_tokens = summary_tokens or settings.AI_SUMMARY_MAX_TOKENS
+
+    chunks = prompt_budget_service.chunk_text(text, chunk_tokens)
+    while True:
+        summaries = await _map_chunks(
+            chunks, cache=cache, complete=complete, semaphore=semaphore, summary_tokens=summary_tokens
+        )
+        combined = "\n\n".join(summaries)
+        if len(summaries) <= 1 or prompt_budget_service.count_tokens(combined) <= chunk_tokens:
+            break
+        next_chunks = prompt_budget_service.chunk_text(combined, chunk_tokens)
+        if len(next_chunks) >= len(chunks):
+            # 摘要沒有變短 (例如模型失敗改用原文)，不再往上一層
+            combined = prompt_budget_service.truncate_to_tokens(combined, chunk_tokens)
+            break
+        chunks = next_chunks
+
+    try:
+        async with semaphore:
+            return await complete(
+                _REDUCE_PROMPT.format(summaries=combined),
+                temperature=0.2,
+                max_tokens=settings.AI_SUMMARY_REDUCE_MAX_TOKENS,
+            )
+    except (DeadlineExceeded, CircuitOpenError):
+        raise
+    except Exception as e:
+        print(f"[WARNING] 整合摘要失敗，改用各段摘要: {str(e)}")
+        return combined
+
+
+async def condense_references(
+    reference_texts: List[str],
+    *,
+    cache,
+    complete: Optional[CompletionFunc] = None,
+    threshold_tokens: Optional[int] = None,
+) -> List[str]:
+    """
+    將超過 AI_SUMMARY_THRESHOLD_TOKENS 的參考文件換成 map-reduce 摘要，其餘原樣保留。
+    文件逐一處理，每份文件內的分段摘要並行執行。
+    時間預算用完或斷路器開啟後不再摘要，其餘文件原樣保留 (由提示詞預算裁切)。
+    """
+    threshold_tokens = threshold_tokens or settings.AI_SUMMARY_THRESHOLD_TOKENS
+    condensed = []
+    stopped = False
+    for text in reference_texts:
+        tokens = prompt_budget_service.count_tokens(text)
+        if stopped or tokens <= threshold_tokens:
+            condensed.append(text)
+            continue
+        print(f"[INFO] 參考文件約 {tokens} tokens，超過 {threshold_tokens}，改用分段摘要")
+        try:
+            condensed.append(await summarize_document(text, cache=cache, complete=complete))
+        except (DeadlineExceeded, CircuitOpenError):
+            stopped = True
+            condensed.append(text)
+    return condensed
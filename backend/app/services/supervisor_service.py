@@ -1,16 +1,18 @@
 # backend/app/services/supervisor_service.py
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, and_, exists, update
+from sqlalchemy.orm import selectinload, joinedload
 from typing import List, Optional
 import datetime
 
-from app.models import Employee, DailyReport, ReportStatus, ReviewComment, ReportApproval, ApprovalStatus, Supervisor
-from app.schemas.supervisor import ReportReviewCreate
-from app.schemas.review_comment import ReviewCommentCreate
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import Employee, DailyReport, ReportStatus, ReviewComment, ReportApproval, ApprovalStatus, Supervisor, ReviewInboxItem, User
+from app.schemas.supervisor import ReportReviewCreate, ReportReviewBatchItem
 from app.schemas.report_approval import SupervisorApprovalInfo
-from app.services import comment_service
+from app.services import comment_service, event_service, org_graph_service, context_summary_service
+from app.core.workday import current_work_date
 
 async def get_direct_subordinates(db: AsyncSession, supervisor_id: int) -> List[int]:
     """使用新的主管關係表獲取直屬下級員工ID"""
@@ -54,12 +56,111 @@ async def get_all_subordinates(db: AsyncSession, supervisor_id: int, visited_ids
     
     return subordinate_ids
 
+async def get_all_supervisor_ids(db: AsyncSession, employee_id: int) -> List[int]:
+    """取得員工的所有上級主管ID（直屬與間接）；優先使用記憶體組織圖，否則以遞迴 CTE 一次查詢"""
+    graph = await org_graph_service.get_org_graph(db)
+    if graph is not None:
+        return graph.ancestor_ids(employee_id)
+
+    employee_empno = select(Employee.empno).where(Employee.id == employee_id).scalar_subquery()
+
+    chain = (
+        select(Supervisor.supervisor.label("empno"))
+        .where(Supervisor.empno == employee_empno)
+        .cte("supervisor_chain", recursive=True)
+    )
+    # UNION (非 UNION ALL) 會去除重複，主管關係若有循環也能結束
+    chain = chain.union(
+        select(Supervisor.supervisor).join(chain, Supervisor.empno == chain.c.empno)
+    )
+
+    query = select(Employee.id).join(chain, Employee.empno == chain.c.empno)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def refresh_report_counts(db: AsyncSession) -> None:
+    """
+    依 supervisors 表重新計算每位員工的直屬/全部下級人數，並同步使用者的 is_supervisor。
+    由同步腳本在建立主管關係後呼叫，呼叫端負責 commit。
+    """
+    direct = (
+        select(Supervisor.supervisor.label("empno"), func.count(func.distinct(Supervisor.empno)).label("n"))
+        .group_by(Supervisor.supervisor)
+        .subquery("direct_reports")
+    )
+    # (主管, 下級) 的遞移閉包；UNION 去除重複，主管關係若有循環也能結束
+    closure = (
+        select(Supervisor.supervisor.label("ancestor"), Supervisor.empno.label("descendant"))
+        .cte("report_closure", recursive=True)
+    )
+    closure = closure.union(
+        select(closure.c.ancestor, Supervisor.empno).join(Supervisor, Supervisor.supervisor == closure.c.descendant)
+    )
+    total = (
+        select(closure.c.ancestor.label("empno"), func.count().label("n"))
+        .group_by(closure.c.ancestor)
+        .subquery("total_reports")
+    )
+    await db.execute(
+        update(Employee).values(
+            direct_report_count=func.coalesce(
+                select(direct.c.n).where(direct.c.empno == Employee.empno).scalar_subquery(), 0
+            ),
+            total_report_count=func.coalesce(
+                select(total.c.n).where(total.c.empno == Employee.empno).scalar_subquery(), 0
+            ),
+        )
+    )
+    await db.execute(
+        update(User).values(
+            is_supervisor=exists().where(Employee.user_id == User.id, Employee.direct_report_count > 0)
+        )
+    )
+
+def _subordinate_ids_query(supervisor_id: int):
+    """所有下級員工ID（直屬與間接）的遞迴 CTE 子查詢"""
+    supervisor_empno = select(Employee.empno).where(Employee.id == supervisor_id).scalar_subquery()
+
+    chain = (
+        select(Supervisor.empno.label("empno"))
+        .where(Supervisor.supervisor == supervisor_empno)
+        .cte("subordinate_chain", recursive=True)
+    )
+    chain = chain.union(
+        select(Supervisor.empno).join(chain, Supervisor.supervisor == chain.c.empno)
+    )
+    return select(Employee.id).join(chain, Employee.empno == chain.c.empno)
+
+async def get_reviewable_reports(db: AsyncSession, supervisor_id: int, report_ids: List[int]) -> dict:
+    """
+    以單一查詢找出主管有權審核的日報。
+    回傳 {report_id: (employee_id, date)}，不在結果中的日報表示不存在或無權限。
+    """
+    if not report_ids:
+        return {}
+    graph = await org_graph_service.get_org_graph(db)
+    query = select(DailyReport.id, DailyReport.employee_id, DailyReport.date).where(
+        DailyReport.id.in_(report_ids)
+    )
+    if graph is None:
+        query = query.where(DailyReport.employee_id.in_(_subordinate_ids_query(supervisor_id)))
+    result = await db.execute(query)
+    return {
+        report_id: (employee_id, date)
+        for report_id, employee_id, date in result.all()
+        if graph is None or graph.is_ancestor(supervisor_id, employee_id)
+    }
+
 async def get_employees_with_pending_reports(db: AsyncSession, *, supervisor_id: int) -> List[Employee]:
     """獲取所有下級員工（包括多級下級）有待該主管審核的報告"""
     print(f"[INFO] 查詢主管 {supervisor_id} 的所有下級員工")
     
     # 獲取所有下級員工ID（包括多級）
-    all_subordinate_ids = await get_all_subordinates(db, supervisor_id)
+    graph = await org_graph_service.get_org_graph(db)
+    if graph is not None:
+        all_subordinate_ids = graph.descendant_ids(supervisor_id)
+    else:
+        all_subordinate_ids = await get_all_subordinates(db, supervisor_id)
     print(f"[INFO] 找到 {len(all_subordinate_ids)} 個下級員工: {all_subordinate_ids}")
     
     if not all_subordinate_ids:
@@ -75,31 +176,20 @@ async def get_employees_with_pending_reports(db: AsyncSession, *, supervisor_id:
     result = await db.execute(query)
     employees = result.scalars().unique().all()
     
-    # 為每個員工計算該主管未審核的報告數量
-    for emp in employees:
-        # 查詢該員工的所有報告，並檢查該主管是否已審核
-        reports_query = (
-            select(DailyReport)
-            .where(DailyReport.employee_id == emp.id)
-            .options(selectinload(DailyReport.approvals))
+    # 從待審清單一次彙總該主管對每位員工的未審核報告數量
+    pending_query = (
+        select(ReviewInboxItem.employee_id, func.count(ReviewInboxItem.id))
+        .where(
+            ReviewInboxItem.supervisor_id == supervisor_id,
+            ReviewInboxItem.status == ApprovalStatus.pending
         )
-        reports_result = await db.execute(reports_query)
-        reports = reports_result.scalars().unique().all()
-        
-        pending_count = 0
-        for report in reports:
-            # 檢查該主管是否已審核此報告
-            supervisor_approval = None
-            for approval in report.approvals:
-                if approval.supervisor_id == supervisor_id:
-                    supervisor_approval = approval
-                    break
-            
-            # 如果沒有審核記錄或狀態為pending，則計入待審核
-            if supervisor_approval is None or supervisor_approval.status == ApprovalStatus.pending:
-                pending_count += 1
-        
-        emp.pending_reports_count = pending_count
+        .group_by(ReviewInboxItem.employee_id)
+    )
+    pending_result = await db.execute(pending_query)
+    pending_counts = dict(pending_result.all())
+    
+    for emp in employees:
+        emp.pending_reports_count = pending_counts.get(emp.id, 0)
         print(f"   [INFO] 員工 {emp.empnamec} ({emp.id}): {emp.pending_reports_count} 個待主管{supervisor_id}審核的報告")
         
     return employees
@@ -112,114 +202,339 @@ async def get_employee_details(db: AsyncSession, *, employee_id: int) -> Optiona
     return result.scalars().unique().one_or_none()
 
 async def can_supervisor_review_employee(db: AsyncSession, supervisor_id: int, employee_id: int) -> bool:
-    """檢查主管是否有權限審核該員工的報告（基於新的主管關係表，包括直接和間接下級）"""
-    # 獲取主管和員工的 empno
-    supervisor_query = select(Employee.empno).where(Employee.id == supervisor_id)
-    supervisor_result = await db.execute(supervisor_query)
-    supervisor_empno = supervisor_result.scalar_one_or_none()
-    
-    employee_query = select(Employee.empno).where(Employee.id == employee_id)
-    employee_result = await db.execute(employee_query)
-    employee_empno = employee_result.scalar_one_or_none()
-    
-    if not supervisor_empno or not employee_empno:
-        return False
-    
-    # 檢查直接主管關係
-    direct_query = select(Supervisor).where(
-        Supervisor.supervisor == supervisor_empno,
-        Supervisor.empno == employee_empno
+    """檢查主管是否有權限審核該員工的報告（基於主管關係表，包括直接和間接下級）"""
+    graph = await org_graph_service.get_org_graph(db)
+    if graph is not None:
+        return graph.is_ancestor(supervisor_id, employee_id)
+
+    # 組織圖無法使用時以單一查詢完成
+    query = select(
+        exists(_subordinate_ids_query(supervisor_id).where(Employee.id == employee_id))
     )
-    direct_result = await db.execute(direct_query)
-    if direct_result.scalar_one_or_none():
-        return True
-    
-    # 如果不是直接關係，檢查是否為間接下級
-    all_subordinate_ids = await get_all_subordinates(db, supervisor_id)
-    return employee_id in all_subordinate_ids
+    result = await db.execute(query)
+    return bool(result.scalar())
 
 
 async def review_daily_report(db: AsyncSession, *, report_id: int, review_in: ReportReviewCreate, reviewer) -> Optional[DailyReport]:
     """
     新的多主管獨立審核機制：每個主管都有獨立的審核狀態
+    整個審核在單一交易中完成：
+    一次查詢同時取得日報、員工、該主管既有的審核記錄，權限以記憶體組織圖驗證，
+    審核記錄、留言與待審清單的寫入在 commit 時一併送出。
     """
-    query = select(DailyReport).where(DailyReport.id == report_id).options(
-        selectinload(DailyReport.employee),
-        selectinload(DailyReport.approvals)
+    supervisor_id = reviewer.employee.id
+    graph = await org_graph_service.get_org_graph(db)
+
+    query = (
+        select(DailyReport, ReportApproval)
+        .outerjoin(
+            ReportApproval,
+            and_(
+                ReportApproval.report_id == DailyReport.id,
+                ReportApproval.supervisor_id == supervisor_id
+            )
+        )
+        .where(DailyReport.id == report_id)
+        .options(joinedload(DailyReport.employee))
     )
+    # 檢查審核權限：日報員工必須是該主管的直屬或間接下級
+    # (組織圖無法使用時改在同一個查詢中以遞迴 CTE 檢查)
+    if graph is None:
+        query = query.where(DailyReport.employee_id.in_(_subordinate_ids_query(supervisor_id)))
     result = await db.execute(query)
-    report = result.scalar_one_or_none()
-    if not report:
+    row = result.one_or_none()
+    if row and graph is not None and not graph.is_ancestor(supervisor_id, row[0].employee_id):
+        row = None
+    if not row:
+        print(f"[ERROR] 找不到日報 {report_id} 或主管 {supervisor_id} 沒有權限審核")
         return None
-    
-    supervisor_id = reviewer.employee.id
-    
-    # 檢查審核權限
-    if not await can_supervisor_review_employee(db, supervisor_id, report.employee.id):
-        print(f"[ERROR] 主管 {supervisor_id} 沒有權限審核員工 {report.employee.id} 的報告")
-        return None
-    
-    # 檢查是否已經審核過
-    existing_approval = None
-    for approval in report.approvals:
-        if approval.supervisor_id == supervisor_id:
-            existing_approval = approval
-            break
+    report, existing_approval = row
     
     if existing_approval and existing_approval.status != ApprovalStatus.pending:
         print(f"[ERROR] 主管 {supervisor_id} 已經審核過此報告 (狀態: {existing_approval.status})")
         raise ValueError(f"您已經審核過此日報，不能重複審核")
     
     # 建立或更新審核記錄
+    #有評分就是已經審核過
+    status = ApprovalStatus.approved if review_in.rating else ApprovalStatus.pending
     if existing_approval:
         # 更新現有記錄
-        #有評分就是已經審核過
-        existing_approval.status = ApprovalStatus.approved if review_in.rating else ApprovalStatus.pending
+        existing_approval.status = status
         existing_approval.rating = review_in.rating
         existing_approval.feedback = review_in.comment
         existing_approval.approved_at = datetime.datetime.utcnow()
-        approval_record = existing_approval
     else:
         # 建立新記錄
-        approval_record = ReportApproval(
+        db.add(ReportApproval(
             report_id=report_id,
             supervisor_id=supervisor_id,
-            status=ApprovalStatus.approved if review_in.rating else ApprovalStatus.pending,
+            status=status,
             rating=review_in.rating,
             feedback=review_in.comment,
             approved_at=datetime.datetime.utcnow()
-        )
-        db.add(approval_record)
+        ))
     
-    # 為相容性，仍然建立評論記錄
-    if review_in.comment and review_in.comment.strip():
-        comment_create = ReviewCommentCreate(
-            content=review_in.comment,
-            rating=review_in.rating
-        )
-        await comment_service.create_comment(
-            db=db,
+    # 同步更新待審清單
+    await upsert_review_inbox(
+        db,
+        report=report,
+        supervisor_ids=[supervisor_id],
+        status=status
+    )
+    
+    # 為相容性，仍然建立評論記錄 (直接加入同一個交易，不另外 commit)
+    comment_content = _review_comment_content(review_in.rating, review_in.comment)
+    review_comment = None
+    if comment_content is not None:
+        review_comment = ReviewComment(
+            content=comment_content,
             report_id=report_id,
-            user=reviewer,
-            comment_in=comment_create
-        )
-    elif review_in.rating is not None:
-        rating_text = f"評分：{review_in.rating} 分"
-        comment_create = ReviewCommentCreate(
-            content=rating_text,
+            user_id=reviewer.id,
             rating=review_in.rating
         )
-        await comment_service.create_comment(
-            db=db,
-            report_id=report_id,
-            user=reviewer,
-            comment_in=comment_create
-        )
+        db.add(review_comment)
     
     await db.commit()
-    await db.refresh(report)
+
+    # 通知員工本人與其上級主管：日報審核狀態已變更，以及審核附帶的留言
+    supervisor_ids = await get_all_supervisor_ids(db, report.employee_id)
+    await event_service.publish(
+        [event_service.employee_channel(report.employee_id)]
+        + [event_service.supervisor_channel(sid) for sid in supervisor_ids],
+        "report_reviewed",
+        report_id=report.id,
+        employee_id=report.employee_id,
+        reviewer_id=supervisor_id,
+    )
+    if review_comment is not None:
+        await comment_service.publish_comment_created(
+            review_comment, owner_id=report.employee_id, supervisor_ids=supervisor_ids
+        )
     return report
 
+def _review_comment_content(rating, comment: Optional[str]) -> Optional[str]:
+    """審核時附帶建立的留言內容 (與單筆審核相同規則)，不需要留言時回傳 None"""
+    if comment and comment.strip():
+        return comment
+    if rating is not None:
+        return f"評分：{rating} 分"
+    return None
+
+async def review_daily_reports_batch(db: AsyncSession, *, items: List[ReportReviewBatchItem], reviewer) -> List[dict]:
+    """
+    一次審核多份日報：
+    權限以一次查詢驗證，審核記錄、留言與待審清單皆以批次寫入，最後只 commit 一次。
+    回傳每份日報各自的結果。
+    """
+    supervisor_id = reviewer.employee.id
+    report_ids = [item.report_id for item in items]
+
+    reviewable = await get_reviewable_reports(db, supervisor_id, report_ids)
+
+    approvals_query = select(ReportApproval.report_id, ReportApproval.status).where(
+        ReportApproval.report_id.in_(list(reviewable.keys())),
+        ReportApproval.supervisor_id == supervisor_id
+    )
+    approvals_result = await db.execute(approvals_query)
+    existing_status = dict(approvals_result.all())
+
+    now = datetime.datetime.utcnow()
+    results = []
+    # 通過檢查的日報: report_id -> (結果, 員工ID, 日報日期, 狀態, 留言內容)
+    accepted = {}
+    approval_rows = []
+    seen = set()
+    for item in items:
+        if item.report_id in seen:
+            results.append({"report_id": item.report_id, "success": False, "error": "同一份日報重複出現在批次中"})
+            continue
+        seen.add(item.report_id)
+
+        if item.report_id not in reviewable:
+            results.append({"report_id": item.report_id, "success": False, "error": "找不到該日報或沒有權限審核"})
+            continue
+        if existing_status.get(item.report_id, ApprovalStatus.pending) != ApprovalStatus.pending:
+            results.append({"report_id": item.report_id, "success": False, "error": "您已經審核過此日報，不能重複審核"})
+            continue
+
+        employee_id, report_date = reviewable[item.report_id]
+        status = ApprovalStatus.approved if item.rating else ApprovalStatus.pending
+        approval_rows.append({
+            "report_id": item.report_id,
+            "supervisor_id": supervisor_id,
+            "status": status,
+            "rating": item.rating,
+            "feedback": item.comment,
+            "approved_at": now,
+        })
+        result = {"report_id": item.report_id, "success": True, "status": status.value}
+        results.append(result)
+        accepted[item.report_id] = (result, employee_id, report_date, status, item)
+
+    applied = []
+    comments = []
+    if approval_rows:
+        approval_stmt = insert(ReportApproval).values(approval_rows)
+        approval_stmt = approval_stmt.on_conflict_do_update(
+            constraint="unique_report_supervisor_approval",
+            set_={
+                "status": approval_stmt.excluded.status,
+                "rating": approval_stmt.excluded.rating,
+                "feedback": approval_stmt.excluded.feedback,
+                "approved_at": approval_stmt.excluded.approved_at,
+            },
+            # 並行審核時避免覆蓋已核准的記錄
+            where=ReportApproval.status == ApprovalStatus.pending,
+        ).returning(ReportApproval.report_id)
+        written = set((await db.execute(approval_stmt)).scalars().all())
+
+        for report_id, (result, employee_id, report_date, status, item) in accepted.items():
+            if report_id not in written:
+                # 讀取審核狀態後才被其他工作階段審核：upsert 沒有寫入
+                result.clear()
+                result.update({"report_id": report_id, "success": False, "error": "您已經審核過此日報，不能重複審核"})
+                continue
+            applied.append((report_id, employee_id, report_date, status, item))
+
+    if applied:
+        inbox_stmt = insert(ReviewInboxItem).values([
+            {
+                "supervisor_id": supervisor_id,
+                "report_id": report_id,
+                "employee_id": employee_id,
+                "date": report_date,
+                "status": status,
+            }
+            for report_id, employee_id, report_date, status, _ in applied
+        ])
+        inbox_stmt = inbox_stmt.on_conflict_do_update(
+            constraint="unique_review_inbox_supervisor_report",
+            set_={"status": inbox_stmt.excluded.status, "updated_at": func.now()},
+        )
+        await db.execute(inbox_stmt)
+
+        comment_rows = []
+        for report_id, _, _, _, item in applied:
+            content = _review_comment_content(item.rating, item.comment)
+            if content is not None:
+                comment_rows.append({
+                    "content": content,
+                    "report_id": report_id,
+                    "user_id": reviewer.id,
+                    "rating": item.rating,
+                })
+        if comment_rows:
+            comment_result = await db.execute(insert(ReviewComment).values(comment_rows).returning(ReviewComment))
+            comments = comment_result.scalars().all()
+
+    await db.commit()
+
+    # 通知各日報的員工本人與其上級主管 (與單筆審核相同)：審核狀態已變更，以及審核附帶的留言
+    owners = {report_id: employee_id for report_id, employee_id, _, _, _ in applied}
+    supervisors_by_employee = {}
+    for employee_id in set(owners.values()):
+        supervisors_by_employee[employee_id] = await get_all_supervisor_ids(db, employee_id)
+    for report_id, employee_id in owners.items():
+        await event_service.publish(
+            [event_service.employee_channel(employee_id)]
+            + [event_service.supervisor_channel(sid) for sid in supervisors_by_employee[employee_id]],
+            "report_reviewed",
+            report_id=report_id,
+            employee_id=employee_id,
+            reviewer_id=supervisor_id,
+        )
+    for comment in comments:
+        employee_id = owners[comment.report_id]
+        await comment_service.publish_comment_created(
+            comment, owner_id=employee_id, supervisor_ids=supervisors_by_employee[employee_id]
+        )
+    return results
+
+async def upsert_review_inbox(
+    db: AsyncSession,
+    *,
+    report: DailyReport,
+    supervisor_ids: List[int],
+    status: ApprovalStatus = ApprovalStatus.pending,
+    overwrite_status: bool = True
+) -> None:
+    """
+    寫入或更新主管待審清單，不自行 commit，與呼叫端的異動同一個交易。
+    overwrite_status=False 時已存在的列保持原狀態 (用於重新提交日報)。
+    """
+    if not supervisor_ids:
+        return
+    stmt = insert(ReviewInboxItem).values([
+        {
+            "supervisor_id": sid,
+            "report_id": report.id,
+            "employee_id": report.employee_id,
+            "date": report.date,
+            "status": status,
+        }
+        for sid in supervisor_ids
+    ])
+    if overwrite_status:
+        stmt = stmt.on_conflict_do_update(
+            constraint="unique_review_inbox_supervisor_report",
+            set_={"status": stmt.excluded.status, "date": stmt.excluded.date, "updated_at": func.now()},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(constraint="unique_review_inbox_supervisor_report")
+    await db.execute(stmt)
+
+async def get_review_inbox(
+    db: AsyncSession,
+    *,
+    supervisor_id: int,
+    status: Optional[ApprovalStatus] = None,
+    limit: int = 50,
+    offset: int = 0
+) -> dict:
+    """
+    主管的待審清單 (分頁)，status 為 None 時不依審核狀態篩選。
+    只讀取 review_inbox 上 (supervisor_id, status, date) 索引的一段範圍，與組織深度和歷史量無關。
+    """
+    counts_query = (
+        select(ReviewInboxItem.status, func.count(ReviewInboxItem.id))
+        .where(ReviewInboxItem.supervisor_id == supervisor_id)
+        .group_by(ReviewInboxItem.status)
+    )
+    counts_result = await db.execute(counts_query)
+    counts = dict(counts_result.all())
+    pending_count = counts.get(ApprovalStatus.pending, 0)
+    approved_count = counts.get(ApprovalStatus.approved, 0)
+
+    items_query = (
+        select(ReviewInboxItem, Employee.empnamec)
+        .join(Employee, ReviewInboxItem.employee_id == Employee.id)
+        .where(ReviewInboxItem.supervisor_id == supervisor_id)
+        .order_by(ReviewInboxItem.date.desc(), ReviewInboxItem.report_id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    if status is not None:
+        items_query = items_query.where(ReviewInboxItem.status == status)
+    items_result = await db.execute(items_query)
+
+    items = [
+        {
+            "report_id": item.report_id,
+            "employee_id": item.employee_id,
+            "employee_name": employee_name,
+            "date": item.date,
+            "status": item.status.value,
+        }
+        for item, employee_name in items_result.all()
+    ]
+    total = counts.get(status, 0) if status is not None else pending_count + approved_count
+    return {
+        "items": items,
+        "total": total,
+        "pending_count": pending_count,
+        "approved_count": approved_count,
+    }
+
 async def create_approval_records_for_supervisors(db: AsyncSession, report_id: int, employee_id: int):
     """為所有主管建立初始的審核記錄"""
     # 獲取員工的 empno
@@ -255,13 +570,23 @@ async def create_approval_records_for_supervisors(db: AsyncSession, report_id: i
             )
             db.add(approval)
     
+    # 所有上級主管 (含間接) 都列入待審清單，與審核記錄同一個交易寫入
+    report = await db.get(DailyReport, report_id)
+    all_supervisor_ids = await get_all_supervisor_ids(db, employee_id)
+    await upsert_review_inbox(
+        db,
+        report=report,
+        supervisor_ids=all_supervisor_ids,
+        overwrite_status=False
+    )
+    
     await db.commit()
 
 async def submit_daily_report(db: AsyncSession, *, employee_id: int, submitted_reports: List[dict]) -> DailyReport:
     """
     建立一筆新的 DailyReport，並為所有主管建立審核記錄。
     """
-    today = datetime.date.today()
+    today = current_work_date()
     query = select(DailyReport).where(
         DailyReport.employee_id == employee_id,
         DailyReport.date == today
@@ -281,6 +606,11 @@ async def submit_daily_report(db: AsyncSession, *, employee_id: int, submitted_r
             status=ReportStatus.pending
         )
         db.add(db_report)
+
+    # 與日報同一個交易更新員工的滾動摘要，主管產生回覆建議時直接取用
+    await context_summary_service.record_daily_report(
+        db, employee_id=employee_id, report_date=today, consolidated_content=submitted_reports
+    )
     
     await db.commit()
     await db.refresh(db_report)
@@ -292,7 +622,18 @@ async def submit_daily_report(db: AsyncSession, *, employee_id: int, submitted_r
         selectinload(DailyReport.employee)
     )
     final_result = await db.execute(final_query)
-    return final_result.scalar_one()
+    final_report = final_result.scalar_one()
+
+    # 通知所有上級主管有新的日報待審核
+    supervisor_ids = await get_all_supervisor_ids(db, employee_id)
+    await event_service.publish(
+        [event_service.supervisor_channel(sid) for sid in supervisor_ids],
+        "report_submitted",
+        report_id=final_report.id,
+        employee_id=employee_id,
+        date=final_report.date.isoformat(),
+    )
+    return final_report
 
 
 async def get_reports_by_date(db: AsyncSession, *, target_date: datetime.date) -> List[DailyReport]:
@@ -317,6 +658,18 @@ async def get_reports_by_date(db: AsyncSession, *, target_date: datetime.date) -
     
     return reports
 
+async def get_report_version(db: AsyncSession, *, report_id: int) -> Optional[tuple]:
+    """日報的版本資訊 (最後更新時間, 留言數)，找不到日報時回傳 None"""
+    comments_count = (
+        select(func.count(ReviewComment.id))
+        .where(ReviewComment.report_id == report_id)
+        .scalar_subquery()
+    )
+    query = select(DailyReport.updated_at, comments_count).where(DailyReport.id == report_id)
+    result = await db.execute(query)
+    row = result.one_or_none()
+    return tuple(row) if row else None
+
 async def get_report_by_id(db: AsyncSession, *, report_id: int) -> Optional[DailyReport]:
     """
     根據報告ID獲取特定的日報詳情
@@ -358,6 +711,16 @@ async def get_reports_by_date_and_employee(db: AsyncSession, *, target_date: dat
     
     return reports
 
+async def get_report_approval_version(db: AsyncSession, report_id: int) -> tuple:
+    """審核狀態的版本資訊 (筆數, 已核准數, 最後核准時間)"""
+    query = select(
+        func.count(ReportApproval.id),
+        func.count(ReportApproval.id).filter(ReportApproval.status == ApprovalStatus.approved),
+        func.max(ReportApproval.approved_at),
+    ).where(ReportApproval.report_id == report_id)
+    result = await db.execute(query)
+    return tuple(result.one())
+
 async def get_report_approval_status(db: AsyncSession, report_id: int) -> List[SupervisorApprovalInfo]:
     """獲取報告的所有主管審核狀態"""
     query = (
@@ -389,7 +752,7 @@ async def check_employee_editing_permissions(db: AsyncSession, employee_id: int)
     檢查員工是否還可以編輯和提交今日的日報
     判斷條件：是否有主管已經審核過今日的日報
     """
-    today = datetime.date.today()
+    today = current_work_date()
     
     # 查找員工今日的日報
     query = select(DailyReport).where(
@@ -0,0 +1,95 @@
+# backend/app/services/token_service.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from sqlalchemy.orm import selectinload
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.core.security import (
+    generate_refresh_token, hash_refresh_token, REFRESH_TOKEN_EXPIRE_DAYS, REFRESH_TOKEN_REUSE_GRACE_SECONDS
+)
+
+
+async def issue_refresh_token(db: AsyncSession, *, user_id: int) -> Tuple[str, RefreshToken]:
+    """
+    為使用者發行新的 refresh token。
+    回傳 (原始 token, 資料庫記錄)；呼叫端負責 commit。
+    """
+    raw_token = generate_refresh_token()
+    db_token = RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(raw_token),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    db.add(db_token)
+    await db.flush()
+    return raw_token, db_token
+
+
+async def revoke_all_for_user(db: AsyncSession, *, user_id: int) -> None:
+    """撤銷該使用者所有尚未撤銷的 refresh token"""
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+    )
+
+
+async def rotate_refresh_token(db: AsyncSession, *, raw_token: str) -> Optional[Tuple[User, str]]:
+    """
+    驗證並輪替 refresh token：舊 token 立即作廢，改發一組新的。
+    剛輪替 (REFRESH_TOKEN_REUSE_GRACE_SECONDS 內) 的 token 再次使用時視為並行的換發請求，另發一組新的；
+    超過寬限時間或登出撤銷的 token 被重複使用 (可能遭竊後重放) 時，撤銷該使用者全部 token。
+    驗證失敗回傳 None。
+    """
+    query = (
+        select(RefreshToken)
+        .where(RefreshToken.token_hash == hash_refresh_token(raw_token))
+        .options(selectinload(RefreshToken.user).selectinload(User.employee))
+        .with_for_update()
+    )
+    result = await db.execute(query)
+    db_token = result.scalar_one_or_none()
+    if db_token is None:
+        return None
+
+    now = datetime.now(timezone.utc)
+    if db_token.revoked_at is not None:
+        in_grace = (
+            db_token.replaced_by_id is not None
+            and now - db_token.revoked_at <= timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+        )
+        if in_grace and db_token.expires_at > now and db_token.user.is_active:
+            # 並行請求帶著同一個 token 換發：另發一組新的，先前輪替出的 token 仍然有效
+            new_raw_token, _ = await issue_refresh_token(db, user_id=db_token.user_id)
+            await db.commit()
+            return db_token.user, new_raw_token
+        print(f"[WARNING] 偵測到已撤銷的 refresh token 被重複使用 - user_id: {db_token.user_id}")
+        await revoke_all_for_user(db, user_id=db_token.user_id)
+        await db.commit()
+        return None
+
+    if db_token.expires_at <= now or not db_token.user.is_active:
+        return None
+
+    new_raw_token, new_db_token = await issue_refresh_token(db, user_id=db_token.user_id)
+    db_token.revoked_at = now
+    db_token.replaced_by_id = new_db_token.id
+    await db.commit()
+    return db_token.user, new_raw_token
+
+
+async def revoke_refresh_token(db: AsyncSession, *, raw_token: str) -> bool:
+    """登出時撤銷單一 refresh token"""
+    result = await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == hash_refresh_token(raw_token),
+            RefreshToken.revoked_at.is_(None),
+        )
+        .values(revoked_at=datetime.now(timezone.utc))
+    )
+    await db.commit()
+    return result.rowcount > 0
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import random
+import sys
+import os
+import time
+
+from sqlalchemy import select
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import AsyncSessionFactory
+from app.core.cache import get_generation
+from app.models import Employee, Supervisor
+from app.services import supervisor_service, org_graph_service
+
+SAMPLE_PAIRS = 500
+SAMPLE_SUPERVISORS = 50
+
+def _report(name: str, elapsed: float, count: int):
+    print(f"   {name}: 共 {count:>4} 次, 總計 {elapsed * 1000:9.2f}ms, 每次 {elapsed / count * 1e6:10.2f}µs")
+
+async def benchmark_org_graph():
+    """比較記憶體組織圖與資料庫遞迴查詢的權限檢查速度，並確認兩者結果一致"""
+    print("=== 組織圖權限檢查效能測試 ===\n")
+
+    async with AsyncSessionFactory() as db:
+        generation = await get_generation(db)
+        start = time.perf_counter()
+        graph = await org_graph_service.build_org_graph(db, generation)
+        print(f"[INFO] 由資料庫建立組織圖: {len(graph)} 位員工, 耗時 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        # 與 API worker 相同，優先使用 mmap 的快照檔
+        start = time.perf_counter()
+        mapped = org_graph_service.map_snapshot(generation)
+        if mapped is not None:
+            graph = mapped
+            print(f"[INFO] 對應快照檔: 耗時 {(time.perf_counter() - start) * 1000:.2f}ms")
+        print()
+
+        employee_ids = (await db.execute(select(Employee.id))).scalars().all()
+        supervisor_ids = (await db.execute(
+            select(Employee.id).join(Supervisor, Supervisor.supervisor == Employee.empno).distinct()
+        )).scalars().all()
+        if not employee_ids or not supervisor_ids:
+            print("[SKIP] 資料庫中沒有主管關係資料")
+            return True
+
+        rng = random.Random(42)
+        # 一半的組合取自實際下級，讓「是」與「否」兩種結果都被量測到
+        pairs = []
+        for i in range(SAMPLE_PAIRS):
+            supervisor_id = rng.choice(supervisor_ids)
+            descendants = graph.descendant_ids(supervisor_id)
+            if i % 2 == 0 and descendants:
+                pairs.append((supervisor_id, rng.choice(descendants)))
+            else:
+                pairs.append((supervisor_id, rng.choice(employee_ids)))
+        supervisors = [rng.choice(supervisor_ids) for _ in range(SAMPLE_SUPERVISORS)]
+
+        # 暫時停用組織圖，量測原本的遞迴 CTE 路徑
+        saved = org_graph_service._current
+        org_graph_service._current = (generation, None)
+        try:
+            print("[INFO] 是否為上級主管 (is_ancestor)")
+            start = time.perf_counter()
+            db_answers = [await supervisor_service.can_supervisor_review_employee(db, s, e) for s, e in pairs]
+            _report("遞迴 CTE 查詢", time.perf_counter() - start, len(pairs))
+
+            start = time.perf_counter()
+            graph_answers = [graph.is_ancestor(s, e) for s, e in pairs]
+            _report("記憶體組織圖", time.perf_counter() - start, len(pairs))
+
+            print("\n[INFO] 所有下級員工")
+            start = time.perf_counter()
+            db_descendants = [set(await supervisor_service.get_all_subordinates(db, s)) for s in supervisors]
+            _report("逐層遞迴查詢", time.perf_counter() - start, len(supervisors))
+
+            start = time.perf_counter()
+            graph_descendants = [set(graph.descendant_ids(s)) for s in supervisors]
+            _report("記憶體組織圖", time.perf_counter() - start, len(supervisors))
+        finally:
+            org_graph_service._current = saved
+
+    mismatches = sum(a != b for a, b in zip(db_answers, graph_answers))
+    mismatches += sum(a != b for a, b in zip(db_descendants, graph_descendants))
+    if mismatches:
+        print(f"\n[ERROR] 組織圖與資料庫結果有 {mismatches} 筆不一致")
+        return False
+    print(f"\n[OK] 結果一致 ({sum(graph_answers)}/{len(pairs)} 組為上下級關係)")
+    return True
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(benchmark_org_graph())
+    if not success:
+        sys.exit(1)
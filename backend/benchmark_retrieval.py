@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import sys
+import os
+import time
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.services import prompt_budget_service, retrieval_service
+
+PAGES = 100
+CHARS_PER_PAGE = 1200
+ROUNDS = 20
+# 完整裁切流程 (切塊 + 建索引 + 評分 + 組合提示詞) 的目標時間
+TARGET_MS = 50.0
+
+_VOCABULARY = (
+    "系統 使用者 登入 權限 報表 匯出 資料庫 遷移 設定 介面 測試 部署 伺服器 網路 "
+    "專案 進度 會議 需求 規格 文件 審核 主管 日報 附件 備份 效能 錯誤 修正 版本 排程"
+).split()
+_ENGLISH = ["API", "PostgreSQL", "alembic", "FastAPI", "React", "token", "OCR", "PDF"]
+
+def _make_page(rng: random.Random, page: int) -> str:
+    """產生一頁類似 OCR 結果的文字 (中文為主，夾雜英文詞與段落)"""
+    parts = [f"第 {page + 1} 頁"]
+    length = 0
+    while length < CHARS_PER_PAGE:
+        sentence = "".join(rng.choice(_VOCABULARY) for _ in range(rng.randint(4, 10)))
+        if rng.random() < 0.3:
+            sentence += f" {rng.choice(_ENGLISH)} "
+        sentence += rng.choice("。，；")
+        parts.append(sentence)
+        length += len(sentence)
+        if rng.random() < 0.15:
+            parts.append("\n\n")
+    return "".join(parts)
+
+def _timed(func, rounds: int = ROUNDS) -> float:
+    """執行 rounds 次，回傳每次的中位數耗時 (ms)"""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def benchmark_retrieval():
+    """量測 100 頁文件的參考片段排序速度 (全程本機執行，不需網路)"""
+    print("=== 參考文件 BM25 排序效能測試 ===\n")
+
+    rng = random.Random(42)
+    document = "\n\n".join(_make_page(rng, page) for page in range(PAGES))
+    notes = "今天完成資料庫遷移的 alembic 設定，修正報表匯出的權限錯誤，下午與主管開會討論部署排程。"
+    print(f"[INFO] 文件: {PAGES} 頁, {len(document)} 字元, 約 {prompt_budget_service.count_tokens(document)} tokens")
+
+    chunks = prompt_budget_service.chunk_text(document, settings.AI_REFERENCE_CHUNK_TOKENS)
+    print(f"[INFO] 切塊: {len(chunks)} 個片段 (每塊約 {settings.AI_REFERENCE_CHUNK_TOKENS} tokens)\n")
+
+    chunk_ms = _timed(lambda: prompt_budget_service.chunk_text(document, settings.AI_REFERENCE_CHUNK_TOKENS))
+    index_ms = _timed(lambda: retrieval_service.BM25Index(chunks))
+    index = retrieval_service.BM25Index(chunks)
+    query_ms = _timed(lambda: index.top_k(notes, settings.AI_REFERENCE_TOP_K))
+    pack_ms = _timed(lambda: prompt_budget_service.pack_prompt(notes, [document]))
+
+    print(f"   切塊:             {chunk_ms:8.2f}ms")
+    print(f"   建立 BM25 索引:   {index_ms:8.2f}ms")
+    print(f"   查詢 top-{settings.AI_REFERENCE_TOP_K}:      {query_ms:8.2f}ms")
+    print(f"   完整裁切流程:     {pack_ms:8.2f}ms")
+
+    print()
+    if pack_ms > TARGET_MS:
+        print(f"[ERROR] 完整裁切流程耗時 {pack_ms:.2f}ms，超過目標 {TARGET_MS:.0f}ms")
+        return False
+    print(f"[OK] 完整裁切流程耗時 {pack_ms:.2f}ms (目標 {TARGET_MS:.0f}ms 以內)")
+    return True
+
+if __name__ == "__main__":
+    success = benchmark_retrieval()
+    if not success:
+        sys.exit(1)
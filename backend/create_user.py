@@ -51,7 +51,7 @@ async def create_user(empno: str, email: str, password: str):
             return
 
         # --- 4. 建立新使用者 ---
-        is_supervisor = bool(employee.subordinates)
+        is_supervisor = employee.direct_report_count > 0
         hashed_password = get_password_hash(password)
 
         new_user = User(
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+測試腳本共用的假 Azure OpenAI client：
+FakeCompletions 取代 client.chat.completions，patched_client 暫時替換 azure_ai_service._build_client。
+"""
+
+import inspect
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+from app.services import azure_ai_service
+
+def completion(content: str, total_tokens: int = 100) -> SimpleNamespace:
+    """與 chat.completions.create 回傳值相同結構的回應"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+        usage=SimpleNamespace(total_tokens=total_tokens),
+    )
+
+class FakeCompletions:
+    """
+    假的 chat.completions：記錄每次請求的參數，由 reply(請求參數) 產生回應內容。
+    reply 可以是一般函式或 async 函式，也可以拋出例外 (模擬 429、逾時等錯誤)。
+    """
+
+    def __init__(self, reply: Callable[[Dict[str, Any]], Any]):
+        self.reply = reply
+        self.requests: List[Dict[str, Any]] = []
+
+    @property
+    def calls(self) -> int:
+        return len(self.requests)
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        content = self.reply(kwargs)
+        if inspect.isawaitable(content):
+            content = await content
+        return completion(content)
+
+def fake_client(completions: FakeCompletions) -> SimpleNamespace:
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+@contextmanager
+def patched_client(completions: FakeCompletions):
+    """期間內 azure_ai_service 的所有請求都送到 completions，結束後還原"""
+    original = azure_ai_service._build_client
+    azure_ai_service._build_client = lambda: fake_client(completions)
+    try:
+        yield completions
+    finally:
+        azure_ai_service._build_client = original
@@ -13,10 +13,12 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.core.config import settings
+from app.core.cache import bump_generation, ORG_DATA
+from app.services import org_graph_service, supervisor_service
 from app.models import (
     Employee, Department, Supervisor, Project, ProjectMember,
-    DailyReport, WorkRecord, FileAttachment,
-    User, ReviewComment, ReportApproval
+    DailyReport, WorkRecord, FileAttachment, DailyProjectSummary,
+    User, ReviewComment, ReportApproval, RefreshToken, ReviewInboxItem, EmployeeContextSummary
 )
 
 # 來源資料庫 (公司PostgreSQL) 的連線資訊
@@ -130,6 +132,9 @@ async def sync_company_a_data():
         
         # 先清空所有相關的資料（避免外鍵約束問題）
         await target_db.execute(delete(ReviewComment))
+        await target_db.execute(delete(ReviewInboxItem))
+        await target_db.execute(delete(DailyProjectSummary))
+        await target_db.execute(delete(EmployeeContextSummary))
         await target_db.execute(delete(FileAttachment))
         await target_db.execute(delete(WorkRecord))
         await target_db.execute(delete(DailyReport))
@@ -144,6 +149,7 @@ async def sync_company_a_data():
         
         # 清空員工對用戶的引用
         await target_db.execute(text("UPDATE employees SET user_id = NULL WHERE user_id IS NOT NULL"))
+        await target_db.execute(delete(RefreshToken))
         await target_db.execute(delete(User))
         await target_db.execute(delete(Employee))
         
@@ -243,6 +249,11 @@ async def sync_company_a_data():
         await target_db.commit()
         print(f"[SUCCESS] 建立了 {supervisor_count} 個主管關係，跳過了 {skipped_count} 個無效關係")
 
+        # 依主管關係計算每位員工的下屬人數 (API 以欄位判斷主管身分，不需遞迴查詢)
+        await supervisor_service.refresh_report_counts(target_db)
+        await target_db.commit()
+        print("[SUCCESS] 已更新員工的下屬人數")
+
         # === 第6步：建立專案表 ===
         print("\n[INFO] 建立專案資料...")
         project_count = 0
@@ -300,6 +311,14 @@ async def sync_company_a_data():
         await target_db.commit()
         print(f"[SUCCESS] 建立了 {member_count} 個專案成員關係，跳過了 {member_skipped} 個無效關係")
 
+        # === 第9步：遞增資料版本號，讓 API 端的快取失效 ===
+        generation = await bump_generation(target_db, ORG_DATA)
+        await target_db.commit()
+        print(f"[SUCCESS] 已更新資料版本號: {generation}")
+
+        # === 第10步：寫出組織快照檔，API 的各 worker 直接 mmap 共用 ===
+        await org_graph_service.publish_snapshot(target_db, generation)
+
     print(f"\n[SUCCESS] 公司別A資料同步完成！")
     print(f"總結：")
     print(f"  - 部門：{len(unique_departments)} 個")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+from openai import RateLimitError
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.services import ai_rate_limit_service, azure_ai_service
+from fake_openai import FakeCompletions, fake_client, patched_client
+
+def _rate_limit_error(retry_after_ms: int) -> RateLimitError:
+    response = SimpleNamespace(status_code=429, headers={"retry-after-ms": str(retry_after_ms)}, request=None)
+    return RateLimitError("Too Many Requests", response=response, body=None)
+
+def _flaky_completions(failures: int, retry_after_ms: int):
+    """前 failures 次請求回傳 429，之後成功；回傳 (completions, 每次請求的時間)"""
+    call_times = []
+
+    def reply(request):
+        call_times.append(time.monotonic())
+        if len(call_times) <= failures:
+            raise _rate_limit_error(retry_after_ms)
+        return "ok"
+    return FakeCompletions(reply), call_times
+
+async def test_fair_queue():
+    """限流器暫停期間排隊的請求，恢復後依使用者輪流放行"""
+    limiter = ai_rate_limit_service.AIRateLimiter(rpm=1000, tpm=0)
+    limiter.pause(0.05)
+    order = []
+
+    async def request(user: str, n: int):
+        await limiter.acquire(10, user_key=user)
+        order.append(f"{user}{n}")
+
+    tasks = [asyncio.create_task(request("A", n)) for n in range(1, 5)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(request("B", 1)))
+    await asyncio.gather(*tasks)
+    print(f"[INFO] 放行順序: {order}")
+    if order.index("B1") > 1:
+        print("[ERROR] 使用者 B 的請求應在 A 的第二個請求之前放行")
+        return False
+    snapshot = limiter.snapshot()
+    if snapshot["requests"] != 5 or snapshot["queue_depth"] != 0 or snapshot["queue_wait_max_ms"] < 40:
+        print(f"[ERROR] 統計不符: {snapshot}")
+        return False
+    return True
+
+async def test_retry_after():
+    """429 時依 Retry-After 等待後重試，並記錄節流與重試次數；重試用盡時拋出例外"""
+    original_limiter = ai_rate_limit_service.limiter
+    original_base = settings.AI_RETRY_BASE_SECONDS
+    settings.AI_RETRY_BASE_SECONDS = 0.001
+    try:
+        ai_rate_limit_service.limiter = ai_rate_limit_service.AIRateLimiter(rpm=1000, tpm=100000)
+        completions, call_times = _flaky_completions(failures=2, retry_after_ms=80)
+        response = await azure_ai_service.create_chat_completion(
+            fake_client(completions), messages=[{"role": "user", "content": "你好"}], max_tokens=10
+        )
+        gaps = [b - a for a, b in zip(call_times, call_times[1:])]
+        metrics = ai_rate_limit_service.limiter.snapshot()
+        print(f"[INFO] 重試間隔: {[round(g * 1000) for g in gaps]}ms, 統計: throttled={metrics['throttled']}, retries={metrics['retries']}")
+        if response.choices[0].message.content != "ok" or min(gaps) < 0.075:
+            print("[ERROR] 重試前應至少等待 Retry-After")
+            return False
+        if metrics["throttled"] != 2 or metrics["retries"] != 2 or metrics["failures"] != 0:
+            print("[ERROR] 節流與重試次數不符")
+            return False
+
+        completions, _ = _flaky_completions(failures=settings.AI_MAX_RETRIES + 1, retry_after_ms=1)
+        try:
+            await azure_ai_service.create_chat_completion(
+                fake_client(completions), messages=[{"role": "user", "content": "你好"}], max_tokens=10
+            )
+            print("[ERROR] 重試用盡時應拋出 RateLimitError")
+            return False
+        except RateLimitError:
+            pass
+        if ai_rate_limit_service.limiter.snapshot()["failures"] != 1:
+            print("[ERROR] 最終失敗次數不符")
+            return False
+    finally:
+        ai_rate_limit_service.limiter = original_limiter
+        settings.AI_RETRY_BASE_SECONDS = original_base
+    return True
+
+async def test_enhance_rate_limited():
+    """重試用盡時潤飾結果標記為超過用量，不以錯誤訊息當作報告內容"""
+    original = (ai_rate_limit_service.limiter, settings.AI_RETRY_BASE_SECONDS)
+    settings.AI_RETRY_BASE_SECONDS = 0.001
+    try:
+        ai_rate_limit_service.limiter = ai_rate_limit_service.AIRateLimiter(rpm=1000, tpm=100000)
+        completions, _ = _flaky_completions(failures=settings.AI_MAX_RETRIES + 1, retry_after_ms=1)
+        with patched_client(completions):
+            report = await azure_ai_service.enhance_report("今天的工作", "測試專案")
+        print(f"[INFO] 重試用盡的潤飾結果: content={report.content!r}, error={report.error}")
+        if report.content is not None or report.error != azure_ai_service.ENHANCE_RATE_LIMITED:
+            print("[ERROR] 重試用盡時潤飾結果應標記為超過用量且沒有內容")
+            return False
+    finally:
+        ai_rate_limit_service.limiter, settings.AI_RETRY_BASE_SECONDS = original
+    return True
+
+async def main():
+    print("=== 測試 AI 請求限流與重試 ===\n")
+    for test in (test_fair_queue, test_retry_after, test_enhance_rate_limited):
+        if not await test():
+            return False
+    print("\n[OK] AI 請求限流測試通過")
+    return True
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(main())
+    if not success:
+        sys.exit(1)
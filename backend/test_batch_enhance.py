@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+import sys
+import os
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import azure_ai_service
+from fake_openai import FakeCompletions, patched_client
+
+def _reply(batch_reply):
+    """批次請求依 batch_reply 產生回應，單一專案請求回傳固定報告"""
+    def reply(request):
+        if request.get("response_format") == {"type": "json_object"}:
+            return batch_reply(request["messages"][1]["content"])
+        return "單一專案報告"
+    return reply
+
+ITEMS = [
+    azure_ai_service.BatchEnhanceItem(project_id=pid, project_name=f"專案{pid}", content=f"第 {pid} 個專案的筆記")
+    for pid in (11, 12, 13)
+]
+
+async def _run(batch_reply):
+    with patched_client(FakeCompletions(_reply(batch_reply))) as completions:
+        results = await azure_ai_service.enhance_reports_batch(ITEMS)
+    return results, completions.requests
+
+async def test_batch_enhance():
+    """批次潤飾：完整回應只需一次請求，缺漏或無法解析時逐一補送"""
+    print("=== 測試批次潤飾 ===\n")
+
+    # 1. 回應完整：三個專案一次完成，系統提示詞只送一次
+    results, requests = await _run(lambda prompt: json.dumps({str(i.project_id): f"報告 {i.project_id}" for i in ITEMS}))
+    print(f"[INFO] 完整回應: 請求數 {len(requests)}")
+    if len(requests) != 1 or [results[i.project_id].content for i in ITEMS] != ["報告 11", "報告 12", "報告 13"]:
+        print("[ERROR] 完整回應應只需一次請求")
+        return False
+
+    # 2. 缺少一個專案、另一個為空字串：只補送這兩個
+    results, requests = await _run(lambda prompt: json.dumps({"11": "報告 11", "12": "  "}))
+    print(f"[INFO] 部分回應: 請求數 {len(requests)}")
+    if len(requests) != 3 or results[11].content != "報告 11" or results[13].content != "單一專案報告":
+        print("[ERROR] 缺漏的專案應逐一補送")
+        return False
+
+    # 3. 無法解析：全部逐一補送
+    results, requests = await _run(lambda prompt: "這不是 JSON")
+    print(f"[INFO] 無法解析: 請求數 {len(requests)}")
+    if len(requests) != 4 or any(results[i.project_id].content != "單一專案報告" for i in ITEMS):
+        print("[ERROR] 無法解析時應全部逐一補送")
+        return False
+
+    print("\n[OK] 批次潤飾測試通過")
+    return True
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(test_batch_enhance())
+    if not success:
+        sys.exit(1)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import sys
+import os
+import time
+
+from openai import APITimeoutError
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core import circuit_breaker
+from app.services import azure_ai_service, ai_suggestion_service, ai_rate_limit_service
+from fake_openai import FakeCompletions, patched_client
+
+FAILURE_THRESHOLD = 3
+RECOVERY_SECONDS = 0.2
+# 斷路器開啟時的替代結果應在此時間內回傳
+FAST_FALLBACK_MS = 20.0
+
+class HangingService:
+    """假的 Azure 服務：每次請求約 50ms，healthy 為 False 時模擬逾時 (拋出 APITimeoutError)"""
+
+    def __init__(self):
+        self.healthy = False
+
+    async def reply(self, request):
+        await asyncio.sleep(0.05)
+        if not self.healthy:
+            raise APITimeoutError(request=None)
+        return "潤飾後的報告"
+
+async def _timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return result, (time.perf_counter() - start) * 1000
+
+async def test_circuit_breaker():
+    """連續逾時後斷路器開啟並快速改用替代結果，恢復時間後以單一探測請求關閉"""
+    print("=== 測試 AI 服務斷路器 ===\n")
+    service = HangingService()
+    completions = FakeCompletions(service.reply)
+    breaker = circuit_breaker.CircuitBreaker("Azure OpenAI (test)", FAILURE_THRESHOLD, RECOVERY_SECONDS)
+
+    original = (azure_ai_service.openai_breaker, settings.AI_MAX_RETRIES, ai_rate_limit_service.limiter)
+    azure_ai_service.openai_breaker = breaker
+    ai_rate_limit_service.limiter = ai_rate_limit_service.AIRateLimiter(rpm=1000, tpm=100000)
+    settings.AI_MAX_RETRIES = 0
+    with patched_client(completions):
+        try:
+            # 1. 連續逾時達門檻後開啟
+            for _ in range(FAILURE_THRESHOLD):
+                await azure_ai_service.enhance_report("今天的工作", "測試專案")
+            print(f"[INFO] 連續 {FAILURE_THRESHOLD} 次逾時後: {breaker.state}")
+            if breaker.state != circuit_breaker.OPEN:
+                print("[ERROR] 斷路器應已開啟")
+                return False
+
+            # 2. 開啟中：潤飾與主管建議都不送出請求，立即回傳替代結果
+            calls_before = completions.calls
+            report, enhance_ms = await _timed(azure_ai_service.enhance_report("今天的工作", "測試專案"))
+            suggestions, suggestion_ms = await _timed(
+                ai_suggestion_service.generate_supervisor_reply_suggestions("今天完成登入頁面", "測試員工")
+            )
+            print(f"[INFO] 開啟中: 潤飾 {enhance_ms:.2f}ms ({report.error}), 主管建議 {suggestion_ms:.2f}ms ({len(suggestions)} 則)")
+            if completions.calls != calls_before or not suggestions:
+                print("[ERROR] 斷路器開啟時不應送出請求")
+                return False
+            if report.content is not None or report.error != azure_ai_service.ENHANCE_UNAVAILABLE:
+                print("[ERROR] 斷路器開啟時潤飾結果應標記為無法使用，不以錯誤訊息當作報告內容")
+                return False
+            if max(enhance_ms, suggestion_ms) > FAST_FALLBACK_MS:
+                print(f"[ERROR] 替代結果應在 {FAST_FALLBACK_MS:.0f}ms 內回傳")
+                return False
+
+            # 3. 恢復時間後半開：探測失敗則重新開啟
+            await asyncio.sleep(RECOVERY_SECONDS)
+            await azure_ai_service.enhance_report("今天的工作", "測試專案")
+            if breaker.state != circuit_breaker.OPEN or breaker.times_opened != 2:
+                print("[ERROR] 探測失敗後應重新開啟")
+                return False
+
+            # 4. 服務恢復：同時送出多個請求時只有一個探測請求，成功後關閉；
+            #    在限流器排隊等待時不佔用探測名額
+            service.healthy = True
+            await asyncio.sleep(RECOVERY_SECONDS)
+            ai_rate_limit_service.limiter.pause(0.05)
+            calls_before = completions.calls
+            pending = asyncio.gather(*(azure_ai_service.enhance_report("今天的工作", "測試專案") for _ in range(3)))
+            await asyncio.sleep(0.02)
+            if breaker.probe_in_flight:
+                print("[ERROR] 在限流器排隊等待時不應佔用半開的探測名額")
+                return False
+            results = await pending
+            print(f"[INFO] 半開時同時送出 3 個請求，實際送出 {completions.calls - calls_before} 個，狀態: {breaker.state}")
+            if completions.calls - calls_before != 1 or results[0].content != "潤飾後的報告":
+                print("[ERROR] 半開時應只放行一個探測請求")
+                return False
+            if breaker.state != circuit_breaker.CLOSED:
+                print("[ERROR] 探測成功後應關閉")
+                return False
+            print(f"[INFO] 統計: {breaker.snapshot()}")
+        finally:
+            azure_ai_service.openai_breaker, settings.AI_MAX_RETRIES, ai_rate_limit_service.limiter = original
+
+    print("\n[OK] 斷路器測試通過")
+    return True
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(test_circuit_breaker())
+    if not success:
+        sys.exit(1)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import sys
+import os
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine
+from app.core.workday import current_work_date
+from app.models import Employee, Project, WorkRecord
+from app.schemas.work_record import WorkRecordCreate, FileAttachmentCreate
+from app.services import records_service
+
+# 更新彙整報告預期的 SQL 數量 (不含交易控制)，與附件數量無關：
+#   1. SELECT 當日紀錄 + 附件
+#   2. DELETE 移除的附件
+#   3. UPDATE 變更 AI 選取狀態的附件
+#   4. INSERT ... RETURNING 新增的附件
+#   5. INSERT ... ON CONFLICT 彙整
+# 專案資訊取自記憶體中的專案快取 (新增紀錄時已載入)
+EXPECTED_STATEMENTS = 5
+
+# 交易控制語句不列入計算
+_TRANSACTION_PREFIXES = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT", "BEGIN", "COMMIT", "ROLLBACK")
+
+def _file(name: str) -> FileAttachmentCreate:
+    return FileAttachmentCreate(name=name, type="text/plain", size=1, url=f"/uploads/statement_count/{name}")
+
+async def _count_update_statements(db: AsyncSession, employee_id: int, project_id: int, file_count: int) -> int:
+    """建立帶 file_count 個附件的紀錄，再刪除、切換、新增各三分之一的附件，回傳更新時的 SQL 數量"""
+    await records_service.create(
+        db=db,
+        obj_in=WorkRecordCreate(
+            content="SQL 數量測試",
+            project_id=project_id,
+            execution_time_minutes=10,
+            files=[_file(f"old_{i}.txt") for i in range(file_count)]
+        ),
+        employee_id=employee_id
+    )
+    report = (await records_service.get_consolidated_today(db=db, employee_id=employee_id))[0]
+
+    third = max(file_count // 3, 1)
+    kept = report.files[third:]
+    for f in kept[:third]:
+        f.is_selected_for_ai = not f.is_selected_for_ai
+    new_files = kept + [_file(f"new_{i}.txt") for i in range(third)]
+
+    # 清空 identity map，讓每次量測的起點相同
+    db.expunge_all()
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(_TRANSACTION_PREFIXES):
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        updated = await records_service.update_consolidated_report(
+            db=db,
+            project_id=project_id,
+            content="更新後的內容",
+            files=new_files,
+            employee_id=employee_id
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+
+    for i, statement in enumerate(statements, 1):
+        print(f"   {i}. {' '.join(statement.split())[:100]}")
+
+    expected_urls = [f.url for f in new_files]
+    if updated is None or [f.url for f in updated.files] != expected_urls:
+        raise AssertionError("回傳的彙整報告附件與更新內容不符")
+
+    # 紀錄與彙整同步：編輯後的內容與 AI 內容只放在主要紀錄上
+    await records_service.update_ai_report(db=db, project_id=project_id, ai_content="AI 內容", employee_id=employee_id)
+    result = await db.execute(
+        select(WorkRecord.content, WorkRecord.ai_content)
+        .where(WorkRecord.employee_id == employee_id, WorkRecord.project_id == project_id, WorkRecord.work_date == current_work_date())
+        .order_by(WorkRecord.created_at, WorkRecord.id)
+    )
+    rows = result.all()
+    if rows[0] != ("更新後的內容", "AI 內容") or any(row != ("", None) for row in rows[1:]):
+        raise AssertionError(f"紀錄未與彙整同步: {rows}")
+    return len(statements)
+
+async def test_consolidated_update_statement_count():
+    """以少量與大量附件各更新一次彙整報告，確認 SQL 數量固定 (全部在交易中執行，結束後回滾不留資料)"""
+    print("=== 測試更新彙整報告的 SQL 數量 ===\n")
+
+    for file_count in (3, 60):
+        async with engine.connect() as conn:
+            outer_transaction = await conn.begin()
+            # 服務內的 commit 只會釋放 savepoint，最後整個外層交易回滾
+            db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+            try:
+                employee_id = await db.scalar(select(Employee.id).limit(1))
+                project_id = await db.scalar(select(Project.id).limit(1))
+                if employee_id is None or project_id is None:
+                    print("[SKIP] 資料庫中沒有可供測試的員工或專案")
+                    return True
+
+                print(f"[INFO] 附件數 {file_count}")
+                count = await _count_update_statements(db, employee_id, project_id, file_count)
+                if count != EXPECTED_STATEMENTS:
+                    print(f"[ERROR] 預期 {EXPECTED_STATEMENTS} 個 SQL，實際 {count} 個")
+                    return False
+                print(f"[OK] 附件數 {file_count} 共 {count} 個 SQL\n")
+            finally:
+                await db.close()
+                await outer_transaction.rollback()
+    return True
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(test_consolidated_update_statement_count())
+    if not success:
+        sys.exit(1)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import datetime
+import sys
+import os
+
+from sqlalchemy import delete, event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models import DailyReport, Employee, EmployeeContextSummary, ReportStatus
+from app.services import context_summary_service
+
+# 使用遠在未來的日期，測試資料必定是「最近」的日報
+BASE_DATE = datetime.date(2100, 1, 1)
+
+def _day(offset: int) -> datetime.date:
+    return BASE_DATE + datetime.timedelta(days=offset)
+
+def _content(text: str) -> list:
+    return [
+        {"project": {"plan_subj_c": "測試專案A"}, "content": text, "ai_content": None},
+        {"project": {"plan_subj_c": "測試專案B"}, "content": "原始內容", "ai_content": f"## 潤飾\n- **{text}**"},
+    ]
+
+async def _check(db: AsyncSession, employee_id: int) -> bool:
+    # 1. 摘要列不存在時，由最近的日報建立
+    for offset in (0, 1):
+        db.add(DailyReport(employee_id=employee_id, date=_day(offset), consolidated_content=_content(f"歷史第{offset}天"), status=ReportStatus.pending))
+    await db.execute(delete(EmployeeContextSummary).where(EmployeeContextSummary.employee_id == employee_id))
+    await db.flush()
+    context = await context_summary_service.get_recent_context(db, employee_id=employee_id, before=_day(2))
+    print(f"[INFO] 由歷史建立:\n{context}")
+    if not context or "歷史第0天" not in context or "歷史第1天" not in context or "##" in context or "**" in context:
+        print("[ERROR] 應由歷史日報建立摘要並移除 Markdown 標記")
+        return False
+
+    # 2. 提交更多天的日報：只保留最近幾天且總 token 數不超過上限；同一天重新提交會取代舊摘要
+    for offset in range(2, 2 + settings.AI_CONTEXT_MAX_DAYS + 2):
+        await context_summary_service.record_daily_report(
+            db, employee_id=employee_id, report_date=_day(offset), consolidated_content=_content(f"第{offset}天" + "很長的內容" * 500)
+        )
+    last = 1 + settings.AI_CONTEXT_MAX_DAYS + 2
+    await context_summary_service.record_daily_report(
+        db, employee_id=employee_id, report_date=_day(last), consolidated_content=_content("重新提交")
+    )
+    db.expunge_all()
+    summary = await db.get(EmployeeContextSummary, employee_id)
+    dates = [entry["date"] for entry in summary.entries]
+    print(f"[INFO] 保留 {len(dates)} 天，共 {summary.token_count} tokens: {dates}")
+    if len(dates) > settings.AI_CONTEXT_MAX_DAYS or summary.token_count > settings.AI_CONTEXT_MAX_TOKENS:
+        print("[ERROR] 摘要超過天數或 token 上限")
+        return False
+    if dates[0] != _day(last).isoformat() or "重新提交" not in summary.entries[0]["digest"] or dates != sorted(dates, reverse=True):
+        print("[ERROR] 同一天重新提交應取代舊摘要，且由新到舊排序")
+        return False
+    if any(context_summary_service.count_tokens(entry["digest"]) > settings.AI_CONTEXT_DAY_TOKENS for entry in summary.entries):
+        print("[ERROR] 單日摘要超過 token 上限")
+        return False
+
+    # 3. 取用時只需一次查詢，且不包含審核日 (含) 之後的日報
+    db.expunge_all()
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        context = await context_summary_service.get_recent_context(db, employee_id=employee_id, before=_day(last))
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+    print(f"[INFO] 取用上下文: {len(statements)} 個 SQL，{context_summary_service.count_tokens(context)} tokens")
+    if len(statements) != 1 or "重新提交" in context or _day(last - 1).isoformat() not in context:
+        print("[ERROR] 取用上下文應只有一次查詢且排除審核日之後的日報")
+        return False
+    return True
+
+async def test_context_summary():
+    """滾動摘要的建立、增量更新與取用 (全部在交易中執行，結束後回滾不留資料)"""
+    print("=== 測試員工滾動摘要 ===\n")
+
+    async with engine.connect() as conn:
+        outer_transaction = await conn.begin()
+        # 服務內的 commit 只會釋放 savepoint，最後整個外層交易回滾
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        try:
+            employee_id = await db.scalar(select(Employee.id).limit(1))
+            if employee_id is None:
+                print("[SKIP] 資料庫中沒有可供測試的員工")
+                return True
+            if not await _check(db, employee_id):
+                return False
+        finally:
+            await db.close()
+            await outer_transaction.rollback()
+
+    print("\n[OK] 員工滾動摘要測試通過")
+    return True
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(test_context_summary())
+    if not success:
+        sys.exit(1)
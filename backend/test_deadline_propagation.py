@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core import deadline, circuit_breaker
+from app.core.database import engine
+from app.services import azure_ai_service
+from fake_openai import FakeCompletions, patched_client
+
+def _slow_completions(delay: float) -> FakeCompletions:
+    """批次請求立即回傳無法解析的內容，單一專案請求各需 delay 秒"""
+    async def reply(request):
+        if request.get("response_format") == {"type": "json_object"}:
+            return "這不是 JSON"
+        await asyncio.sleep(delay)
+        return "潤飾後的報告"
+    return FakeCompletions(reply)
+
+class FakeRequest:
+    """假的 Request：disconnect_after 秒後回報用戶端已中斷連線"""
+
+    def __init__(self, disconnect_after: float = None):
+        self.started = time.monotonic()
+        self.disconnect_after = disconnect_after
+        self.url = SimpleNamespace(path="/test")
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnect_after is not None and time.monotonic() - self.started >= self.disconnect_after
+
+async def test_ai_call_deadline():
+    """AI 呼叫在剩餘預算用完時中止並拋出 DeadlineExceeded，且不計入斷路器失敗"""
+    start = time.perf_counter()
+    try:
+        with patched_client(_slow_completions(delay=5)), deadline.scope(0.2):
+            await azure_ai_service.enhance_report("今天的工作", "測試專案")
+        print("[ERROR] 應拋出 DeadlineExceeded")
+        return False
+    except deadline.DeadlineExceeded:
+        pass
+    elapsed = time.perf_counter() - start
+    print(f"[INFO] 預算 0.2 秒的 AI 呼叫在 {elapsed:.2f} 秒後中止")
+    if elapsed > 0.5 or circuit_breaker.openai_breaker.consecutive_failures:
+        print("[ERROR] 應在預算內中止且不計入斷路器失敗")
+        return False
+    return True
+
+async def test_partial_batch():
+    """批次潤飾逐一補送時預算用完，回傳已完成的專案"""
+    items = [
+        azure_ai_service.BatchEnhanceItem(project_id=pid, project_name=f"專案{pid}", content=f"第 {pid} 個專案的筆記")
+        for pid in (1, 2, 3, 4)
+    ]
+    with patched_client(_slow_completions(delay=0.15)), deadline.scope(0.4):
+        results = await azure_ai_service.enhance_reports_batch(items)
+    print(f"[INFO] 預算 0.4 秒: 完成 {sorted(results)} / 4 個專案")
+    if not 1 <= len(results) < 4:
+        print("[ERROR] 應回傳部分結果")
+        return False
+    return True
+
+async def test_disconnect_and_hard_cancel():
+    """用戶端中斷連線時取消執行 (499)；忽略預算的工作在寬限時間後被強制取消 (504)"""
+    observed = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            observed.append(deadline.remaining() is not None)
+            raise
+
+    for request, seconds, expected in ((FakeRequest(disconnect_after=0.2), 30, 499), (FakeRequest(), 0.1, 504)):
+        start = time.perf_counter()
+        try:
+            await deadline.run(request, seconds, work)
+            print("[ERROR] 應拋出 HTTPException")
+            return False
+        except HTTPException as e:
+            elapsed = time.perf_counter() - start
+            print(f"[INFO] {e.status_code} ({elapsed:.2f} 秒)")
+            if e.status_code != expected:
+                print(f"[ERROR] 預期 {expected}")
+                return False
+    if observed != [True, True]:
+        print("[ERROR] 工作應帶有時間預算並被取消")
+        return False
+    return True
+
+async def test_statement_timeout():
+    """剩餘預算設為交易的 statement_timeout"""
+    try:
+        async with engine.connect() as conn:
+            db = AsyncSession(bind=conn)
+            try:
+                with deadline.scope(0.2):
+                    await deadline.set_statement_timeout(db)
+                    await db.execute(text("SELECT pg_sleep(2)"))
+                print("[ERROR] 查詢應被 statement_timeout 取消")
+                return False
+            except DBAPIError:
+                print("[INFO] 超過預算的查詢已被取消")
+            finally:
+                await db.rollback()
+    except OSError as e:
+        print(f"[SKIP] 無法連線資料庫，略過 statement_timeout 測試: {e}")
+    return True
+
+async def main():
+    print("=== 測試時間預算傳遞 ===\n")
+    original = deadline.HARD_CANCEL_GRACE_SECONDS
+    deadline.HARD_CANCEL_GRACE_SECONDS = 0.1
+    try:
+        for test in (test_ai_call_deadline, test_partial_batch, test_disconnect_and_hard_cancel, test_statement_timeout):
+            if not await test():
+                return False
+    finally:
+        deadline.HARD_CANCEL_GRACE_SECONDS = original
+    print("\n[OK] 時間預算測試通過")
+    return True
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(main())
+    if not success:
+        sys.exit(1)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import sys
+import os
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine
+from app.core.workday import current_work_date
+from app.models import DailyProjectSummary, Employee, Project
+from app.schemas.work_record import WorkRecordCreate
+from app.services import azure_ai_service, records_service
+
+class FakeEnhance:
+    """假的 enhance_report：記錄呼叫次數，以及呼叫當下資料庫 session 是否仍在交易中"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.calls = 0
+        self.in_transaction = []
+
+    async def __call__(self, original_content, project_name, reference_texts=[]):
+        self.calls += 1
+        self.in_transaction.append(self.db.in_transaction())
+        await asyncio.sleep(0.01)
+        return azure_ai_service.EnhancedReport(f"潤飾後的報告 {self.calls}")
+
+async def _check(db: AsyncSession, employee_id: int, project_id: int) -> bool:
+    await records_service.create(
+        db=db,
+        obj_in=WorkRecordCreate(content="交易範圍測試", project_id=project_id, execution_time_minutes=10),
+        employee_id=employee_id
+    )
+    fake = FakeEnhance(db)
+    original = azure_ai_service.enhance_report
+    azure_ai_service.enhance_report = fake
+    try:
+        # 1. 呼叫 AI 期間沒有開啟中的交易，結果在最後寫回
+        report = await records_service.enhance_one_today(db, employee_id=employee_id, project_id=project_id)
+        stored = await db.scalar(
+            select(DailyProjectSummary.ai_content).where(
+                DailyProjectSummary.employee_id == employee_id,
+                DailyProjectSummary.project_id == project_id,
+                DailyProjectSummary.work_date == current_work_date(),
+            )
+        )
+        print(f"[INFO] 單一潤飾: 呼叫時在交易中 {fake.in_transaction}, 儲存內容 {stored!r}")
+        if fake.in_transaction != [False] or report.ai_content != "潤飾後的報告 1" or stored != report.ai_content:
+            print("[ERROR] 呼叫 AI 時不應有開啟中的交易，且結果應寫回彙整")
+            return False
+
+        # 2. 相同輸入再次潤飾 (單一與一鍵) 直接沿用已儲存的結果
+        await records_service.enhance_one_today(db, employee_id=employee_id, project_id=project_id)
+        reports = await records_service.enhance_all_today(db, employee_id=employee_id, batched=False)
+        reused = next(r for r in reports if r.project.id == project_id)
+        if fake.calls != 1 or reused.ai_content != "潤飾後的報告 1":
+            print(f"[ERROR] 相同輸入應沿用已儲存的結果 (AI 呼叫 {fake.calls} 次)")
+            return False
+
+        # 3. 內容修改後一鍵潤飾：呼叫 AI 期間同樣沒有開啟中的交易
+        await records_service.update_consolidated_report(
+            db=db, project_id=project_id, content="修改後的內容", files=[], employee_id=employee_id
+        )
+        reports = await records_service.enhance_all_today(db, employee_id=employee_id, batched=False)
+        enhanced = next(r for r in reports if r.project.id == project_id)
+        print(f"[INFO] 一鍵潤飾: 呼叫時在交易中 {fake.in_transaction}, 結果 {enhanced.ai_content!r}")
+        if fake.calls != 2 or any(fake.in_transaction) or enhanced.ai_content != "潤飾後的報告 2":
+            print("[ERROR] 一鍵潤飾呼叫 AI 時不應有開啟中的交易，且結果應寫回彙整")
+            return False
+    finally:
+        azure_ai_service.enhance_report = original
+    return True
+
+async def test_enhance_transaction_scope():
+    """潤飾時只在讀取與寫回時使用短交易 (全部在交易中執行，結束後回滾不留資料)"""
+    print("=== 測試 AI 潤飾的交易範圍 ===\n")
+
+    async with engine.connect() as conn:
+        outer_transaction = await conn.begin()
+        # 服務內的 commit 只會釋放 savepoint，最後整個外層交易回滾
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        try:
+            employee_id = await db.scalar(select(Employee.id).limit(1))
+            project_id = await db.scalar(select(Project.id).limit(1))
+            if employee_id is None or project_id is None:
+                print("[SKIP] 資料庫中沒有可供測試的員工或專案")
+                return True
+            if not await _check(db, employee_id, project_id):
+                return False
+        finally:
+            await db.close()
+            await outer_transaction.rollback()
+
+    print("\n[OK] AI 潤飾交易範圍測試通過")
+    return True
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(test_enhance_transaction_scope())
+    if not success:
+        sys.exit(1)
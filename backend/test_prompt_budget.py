@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.prompt_budget_service import count_tokens, truncate_to_tokens, chunk_text, pack_prompt
+
+# 中英混合的筆記與參考文件
+NOTES = "今天修正 login API 的 timeout 問題，並與 QA 討論 regression test 的排程。" * 3
+
+def _marker(doc: int, paragraph: int) -> str:
+    """每個段落獨有的英文詞 (BM25 以英數字單字為詞)"""
+    return f"marker{doc}x{paragraph}"
+
+def _reference(doc: int, paragraphs: int) -> str:
+    return "\n\n".join(
+        f"文件{doc}第{p}段 {_marker(doc, p)}：" + "系統 deploy 流程說明，包含 build、test 與 release 步驟。" * 4
+        for p in range(paragraphs)
+    )
+
+def test_count_and_truncate() -> bool:
+    """token 估算與截斷：截斷結果是原文的前綴、不超過上限，且再多一個字元就會超過"""
+    cases = {"": 0, "abcd": 1, "abcde": 2, "中文": 3, "中文ab": 4}
+    for text, expected in cases.items():
+        if count_tokens(text) != expected:
+            print(f"[ERROR] count_tokens({text!r}) = {count_tokens(text)}，預期 {expected}")
+            return False
+
+    for limit in (1, 7, 50, 333):
+        head = truncate_to_tokens(NOTES, limit)
+        if not NOTES.startswith(head) or count_tokens(head) > limit:
+            print(f"[ERROR] truncate_to_tokens 上限 {limit} 的結果不正確")
+            return False
+        if head != NOTES and count_tokens(NOTES[:len(head) + 1]) <= limit:
+            print(f"[ERROR] truncate_to_tokens 上限 {limit} 沒有取到最長的前綴")
+            return False
+    print("[OK] token 估算與截斷")
+    return True
+
+def test_chunk_text() -> bool:
+    """切塊：每塊不超過上限，沒有標點的超長句子會被硬切，內容不遺漏也不重複"""
+    long_sentence = "無標點的超長句子" * 300 + "x" * 2000
+    text = "第一段。第二句！\n\n" + long_sentence + "\n\n最後一段。"
+    chunks = chunk_text(text, 100)
+    oversized = [count_tokens(c) for c in chunks if count_tokens(c) > 100]
+    if oversized:
+        print(f"[ERROR] 有片段超過上限: {oversized}")
+        return False
+    if "".join(chunks).replace("\n", "") != text.replace("\n", ""):
+        print("[ERROR] 切塊後的內容與原文不一致")
+        return False
+    if len(chunks) < count_tokens(long_sentence) // 100:
+        print("[ERROR] 超長句子應被硬切成多塊")
+        return False
+    print(f"[OK] 切塊 ({len(chunks)} 塊)")
+    return True
+
+def test_pack_within_budget() -> bool:
+    """筆記加參考資料不超過預算 (含文件標題與分隔符號)"""
+    references = [_reference(doc, 12) for doc in range(3)]
+    for budget in (120, 400, 1000, 3000):
+        packed = pack_prompt(NOTES, references, budget_tokens=budget, chunk_tokens=80, top_k=50)
+        total = count_tokens(packed.notes) + count_tokens(packed.references)
+        print(f"[INFO] 預算 {budget}: 實際 {total}, 片段 {packed.stats['chunks_used']}/{packed.stats['chunks_total']}")
+        if total > budget:
+            print(f"[ERROR] 預算 {budget} 實際使用 {total}")
+            return False
+        if packed.stats["reference_tokens_used"] != count_tokens(packed.references):
+            print("[ERROR] reference_tokens_used 與實際參考資料的 token 數不符")
+            return False
+    print("[OK] 預算上限")
+    return True
+
+def test_pack_order_and_stats() -> bool:
+    """選出的片段依原文件順序排列；truncated 與 chunks_used 統計正確"""
+    references = [_reference(0, 4), _reference(1, 4)]
+    # 筆記提到後面的片段，讓相關度的順序與原文件順序相反
+    notes = f"請參考 {_marker(1, 3)} 與 {_marker(0, 2)} 以及 {_marker(1, 0)}"
+    packed = pack_prompt(notes, references, budget_tokens=5000, chunk_tokens=60, top_k=3)
+    markers = [_marker(0, 2), _marker(1, 0), _marker(1, 3)]
+    positions = [packed.references.find(m) for m in markers]
+    print(f"[INFO] 片段位置: {dict(zip(markers, positions))}")
+    if -1 in positions or positions != sorted(positions):
+        print("[ERROR] 選出的片段應依原文件順序排列")
+        return False
+    stats = packed.stats
+    if stats["chunks_used"] != 3 or not stats["truncated"] or stats["notes_truncated"]:
+        print(f"[ERROR] top_k 限制時的統計不正確: {stats}")
+        return False
+
+    # 預算足夠：全部放入，沒有截斷
+    packed = pack_prompt(notes, references, budget_tokens=5000, chunk_tokens=60, top_k=100)
+    stats = packed.stats
+    if stats["truncated"] or stats["chunks_used"] != stats["chunks_total"]:
+        print(f"[ERROR] 預算足夠時不應截斷: {stats}")
+        return False
+
+    # 筆記超過可用預算：筆記被截斷
+    packed = pack_prompt(NOTES * 10, references, budget_tokens=200, chunk_tokens=60)
+    stats = packed.stats
+    if not stats["notes_truncated"] or not stats["truncated"] or count_tokens(packed.notes) > 100:
+        print(f"[ERROR] 筆記超過預算時應截斷到一半的預算內: {stats}")
+        return False
+
+    # 沒有參考資料時筆記可使用全部預算
+    packed = pack_prompt(NOTES, [], budget_tokens=count_tokens(NOTES))
+    if packed.notes != NOTES or packed.stats["truncated"] or packed.stats["chunks_total"] != 0:
+        print(f"[ERROR] 沒有參考資料時筆記不應被截斷: {packed.stats}")
+        return False
+    print("[OK] 片段順序與統計")
+    return True
+
+def main() -> bool:
+    print("=== 測試提示詞 token 預算 ===\n")
+    for test in (test_count_and_truncate, test_chunk_text, test_pack_within_budget, test_pack_order_and_stats):
+        if not test():
+            return False
+    print("\n[OK] 提示詞 token 預算測試通過")
+    return True
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import datetime
+import sys
+import os
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql.dml import Insert
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine
+from app.models import User, Employee, ReviewInboxItem, ReviewComment, ReportApproval, ApprovalStatus
+from app.schemas.supervisor import ReportReviewBatchItem
+from app.services import supervisor_service, event_service
+
+async def _check(db: AsyncSession, reviewer: User, report_ids: list) -> bool:
+    raced_id, other_id = report_ids
+    supervisor_id = reviewer.employee.id
+    original_execute = db.execute
+
+    async def execute_with_race(statement, *args, **kwargs):
+        # 模擬另一個工作階段在讀取審核狀態之後、寫入之前核准了第一份日報
+        if isinstance(statement, Insert) and statement.table.name == ReportApproval.__tablename__:
+            await original_execute(Insert(ReportApproval).values(
+                report_id=raced_id, supervisor_id=supervisor_id, status=ApprovalStatus.approved,
+                rating=5, approved_at=datetime.datetime.utcnow()
+            ))
+        return await original_execute(statement, *args, **kwargs)
+
+    published = []
+
+    async def record_publish(channels, event_type, **data):
+        published.append((event_type, data["report_id"], sorted(channels)))
+
+    original_publish = event_service.publish
+    event_service.publish = record_publish
+    db.execute = execute_with_race
+    try:
+        results = await supervisor_service.review_daily_reports_batch(
+            db,
+            items=[ReportReviewBatchItem(report_id=rid, rating=4, comment="批次競爭測試") for rid in report_ids],
+            reviewer=reviewer,
+        )
+    finally:
+        db.execute = original_execute
+        event_service.publish = original_publish
+
+    print(f"[INFO] 批次結果: {results}")
+    by_id = {r["report_id"]: r for r in results}
+    if by_id[raced_id]["success"] or not by_id[other_id]["success"]:
+        print("[ERROR] 被其他工作階段搶先審核的日報應回報失敗，其餘日報成功")
+        return False
+
+    comment_counts = dict((await db.execute(
+        select(ReviewComment.report_id, func.count())
+        .where(ReviewComment.report_id.in_(report_ids), ReviewComment.content == "批次競爭測試")
+        .group_by(ReviewComment.report_id)
+    )).all())
+    inbox_status = dict((await db.execute(
+        select(ReviewInboxItem.report_id, ReviewInboxItem.status)
+        .where(ReviewInboxItem.report_id.in_(report_ids), ReviewInboxItem.supervisor_id == supervisor_id)
+    )).all())
+    print(f"[INFO] 留言數: {comment_counts}, 待審清單: {inbox_status}")
+    if comment_counts != {other_id: 1} or inbox_status[raced_id] != ApprovalStatus.pending:
+        print("[ERROR] 沒有寫入審核記錄的日報不應建立留言或更新待審清單")
+        return False
+
+    owner_id = (await db.execute(
+        select(ReviewInboxItem.employee_id).where(ReviewInboxItem.report_id == other_id).limit(1)
+    )).scalar_one()
+    expected_channels = sorted(
+        [event_service.employee_channel(owner_id)]
+        + [event_service.supervisor_channel(sid) for sid in await supervisor_service.get_all_supervisor_ids(db, owner_id)]
+    )
+    print(f"[INFO] 發布的事件: {published}")
+    if published != [("report_reviewed", other_id, expected_channels), ("comment_created", other_id, expected_channels)]:
+        print("[ERROR] 應只為成功的日報通知員工本人與所有上級主管 (審核狀態與留言)")
+        return False
+    return True
+
+async def test_review_batch_race():
+    """批次審核時日報被並行核准 (全部在交易中執行，結束後回滾不留資料)"""
+    print("=== 測試批次審核的並行核准 ===\n")
+
+    async with engine.connect() as conn:
+        outer_transaction = await conn.begin()
+        # 服務內的 commit 只會釋放 savepoint，最後整個外層交易回滾
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        try:
+            # 找一位有兩份以上待審日報、且有使用者帳號的主管
+            supervisor_query = (
+                select(ReviewInboxItem.supervisor_id)
+                .where(ReviewInboxItem.status == ApprovalStatus.pending)
+                .group_by(ReviewInboxItem.supervisor_id)
+                .having(func.count() >= 2)
+                .limit(1)
+            )
+            supervisor_id = await db.scalar(supervisor_query)
+            reviewer = None
+            if supervisor_id is not None:
+                reviewer = await db.scalar(
+                    select(User).join(Employee, Employee.user_id == User.id)
+                    .where(Employee.id == supervisor_id)
+                    .options(selectinload(User.employee))
+                )
+            if reviewer is None:
+                print("[SKIP] 資料庫中沒有可供測試的待審日報")
+                return True
+            report_ids = (await db.execute(
+                select(ReviewInboxItem.report_id)
+                .where(ReviewInboxItem.supervisor_id == supervisor_id, ReviewInboxItem.status == ApprovalStatus.pending)
+                .order_by(ReviewInboxItem.report_id)
+                .limit(2)
+            )).scalars().all()
+            if not await _check(db, reviewer, list(report_ids)):
+                return False
+        finally:
+            await db.close()
+            await outer_transaction.rollback()
+
+    print("\n[OK] 批次審核並行核准測試通過")
+    return True
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(test_review_batch_race())
+    if not success:
+        sys.exit(1)
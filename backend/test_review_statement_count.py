@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import sys
+import os
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine
+from app.models import User, Employee, ReviewInboxItem, ApprovalStatus
+from app.schemas.supervisor import ReportReviewCreate
+from app.services import supervisor_service, org_graph_service, event_service
+
+# 單筆審核預期的 SQL 數量 (不含交易控制)，權限與上級主管皆由記憶體組織圖回答：
+#   1. SELECT 日報 + 員工 + 既有審核記錄
+#   2. INSERT ... ON CONFLICT 待審清單
+#   3. INSERT/UPDATE 審核記錄
+#   4. INSERT 留言
+EXPECTED_STATEMENTS = 4
+
+# 交易控制語句不列入計算
+_TRANSACTION_PREFIXES = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT", "BEGIN", "COMMIT", "ROLLBACK")
+
+async def test_review_statement_count():
+    """審核一份待審日報並確認 SQL 數量固定 (全部在交易中執行，結束後回滾不留資料)"""
+    print("=== 測試單筆審核的 SQL 數量 ===\n")
+
+    async with engine.connect() as conn:
+        outer_transaction = await conn.begin()
+        # 服務內的 commit 只會釋放 savepoint，最後整個外層交易回滾
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        try:
+            # 找一筆待審清單，且主管有對應的使用者帳號
+            target_query = (
+                select(ReviewInboxItem.report_id, User)
+                .join(Employee, Employee.id == ReviewInboxItem.supervisor_id)
+                .join(User, User.id == Employee.user_id)
+                .where(ReviewInboxItem.status == ApprovalStatus.pending)
+                .options(selectinload(User.employee))
+                .limit(1)
+            )
+            target = (await db.execute(target_query)).first()
+            if not target:
+                print("[SKIP] 資料庫中沒有可供測試的待審日報")
+                return True
+            report_id, reviewer = target
+            print(f"[INFO] 以主管 {reviewer.employee.empno} 審核日報 {report_id}")
+
+            # 預先載入組織圖與資料版本，避免載入本身的查詢被計入
+            if await org_graph_service.get_org_graph(db) is None:
+                print("[ERROR] 組織圖無法建立")
+                return False
+
+            statements = []
+
+            def count_statement(conn, cursor, statement, parameters, context, executemany):
+                if not statement.lstrip().upper().startswith(_TRANSACTION_PREFIXES):
+                    statements.append(statement)
+
+            published = []
+
+            async def record_publish(channels, event_type, **data):
+                published.append(event_type)
+
+            original_publish = event_service.publish
+            event_service.publish = record_publish
+            event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+            try:
+                report = await supervisor_service.review_daily_report(
+                    db=db,
+                    report_id=report_id,
+                    review_in=ReportReviewCreate(rating=4, comment="SQL 數量測試"),
+                    reviewer=reviewer
+                )
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+                event_service.publish = original_publish
+
+            for i, statement in enumerate(statements, 1):
+                print(f"   {i}. {' '.join(statement.split())[:100]}")
+
+            if report is None:
+                print("[ERROR] 審核失敗，review_daily_report 回傳 None")
+                return False
+            if len(statements) != EXPECTED_STATEMENTS:
+                print(f"[ERROR] 預期 {EXPECTED_STATEMENTS} 個 SQL，實際 {len(statements)} 個")
+                return False
+            print(f"[INFO] 發布的事件: {published}")
+            if published != ["report_reviewed", "comment_created"]:
+                print("[ERROR] 審核後應通知日報審核狀態與審核留言")
+                return False
+            print(f"[OK] 單筆審核共 {len(statements)} 個 SQL")
+            return True
+        finally:
+            await db.close()
+            await outer_transaction.rollback()
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(test_review_statement_count())
+    if not success:
+        sys.exit(1)
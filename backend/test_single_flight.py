@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import sys
+import os
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine
+from app.core import single_flight
+
+class SlowCall:
+    """假的外部呼叫：記錄實際執行次數，等待 delay 秒後回傳結果或拋出例外"""
+
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("Azure 暫時無法使用")
+        return {"ai_content": f"第 {self.calls} 次潤飾"}
+
+async def test_coalescing():
+    """同一個 key 的並行呼叫只執行一次並共用結果；不同 key 或執行完畢後的呼叫會重新執行"""
+    flight = single_flight.SingleFlight("測試")
+    call = SlowCall()
+    results = await asyncio.gather(*(flight.do(("enhance_one", 1, 2, "hash"), call) for _ in range(5)))
+    print(f"[INFO] 5 個相同的並行請求: 實際執行 {call.calls} 次, 統計 {flight.snapshot()}")
+    if call.calls != 1 or any(r is not results[0] for r in results):
+        print("[ERROR] 相同的並行請求應只執行一次並共用結果")
+        return False
+
+    other = SlowCall()
+    await asyncio.gather(flight.do("a", other), flight.do("b", other))
+    await flight.do("a", other)
+    if other.calls != 3:
+        print("[ERROR] 不同 key 或執行完畢後的呼叫應重新執行")
+        return False
+
+    failing = SlowCall(fail=True)
+    outcomes = await asyncio.gather(*(flight.do("fail", failing) for _ in range(3)), return_exceptions=True)
+    if failing.calls != 1 or not all(isinstance(o, RuntimeError) for o in outcomes):
+        print("[ERROR] 失敗時所有等待者應收到同一個例外")
+        return False
+    return True
+
+async def test_leader_cancelled():
+    """執行中的請求被取消時，等待者改由自己執行"""
+    flight = single_flight.SingleFlight("測試取消")
+    call = SlowCall()
+    leader = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    result = await follower
+    print(f"[INFO] 領頭請求取消後，等待者取得: {result['ai_content']}")
+    if call.calls != 2 or not leader.cancelled():
+        print("[ERROR] 領頭請求取消後，等待者應重新執行")
+        return False
+    return True
+
+async def test_advisory_lock():
+    """兩個連線 (模擬兩個 worker) 爭用同一個 advisory lock：後到者等待前者的交易結束"""
+    lock_name = "enhance:test:1"
+    try:
+        async with engine.connect() as conn_a, engine.connect() as conn_b:
+            db_a = AsyncSession(bind=conn_a)
+            db_b = AsyncSession(bind=conn_b)
+            if not await single_flight.try_advisory_xact_lock(db_a, lock_name):
+                print("[ERROR] 第一個連線應取得 lock")
+                return False
+            if await single_flight.try_advisory_xact_lock(db_b, lock_name):
+                print("[ERROR] 第二個連線不應取得同一個 lock")
+                return False
+
+            waiter = asyncio.create_task(single_flight.advisory_xact_lock(db_b, lock_name))
+            await asyncio.sleep(0.1)
+            if waiter.done():
+                print("[ERROR] 第一個連線的交易結束前不應取得 lock")
+                return False
+            await db_a.commit()
+            await asyncio.wait_for(waiter, timeout=5)
+            await db_b.rollback()
+            print("[INFO] 第一個連線 commit 後，第二個連線取得 lock")
+    except OSError as e:
+        print(f"[SKIP] 無法連線資料庫，略過 advisory lock 測試: {e}")
+    return True
+
+async def main():
+    print("=== 測試相同請求的合併 ===\n")
+    for test in (test_coalescing, test_leader_cancelled, test_advisory_lock):
+        if not await test():
+            return False
+    print("\n[OK] 請求合併測試通過")
+    return True
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(main())
+    if not success:
+        sys.exit(1)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+import sys
+import os
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import ai_suggestion_service, structured_output_service
+from fake_openai import FakeCompletions, patched_client
+
+SUGGESTIONS = {"suggestions": [
+    {"type": "encouraging", "title": "肯定鼓勵", "content": "登入頁面完成得很好"},
+    {"type": "guidance", "title": "指導建議", "content": "記得補上錯誤處理"},
+]}
+VALID = json.dumps(SUGGESTIONS, ensure_ascii=False)
+
+async def _run(replies):
+    replies = list(replies)
+    with patched_client(FakeCompletions(lambda request: replies.pop(0))) as completions:
+        suggestions = await ai_suggestion_service.generate_supervisor_reply_suggestions("今天完成登入頁面", "測試員工")
+    return suggestions, completions.requests
+
+def test_extract_json():
+    """程式碼區塊、前後說明文字都能取出 JSON"""
+    cases = {
+        VALID: SUGGESTIONS,
+        f"```json\n{VALID}\n```": SUGGESTIONS,
+        f"以下是建議：\n```\n{VALID}\n```\n希望有幫助": SUGGESTIONS,
+        f"好的，建議如下 {VALID} 以上。": SUGGESTIONS,
+    }
+    for text, expected in cases.items():
+        if structured_output_service.extract_json(text) != expected:
+            print(f"[ERROR] 無法取出 JSON: {text[:30]!r}")
+            return False
+    try:
+        structured_output_service.extract_json("沒有任何 JSON")
+        print("[ERROR] 找不到 JSON 時應拋出 ValueError")
+        return False
+    except ValueError:
+        pass
+    print("[OK] JSON 擷取")
+    return True
+
+async def test_structured_output():
+    """JSON 模式與驗證：可擷取的回應不重送，無法使用時只修正一次，最後才改用替代結果"""
+    print("=== 測試主管回覆建議的結構化輸出 ===\n")
+    if not test_extract_json():
+        return False
+
+    # 1. 合法回應：一次請求，使用 JSON 模式
+    suggestions, requests = await _run([VALID])
+    print(f"[INFO] 合法回應: 請求數 {len(requests)}")
+    if len(requests) != 1 or requests[0].get("response_format") != {"type": "json_object"} or suggestions != SUGGESTIONS["suggestions"]:
+        print("[ERROR] 合法回應應只需一次 JSON 模式請求")
+        return False
+
+    # 2. 夾帶程式碼區塊與說明文字：擷取後直接使用，不需修正
+    suggestions, requests = await _run([f"以下是建議：\n```json\n{VALID}\n```"])
+    print(f"[INFO] 程式碼區塊: 請求數 {len(requests)}")
+    if len(requests) != 1 or suggestions != SUGGESTIONS["suggestions"]:
+        print("[ERROR] 程式碼區塊內的 JSON 應直接使用")
+        return False
+
+    # 3. 缺少欄位：送出一次修正請求 (不重送日報內容)
+    broken = json.dumps({"suggestions": [{"type": "encouraging", "content": "缺少標題"}]}, ensure_ascii=False)
+    suggestions, requests = await _run([broken, VALID])
+    print(f"[INFO] 修正成功: 請求數 {len(requests)}")
+    if len(requests) != 2 or suggestions != SUGGESTIONS["suggestions"] or "今天完成登入頁面" in json.dumps(requests[1]["messages"], ensure_ascii=False):
+        print("[ERROR] 應只送出一次不含日報內容的修正請求")
+        return False
+
+    # 4. 修正後仍無法使用：改用本機產生的建議，不再重試
+    suggestions, requests = await _run(["不是 JSON", "仍然不是 JSON"])
+    print(f"[INFO] 修正失敗: 請求數 {len(requests)}, 替代建議 {len(suggestions)} 則")
+    if len(requests) != 2 or not suggestions:
+        print("[ERROR] 修正失敗時應改用本機產生的建議")
+        return False
+
+    metrics = structured_output_service.snapshot_all()["主管回覆建議"]
+    print(f"[INFO] 統計: {metrics}")
+    expected = {"requests": 4, "responses": 4, "parsed": 1, "extracted": 1, "repair_attempts": 2,
+                "repaired": 1, "parse_failures": 1, "fallbacks": 1, "fallback_rate": 0.25}
+    if any(metrics[key] != value for key, value in expected.items()):
+        print("[ERROR] 統計數字不符")
+        return False
+
+    print("\n[OK] 結構化輸出測試通過")
+    return True
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(test_structured_output())
+    if not success:
+        sys.exit(1)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import sys
+import os
+
+# 讓此獨立腳本可以載入 app 內的模組
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded
+from app.services import summarization_service, prompt_budget_service
+
+CONCURRENCY = 3
+CHUNK_TOKENS = 300
+SUMMARY_TOKENS = 40
+
+class StubModel:
+    """假的模型：記錄呼叫次數與同時進行的請求數，回傳固定長度的摘要"""
+
+    def __init__(self, fail: bool = False, empty: bool = False, deadline_after: int = None):
+        self.fail = fail
+        self.empty = empty
+        # 第 deadline_after 次之後的呼叫拋出 DeadlineExceeded (模擬時間預算用完)
+        self.deadline_after = deadline_after
+        self.calls = 0
+        self.map_calls = 0
+        self.reduce_calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, prompt: str, temperature: float = 0.3, max_tokens: int = 1000) -> str:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        self.calls += 1
+        try:
+            await asyncio.sleep(0.01)
+            if self.deadline_after is not None and self.calls > self.deadline_after:
+                raise DeadlineExceeded()
+            if self.fail:
+                raise RuntimeError("stub model failure")
+            if "<SUMMARIES>" in prompt:
+                self.reduce_calls += 1
+                return "整合摘要"
+            self.map_calls += 1
+            if self.empty:
+                return "  "
+            return f"段落摘要 {self.map_calls}"
+        finally:
+            self.active -= 1
+
+def _make_document(paragraphs: int) -> str:
+    return "\n\n".join(f"第 {i} 段：系統規格說明，包含登入、權限與報表匯出的需求。" * 6 for i in range(paragraphs))
+
+async def _summarize(document: str, cache, model: StubModel) -> str:
+    return await summarization_service.summarize_document(
+        document,
+        cache=cache,
+        complete=model,
+        semaphore=asyncio.Semaphore(CONCURRENCY),
+        chunk_tokens=CHUNK_TOKENS,
+        summary_tokens=SUMMARY_TOKENS,
+    )
+
+async def test_summarization_pipeline():
+    """以假的模型測試 map-reduce 摘要：並行上限、片段快取與失敗時的退路"""
+    print("=== 測試大型附件分段摘要 ===\n")
+    document = _make_document(40)
+    chunk_count = len(prompt_budget_service.chunk_text(document, CHUNK_TOKENS))
+    cache = summarization_service.MemorySummaryCache()
+
+    # 第一次：每段都需要摘要，且同時進行的請求不超過上限
+    model = StubModel()
+    result = await _summarize(document, cache, model)
+    print(f"[INFO] 第一次: {chunk_count} 段, map {model.map_calls} 次, reduce {model.reduce_calls} 次, 最大並行 {model.max_active}")
+    if result != "整合摘要" or model.map_calls != chunk_count or model.reduce_calls != 1:
+        print("[ERROR] 第一次摘要的呼叫次數不符")
+        return False
+    if model.max_active > CONCURRENCY:
+        print(f"[ERROR] 並行請求數 {model.max_active} 超過上限 {CONCURRENCY}")
+        return False
+
+    # 第二次 (例如隔天再潤飾同一份附件)：片段摘要全部命中快取，只剩 reduce
+    model = StubModel()
+    await _summarize(document, cache, model)
+    print(f"[INFO] 第二次: map {model.map_calls} 次, reduce {model.reduce_calls} 次")
+    if model.map_calls != 0 or model.reduce_calls != 1:
+        print("[ERROR] 第二次應只執行 reduce")
+        return False
+
+    # 模型失敗：改用截斷的原文，且不寫入快取
+    failing_cache = summarization_service.MemorySummaryCache()
+    result = await _summarize(_make_document(5), failing_cache, StubModel(fail=True))
+    if not result or failing_cache.entries:
+        print("[ERROR] 模型失敗時應回傳截斷的原文且不寫入快取")
+        return False
+    print(f"[INFO] 模型失敗時回傳 {prompt_budget_service.count_tokens(result)} tokens 的原文摘錄")
+
+    # 模型回傳空白 (例如被內容篩選)：不寫入快取，下次重新摘要
+    empty_cache = summarization_service.MemorySummaryCache()
+    await _summarize(_make_document(5), empty_cache, StubModel(empty=True))
+    if empty_cache.entries:
+        print("[ERROR] 空白的摘要不應寫入快取")
+        return False
+
+    # 時間預算用完：不再送出其餘片段的請求，已完成的摘要寫入快取後拋出 DeadlineExceeded
+    deadline_cache = summarization_service.MemorySummaryCache()
+    model = StubModel(deadline_after=CONCURRENCY)
+    try:
+        await _summarize(document, deadline_cache, model)
+        print("[ERROR] 時間預算用完時應拋出 DeadlineExceeded")
+        return False
+    except DeadlineExceeded:
+        pass
+    print(f"[INFO] 時間預算用完: {chunk_count} 段中呼叫 {model.calls} 次, 快取 {len(deadline_cache.entries)} 段")
+    if model.calls > 2 * CONCURRENCY or len(deadline_cache.entries) != CONCURRENCY:
+        print("[ERROR] 時間預算用完後應停止呼叫模型並保留已完成的摘要")
+        return False
+
+    # 整理參考文件時遇到時間預算用完：該文件與其後的文件原樣保留，不再呼叫模型
+    model = StubModel(deadline_after=0)
+    documents = [_make_document(40), _make_document(40)]
+    condensed = await summarization_service.condense_references(
+        documents, cache=summarization_service.MemorySummaryCache(), complete=model, threshold_tokens=CHUNK_TOKENS
+    )
+    if condensed != documents or model.calls > settings.AI_SUMMARY_CONCURRENCY:
+        print(f"[ERROR] 時間預算用完後應原樣保留其餘文件 (呼叫 {model.calls} 次)")
+        return False
+
+    # 未超過門檻的文件原樣保留，不呼叫模型
+    model = StubModel()
+    short_text = "簡短的附件內容"
+    condensed = await summarization_service.condense_references(
+        [short_text], cache=cache, complete=model, threshold_tokens=CHUNK_TOKENS
+    )
+    if condensed != [short_text] or model.map_calls or model.reduce_calls:
+        print("[ERROR] 短文件不應被摘要")
+        return False
+
+    print("\n[OK] 分段摘要測試通過")
+    return True
+
+if __name__ == "__main__":
+    # 確保在 Windows 上 asyncio 可以正常運作
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    success = asyncio.run(test_summarization_pipeline())
+    if not success:
+        sys.exit(1)
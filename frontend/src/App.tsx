@@ -60,6 +60,10 @@ export interface ConsolidatedReport {
   record_count: number;
   ai_content: string | null;
   total_execution_time_minutes?: number;
+  // 一鍵潤飾超過時間預算而未處理的專案
+  ai_deadline_exceeded?: boolean;
+  // AI 潤飾失敗的原因 (保留原本的 AI 內容)
+  ai_error?: string | null;
 }
 export interface EmployeeInList {
   id: number;
@@ -97,6 +101,8 @@ export interface EmployeeForUser {
   empnamec: string;
   dutyscript?: string; // 職稱
   deptabbv?: string; // 部門簡稱
+  direct_report_count?: number; // 直屬下級人數 (同步時計算)
+  total_report_count?: number; // 直屬與間接下級人數
 }
 
 export interface User {
@@ -109,8 +115,6 @@ export interface User {
 }
 function App() {
   const { user, logout, authFetch } = useAuth();
-  const { hasSubordinates, loading: subordinatesLoading } =
-    useHasSubordinates();
   const [activeTab, setActiveTab] = useState<
     "input" | "daily" | "myreports" | "supervisor" | "ai" | "comprehensive"
   >("input"); // 預設為隨筆紀錄
@@ -120,6 +124,13 @@ function App() {
   const [selectedReportId, setSelectedReportId] = useState<number | null>(null);
   const [editingStatus, setEditingStatus] =
     useState<EmployeeEditingStatus | null>(null);
+  // 日報頁面初始資料 (/api/bootstrap/today) 中的下屬資訊
+  const [bootstrapHasSubordinates, setBootstrapHasSubordinates] = useState<
+    boolean | undefined
+  >(undefined);
+  const { hasSubordinates, loading: subordinatesLoading } = useHasSubordinates(
+    bootstrapHasSubordinates
+  );
 
   const handleSelectEmployee = (employee: EmployeeInList, reportId: number) => {
     setSelectedEmployee(employee);
@@ -141,19 +152,22 @@ function App() {
     fetchEditingStatus();
   };
 
+  // 編輯權限與下屬資訊都取自日報頁面的初始資料，不另外呼叫個別 API
   const fetchEditingStatus = async () => {
     if (!authFetch || !user?.employee) return;
 
     try {
-      const response = await authFetch(
-        "/api/supervisor/employee-editing-status"
-      );
+      const response = await authFetch("/api/bootstrap/today");
       if (response.ok) {
-        const status: EmployeeEditingStatus = await response.json();
-        setEditingStatus(status);
+        const data = await response.json();
+        setEditingStatus(data.editing_status as EmployeeEditingStatus);
+        setBootstrapHasSubordinates(data.has_subordinates);
+      } else {
+        setBootstrapHasSubordinates(false);
       }
     } catch (error) {
       console.error("獲取編輯狀態失敗:", error);
+      setBootstrapHasSubordinates(false);
     }
   };
 
@@ -3,6 +3,7 @@
 import React, { useState, useEffect, useCallback } from "react";
 import { User, Crown, MessageCircle, Sparkles, Loader2 } from "lucide-react";
 import { useAuth } from "../contexts/AuthContext";
+import { useServerEvents } from "../hooks/useServerEvents";
 import toast from "react-hot-toast";
 
 // Duplicating from EmployeeDetailTab, should be centralized
@@ -86,10 +87,11 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
     }
   }, [approvals, user]);
 
-  const fetchComments = useCallback(async () => {
+  // silent: 收到即時通知時在背景重新讀取，不顯示載入狀態
+  const fetchComments = useCallback(async (silent = false) => {
     if (!authFetch) return;
     try {
-      setIsLoading(true);
+      if (!silent) setIsLoading(true);
       const response = await authFetch(`/api/reports/${reportId}/comments`);
       if (response.ok) {
         const commentsData = await response.json();
@@ -111,6 +113,13 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
     }
   }, [fetchComments, authFetch]);
 
+  // 其他人在這份日報留言時重新讀取 (自己的留言送出後已經重新讀取)
+  useServerEvents(["comment_created"], (event) => {
+    if (event.report_id === reportId && event.author_user_id !== user?.id) {
+      fetchComments(true);
+    }
+  });
+
   const handleSubmitMessage = async () => {
     if (!newMessage.trim() || !authFetch) return;
     setIsSubmitting(true);
@@ -111,12 +111,35 @@ const DailyReportTab: React.FC = () => {
     }
   };
 
-  useEffect(() => {
-    if (authFetch) {
+  // 初次載入時以單一請求取得報告、專案與填寫狀態
+  const fetchBootstrap = async () => {
+    if (!authFetch) return;
+    setIsLoading(true);
+    try {
+      const response = await authFetch("/api/bootstrap/today");
+      if (!response.ok) {
+        throw new Error("bootstrap 請求失敗");
+      }
+      const data = await response.json();
+      setReports(data.consolidated);
+      setProjects(data.projects);
+      setWritingStatus(data.writing_status);
+      if (data.consolidated.some((report: ConsolidatedReport) => report.ai_content)) {
+        setIsAiViewActive(true);
+      }
+      setIsLoading(false);
+    } catch (error) {
+      console.error("無法取得日報初始資料，改為逐項載入:", error);
       fetchReports();
       fetchProjects();
       fetchWritingStatus();
     }
+  };
+
+  useEffect(() => {
+    if (authFetch) {
+      fetchBootstrap();
+    }
   }, [authFetch]);
 
   const handleEnhanceOne = async (projectId: number) => {
@@ -158,10 +181,21 @@ const DailyReportTab: React.FC = () => {
         method: "POST",
       });
       if (response.ok) {
-        const enhancedReports = await response.json();
+        const enhancedReports: ConsolidatedReport[] = await response.json();
         setReports(enhancedReports);
         setIsAiViewActive(true);
-        toast.success("所有報告皆已完成 AI 潤飾！");
+        const skipped = enhancedReports.filter((r) => r.ai_deadline_exceeded).length;
+        const failed = enhancedReports.filter((r) => r.ai_error);
+        if (failed.length > 0) {
+          const reason = failed.some((r) => r.ai_error === "rate_limited")
+            ? "AI 服務目前使用量過高"
+            : "AI 服務暫時無法使用";
+          toast.error(`${reason}，${failed.length} 個專案未完成 AI 潤飾，請稍後再試。`);
+        } else if (skipped > 0) {
+          toast(`處理時間過長，尚有 ${skipped} 個專案未完成 AI 潤飾，請稍後再試。`, { icon: "⚠️" });
+        } else {
+          toast.success("所有報告皆已完成 AI 潤飾！");
+        }
       } else {
         throw new Error("AI 服務失敗");
       }
@@ -214,15 +248,11 @@ const DailyReportTab: React.FC = () => {
 
       if (!response.ok) throw new Error("更新報告失敗");
 
+      // 後端回傳更新後的報告 (含新附件的 ID)，直接取代，不必重新取得
+      const updatedReport: ConsolidatedReport = await response.json();
       setReports((prevReports) =>
         prevReports.map((r) =>
-          r.project.id === editingProjectId
-            ? {
-                ...r,
-                content: editContent,
-                files: editFiles as FileAttachment[],
-              }
-            : r
+          r.project.id === editingProjectId ? updatedReport : r
         )
       );
       toast.success("報告草稿更新成功！");
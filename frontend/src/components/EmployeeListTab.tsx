@@ -15,6 +15,7 @@ import DatePicker from "react-datepicker";
 import "react-datepicker/dist/react-datepicker.css";
 import type { SupervisorApprovalInfo } from "../types/supervisor";
 import { formatMinutesToHours } from "../utils/timeUtils";
+import { useServerEvents } from "../hooks/useServerEvents";
 
 interface ReportWithApprovals extends DailyReport {
   approvals?: SupervisorApprovalInfo[];
@@ -41,6 +42,12 @@ const EmployeeListTab: React.FC<EmployeeListTabProps> = ({
     getDefaultDate()
   );
   const { authFetch, user } = useAuth();
+  // 收到下屬提交、審核異動或新留言 (留言數) 的通知時遞增，觸發重新讀取
+  const [refreshKey, setRefreshKey] = useState(0);
+
+  useServerEvents(["report_submitted", "report_reviewed", "comment_created"], () =>
+    setRefreshKey((key) => key + 1)
+  );
 
   useEffect(() => {
     if (user?.employee?.id) {
@@ -91,7 +98,7 @@ const EmployeeListTab: React.FC<EmployeeListTabProps> = ({
       }
     };
     fetchReportsByDate();
-  }, [selectedDate, authFetch]);
+  }, [selectedDate, authFetch, refreshKey]);
 
   const changeDate = (offset: number) => {
     setSelectedDate((prevDate) => {
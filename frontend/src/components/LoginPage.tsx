@@ -36,7 +36,7 @@ const LoginPage: React.FC = () => {
 
       const data = await response.json();
       // --- ↓↓↓ 關鍵修改：將 token 和 user 物件一起傳入 login 函式 ↓↓↓ ---
-      login(data.token.access_token, data.user);
+      login(data.token.access_token, data.user, data.token.refresh_token);
       navigate("/");
     } catch (err: any) {
       setError(err.message || "發生未知錯誤");
@@ -1,13 +1,13 @@
 // frontend/src/contexts/AuthContext.tsx
 
-import React, { createContext, useState, useContext, ReactNode, useCallback } from 'react';
+import React, { createContext, useState, useContext, ReactNode, useCallback, useRef } from 'react';
 import type { User } from '../App'; // 我們將從 App.tsx 引入統一的 User 型別
 import { buildApiUrl } from '../config/api';
 
 interface AuthContextType {
   token: string | null;
   user: User | null; // <-- 新增 user 狀態
-  login: (token: string, user: User) => void; // <-- login 函式現在接收 user 物件
+  login: (token: string, user: User, refreshToken?: string) => void; // <-- login 函式現在接收 user 物件
   logout: () => void;
   isAuthenticated: boolean;
   authFetch: (url: string, options?: RequestInit) => Promise<Response>;
@@ -27,18 +27,62 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
     }
   });
 
-  const login = (newToken: string, newUser: User) => {
+  const login = (newToken: string, newUser: User, refreshToken?: string) => {
     setToken(newToken);
     setUser(newUser);
     localStorage.setItem('authToken', newToken);
     localStorage.setItem('user', JSON.stringify(newUser)); // <-- 將 user 物件存入 localStorage
+    if (refreshToken) {
+      localStorage.setItem('refreshToken', refreshToken);
+    }
   };
 
   const logout = () => {
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (refreshToken) {
+      // 通知後端撤銷 refresh token，失敗不影響登出
+      fetch(buildApiUrl('/api/auth/logout'), {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      }).catch(() => {});
+    }
     setToken(null);
     setUser(null);
     localStorage.removeItem('authToken');
     localStorage.removeItem('user'); // <-- 登出時一併移除
+    localStorage.removeItem('refreshToken');
+  };
+
+  // 進行中的換發請求；同時收到多個 401 時共用同一個，避免同一個 refresh token 被送出多次
+  const refreshPromiseRef = useRef<Promise<string | null> | null>(null);
+
+  // 使用 refresh token 換發新的 access token，成功時回傳新 token
+  const requestNewAccessToken = async (): Promise<string | null> => {
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (!refreshToken) return null;
+
+    const response = await fetch(buildApiUrl('/api/auth/refresh'), {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+    if (!response.ok) return null;
+
+    const data = await response.json();
+    login(data.token.access_token, data.user, data.token.refresh_token);
+    return data.token.access_token;
+  };
+
+  const refreshAccessToken = (): Promise<string | null> => {
+    if (!refreshPromiseRef.current) {
+      refreshPromiseRef.current = requestNewAccessToken()
+        .catch(() => null)
+        .finally(() => {
+          refreshPromiseRef.current = null;
+        });
+    }
+    return refreshPromiseRef.current;
   };
 
   const isAuthenticated = !!token;
@@ -52,7 +96,21 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
     }
 
     const fullUrl = buildApiUrl(url);
-    const response = await fetch(fullUrl, { ...options, headers: newHeaders });
+    const sentToken = newHeaders.get('Authorization');
+    let response = await fetch(fullUrl, { ...options, headers: newHeaders });
+
+    // access token 過期時先嘗試以 refresh token 換發，成功則重送一次
+    if (response.status === 401) {
+      // 其他請求 (或其他分頁) 已經換發過時直接使用新的 token，不再換發
+      const storedToken = localStorage.getItem('authToken');
+      const newToken = storedToken && `Bearer ${storedToken}` !== sentToken
+        ? storedToken
+        : await refreshAccessToken();
+      if (newToken) {
+        newHeaders.set('Authorization', `Bearer ${newToken}`);
+        response = await fetch(fullUrl, { ...options, headers: newHeaders });
+      }
+    }
 
     if (response.status === 401) {
       logout();
@@ -1,43 +1,24 @@
 // frontend/src/hooks/useHasSubordinates.ts
 
-import { useState, useEffect } from "react";
 import { useAuth } from "../contexts/AuthContext";
 
-export const useHasSubordinates = () => {
-  const { authFetch } = useAuth();
-  const [hasSubordinates, setHasSubordinates] = useState<boolean>(false);
-  const [loading, setLoading] = useState<boolean>(true);
-  const [error, setError] = useState<string | null>(null);
+/**
+ * 目前使用者是否有下屬。
+ * 登入回應的員工資料已帶有下屬人數時直接使用；
+ * 否則使用 /api/bootstrap/today 回傳的 has_subordinates (尚未取得時為 loading)。
+ */
+export const useHasSubordinates = (bootstrapHasSubordinates?: boolean) => {
+  const { user } = useAuth();
+  const directReportCount = user?.employee?.direct_report_count;
 
-  useEffect(() => {
-    const checkSubordinates = async () => {
-      try {
-        setLoading(true);
-        const response = await authFetch("/api/supervisor/has-subordinates");
-
-        if (response.ok) {
-          const data = await response.json();
-          setHasSubordinates(data.has_subordinates);
-          setError(null);
-        } else {
-          setHasSubordinates(false);
-          setError("檢查下屬關係失敗");
-        }
-      } catch (err) {
-        setHasSubordinates(false);
-        setError("網路錯誤");
-        console.error("Error checking subordinates:", err);
-        // 額外日誌幫助調試
-        if (err instanceof Error) {
-          console.error("Error details:", err.message);
-        }
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    checkSubordinates();
-  }, [authFetch]);
-
-  return { hasSubordinates, loading, error };
+  if (!user?.employee) {
+    return { hasSubordinates: false, loading: false };
+  }
+  if (directReportCount !== undefined) {
+    return { hasSubordinates: directReportCount > 0, loading: false };
+  }
+  return {
+    hasSubordinates: bootstrapHasSubordinates ?? false,
+    loading: bootstrapHasSubordinates === undefined,
+  };
 };
@@ -0,0 +1,90 @@
+// frontend/src/hooks/useServerEvents.ts
+
+import { useEffect, useRef } from "react";
+import { useAuth } from "../contexts/AuthContext";
+import { buildApiUrl } from "../config/api";
+
+export type ServerEventType =
+  | "report_submitted"
+  | "report_reviewed"
+  | "comment_created";
+
+export interface ServerEvent {
+  type: ServerEventType;
+  report_id: number;
+  [key: string]: unknown;
+}
+
+const EVENT_TYPES: ServerEventType[] = [
+  "report_submitted",
+  "report_reviewed",
+  "comment_created",
+];
+
+type Subscriber = (event: ServerEvent) => void;
+
+// 同一個分頁內共用一條 SSE 連線 (依 token)，收到事件時分送給所有訂閱者；
+// 最後一個訂閱者取消時才關閉連線
+let shared: {
+  token: string;
+  source: EventSource;
+  subscribers: Set<Subscriber>;
+} | null = null;
+
+const subscribe = (token: string, subscriber: Subscriber) => {
+  if (shared && shared.token !== token) {
+    // token 已更新：關閉舊連線 (各訂閱者的 effect 會以新的 token 重新訂閱)
+    shared.source.close();
+    shared = null;
+  }
+  if (!shared) {
+    const source = new EventSource(
+      buildApiUrl(`/api/events/stream?token=${encodeURIComponent(token)}`)
+    );
+    const subscribers = new Set<Subscriber>();
+    const listener = (e: MessageEvent) => {
+      let event: ServerEvent;
+      try {
+        event = JSON.parse(e.data);
+      } catch (err) {
+        console.error("無法解析即時通知:", err);
+        return;
+      }
+      subscribers.forEach((s) => s(event));
+    };
+    EVENT_TYPES.forEach((type) => source.addEventListener(type, listener));
+    shared = { token, source, subscribers };
+  }
+  const current = shared;
+  current.subscribers.add(subscriber);
+
+  return () => {
+    current.subscribers.delete(subscriber);
+    if (current.subscribers.size === 0 && shared === current) {
+      current.source.close();
+      shared = null;
+    }
+  };
+};
+
+// 訂閱後端的即時通知，收到指定類型的事件時呼叫 onEvent
+export const useServerEvents = (
+  types: ServerEventType[],
+  onEvent: (event: ServerEvent) => void
+) => {
+  const { token } = useAuth();
+  const handlerRef = useRef(onEvent);
+  handlerRef.current = onEvent;
+  const typesKey = types.join(",");
+
+  useEffect(() => {
+    if (!token) return;
+
+    const wanted = new Set(typesKey.split(","));
+    return subscribe(token, (event) => {
+      if (wanted.has(event.type)) {
+        handlerRef.current(event);
+      }
+    });
+  }, [token, typesKey]);
+};